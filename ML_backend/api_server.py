@@ -10,14 +10,22 @@ import logging
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Any
-from concurrent.futures import ThreadPoolExecutor
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
-from oceaneye_pipeline import OceanEYEPipeline
+from fasta_upload import (
+    FastaUploadSink, FastaValidationError, UploadTooLargeError,
+    UPLOAD_CHUNK_SIZE, is_fasta_filename
+)
+from http_cache import ETagCompressionMiddleware
+from job_store import JobStore, TERMINAL_STATUSES
+from oceaneye_pipeline import PIPELINE_VERSION, DEFAULT_MODEL_NAME
+from result_cache import ResultCache, file_digest, make_cache_key, prime_digest
+from species_index import ReportCache, SORT_FIELDS
+from worker_pool import WorkerPool, DEFAULT_NUM_WORKERS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -39,9 +47,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global pipeline instance
-pipeline = None
-executor = ThreadPoolExecutor(max_workers=2)
+# Smallest response body (bytes) that is gzip/brotli compressed
+COMPRESS_MIN_SIZE = int(os.environ.get("OCEANEYE_COMPRESS_MIN_SIZE", "1024"))
+
+# ETags (304 on If-None-Match) and compression; event streams pass through
+app.add_middleware(ETagCompressionMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+
+# Server-Sent Events: store poll interval and idle keep-alive (seconds)
+SSE_POLL_INTERVAL = 0.5
+SSE_KEEPALIVE_INTERVAL = 15.0
+
+# Durable job queue/store shared with the worker processes
+job_store = JobStore()
+
+# Deduplicates identical submissions (same content and parameters)
+result_cache = ResultCache(job_store)
+
+# Parsed species reports of recently queried jobs
+report_cache = ReportCache()
+
+# Global worker pool (each worker process owns its own pipeline)
+worker_pool: Optional[WorkerPool] = None
 
 # Data models
 class AnalysisRequest(BaseModel):
@@ -50,17 +76,34 @@ class AnalysisRequest(BaseModel):
     fetch_taxonomy: bool = Field(False, description="Fetch taxonomy from NCBI")
     min_cluster_size: int = Field(10, description="Minimum cluster size for HDBSCAN")
     cluster_epsilon: float = Field(0.1, description="Cluster selection epsilon")
+    max_runtime_seconds: Optional[float] = Field(
+        None, description="Wall-clock budget in seconds (default OCEANEYE_JOB_TIMEOUT, 0 = unlimited)"
+    )
+    max_memory_mb: Optional[float] = Field(
+        None, description="Worker resident memory budget in MB (default OCEANEYE_JOB_MAX_MEMORY_MB, 0 = unlimited)"
+    )
 
 class AnalysisStatus(BaseModel):
     """Analysis job status model"""
     job_id: str
-    status: str  # 'pending', 'running', 'completed', 'failed'
+    status: str  # 'pending', 'running', 'completed', 'failed', 'cancelled'
+    priority: int = 0
     progress: float
     message: str
-    started_at: datetime
+    progress_detail: Optional[Dict[str, Any]] = None
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    cancel_requested_at: Optional[datetime] = None
     results: Optional[Dict[str, Any]] = None
 
+class AnalysisJob(BaseModel):
+    """Response model of a submitted analysis job"""
+    job_id: str
+    status: str  # 'started', 'attached' (identical job in progress) or 'completed'
+    message: str
+    deduplicated: bool  # True when an identical submission's job is reused
+
 class BiodiversityMetrics(BaseModel):
     """Biodiversity metrics response model"""
     total_sequences: int
@@ -83,18 +126,36 @@ class SpeciesInfo(BaseModel):
     environmental_parameters: Dict[str, Any]
     cluster_distribution: Dict[str, int]
 
-# Job tracking
-analysis_jobs: Dict[str, AnalysisStatus] = {}
+def job_to_status(job: Dict[str, Any]) -> AnalysisStatus:
+    """Build the API status model from a stored job"""
+    return AnalysisStatus(**{field: job.get(field) for field in AnalysisStatus.model_fields})
+
+def get_completed_job(job_id: str) -> Dict[str, Any]:
+    """Fetch a job from the store, requiring it to be completed"""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=400, detail="Job not completed")
+    return job
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize the pipeline on startup"""
-    global pipeline
+    """Start the analysis worker pool on startup"""
+    global worker_pool
     try:
-        pipeline = OceanEYEPipeline()
-        logger.info("OceanEYE pipeline initialized")
+        worker_pool = WorkerPool(num_workers=DEFAULT_NUM_WORKERS, db_path=job_store.db_path)
+        worker_pool.start()
+        logger.info(f"OceanEYE worker pool initialized with {worker_pool.num_workers} workers")
     except Exception as e:
-        logger.error(f"Failed to initialize pipeline: {e}")
+        worker_pool = None
+        logger.error(f"Failed to initialize worker pool: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the analysis worker pool"""
+    if worker_pool is not None:
+        worker_pool.shutdown()
 
 @app.get("/")
 async def root():
@@ -103,7 +164,7 @@ async def root():
         "message": "OceanEYE eDNA Analysis API",
         "version": "1.0.0",
         "status": "operational",
-        "pipeline_ready": pipeline is not None
+        "pipeline_ready": worker_pool is not None
     }
 
 @app.get("/health")
@@ -112,232 +173,237 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "pipeline_initialized": pipeline is not None,
-        "active_jobs": len([job for job in analysis_jobs.values() if job.status == "running"])
+        "pipeline_initialized": worker_pool is not None,
+        "workers": worker_pool.alive_workers() if worker_pool is not None else 0,
+        "active_jobs": job_store.count("running"),
+        "queued_jobs": job_store.count("pending"),
+        "embedding_service": (
+            worker_pool.embedding_service.is_alive()
+            if worker_pool is not None and worker_pool.embedding_service is not None else None
+        )
     }
 
+async def ingest_upload(chunks, filename: str) -> Dict[str, Any]:
+    """Stream upload chunks through validation/hashing to disk"""
+    loop = asyncio.get_event_loop()
+    sink = FastaUploadSink(upload_dir="uploads", filename=filename)
+    
+    try:
+        async for chunk in chunks:
+            # Decompression, validation and hashing run off the event loop
+            await loop.run_in_executor(None, sink.write, chunk)
+        result = await loop.run_in_executor(None, sink.close)
+    except FastaValidationError as e:
+        sink.abort()
+        raise HTTPException(status_code=400, detail=f"Invalid FASTA file: {e}")
+    except UploadTooLargeError as e:
+        sink.abort()
+        raise HTTPException(status_code=413, detail=str(e))
+    except BaseException:
+        sink.abort()
+        raise
+    
+    # Lets /analyze skip re-hashing the file for deduplication
+    prime_digest(result["file_path"], result["sha256"])
+    logger.info(
+        f"FASTA file uploaded: {result['filename']} -> {result['file_path']} "
+        f"({result['records']} records, {result['file_size']} bytes)"
+    )
+    
+    return {"message": "File uploaded successfully", **result}
+
 @app.post("/upload-fasta")
 async def upload_fasta(file: UploadFile = File(...)):
-    """Upload FASTA file for analysis"""
-    if not file.filename.endswith(('.fasta', '.fa', '.fas')):
+    """Upload FASTA file for analysis (plain, .gz or .bz2)"""
+    if not is_fasta_filename(file.filename):
         raise HTTPException(status_code=400, detail="File must be in FASTA format")
     
-    # Create uploads directory
-    upload_dir = Path("uploads")
-    upload_dir.mkdir(exist_ok=True)
+    async def read_chunks():
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
     
-    # Save uploaded file
-    file_path = upload_dir / file.filename
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
-    
-    logger.info(f"FASTA file uploaded: {file.filename}")
+    return await ingest_upload(read_chunks(), file.filename)
+
+@app.post("/upload-fasta/stream")
+async def upload_fasta_stream(request: Request, filename: str = "upload.fasta"):
+    """Upload FASTA file as the raw request body, without multipart buffering"""
+    if not is_fasta_filename(filename):
+        raise HTTPException(status_code=400, detail="File must be in FASTA format")
     
-    return {
-        "message": "File uploaded successfully",
-        "filename": file.filename,
-        "file_path": str(file_path),
-        "file_size": len(content)
-    }
+    return await ingest_upload(request.stream(), filename)
 
-@app.post("/analyze", response_model=Dict[str, str])
+@app.post("/analyze", response_model=AnalysisJob)
 async def start_analysis(
-    background_tasks: BackgroundTasks,
     request: AnalysisRequest,
-    fasta_file: str = "uploads/example.fasta"
+    fasta_file: str = "uploads/example.fasta",
+    priority: int = 0
 ):
     """Start eDNA analysis job"""
-    if pipeline is None:
+    if worker_pool is None:
         raise HTTPException(status_code=503, detail="Pipeline not initialized")
     
     if not Path(fasta_file).exists():
         raise HTTPException(status_code=404, detail="FASTA file not found")
     
-    # Generate job ID
-    job_id = f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    params = request.model_dump()
     
-    # Create job status
-    job_status = AnalysisStatus(
-        job_id=job_id,
-        status="pending",
-        progress=0.0,
-        message="Analysis queued",
-        started_at=datetime.now()
+    # Reuse the completed or in-flight job for an identical submission
+    # Hash off the event loop; large uploads take a while to read
+    content_digest = await asyncio.get_event_loop().run_in_executor(
+        None, file_digest, fasta_file
     )
-    analysis_jobs[job_id] = job_status
-    
-    # Start analysis in background
-    background_tasks.add_task(
-        run_analysis_job,
-        job_id,
-        fasta_file,
-        request
+    cache_key = make_cache_key(
+        content_digest,
+        params,
+        worker_pool.model_name or DEFAULT_MODEL_NAME,
+        PIPELINE_VERSION
     )
+    cached_job = result_cache.lookup(cache_key)
+    if cached_job is not None:
+        completed = cached_job["status"] == "completed"
+        return {
+            "job_id": cached_job["job_id"],
+            "status": "completed" if completed else "attached",
+            "message": ("Identical analysis already completed" if completed
+                        else "Attached to identical analysis job in progress"),
+            "deduplicated": True
+        }
+    
+    # Queue the job durably; the next free worker process claims it
+    job = job_store.create_job(fasta_file, params, priority=priority)
+    result_cache.remember(cache_key, job["job_id"])
+    worker_pool.notify()
     
     return {
-        "job_id": job_id,
+        "job_id": job["job_id"],
         "status": "started",
-        "message": "Analysis job queued successfully"
+        "message": "Analysis job queued successfully",
+        "deduplicated": False
     }
 
-async def run_analysis_job(job_id: str, fasta_file: str, request: AnalysisRequest):
-    """Run analysis job in background"""
-    job = analysis_jobs[job_id]
-    
-    try:
-        # Update status
-        job.status = "running"
-        job.message = "Loading model..."
-        job.progress = 10.0
-        
-        # Load model if not already loaded
-        if pipeline.model is None:
-            await asyncio.get_event_loop().run_in_executor(
-                executor, pipeline.load_model
-            )
-        
-        job.message = "Loading FASTA data..."
-        job.progress = 20.0
-        
-        # Load data
-        await asyncio.get_event_loop().run_in_executor(
-            executor, 
-            pipeline.load_fasta_data,
-            fasta_file,
-            request.sample_size
-        )
-        
-        job.message = "Generating DNA embeddings..."
-        job.progress = 40.0
-        
-        # Generate embeddings
-        await asyncio.get_event_loop().run_in_executor(
-            executor, pipeline.generate_dna_embeddings
-        )
-        
-        job.message = "Processing environmental context..."
-        job.progress = 60.0
-        
-        await asyncio.get_event_loop().run_in_executor(
-            executor, pipeline.generate_context_embeddings
-        )
-        
-        await asyncio.get_event_loop().run_in_executor(
-            executor, pipeline.fuse_embeddings
-        )
-        
-        job.message = "Performing clustering analysis..."
-        job.progress = 80.0
-        
-        # Clustering
-        await asyncio.get_event_loop().run_in_executor(
-            executor,
-            pipeline.perform_clustering,
-            request.min_cluster_size,
-            request.cluster_epsilon
-        )
-        
-        job.message = "Generating reports..."
-        job.progress = 90.0
-        
-        # Generate results
-        output_dir = f"results/{job_id}"
-        results = await asyncio.get_event_loop().run_in_executor(
-            executor,
-            pipeline.export_results,
-            output_dir
-        )
-        
-        # Complete job
-        job.status = "completed"
-        job.progress = 100.0
-        job.message = "Analysis completed successfully"
-        job.completed_at = datetime.now()
-        job.results = results
-        
-        logger.info(f"Analysis job {job_id} completed successfully")
-        
-    except Exception as e:
-        job.status = "failed"
-        job.message = f"Analysis failed: {str(e)}"
-        job.completed_at = datetime.now()
-        logger.error(f"Analysis job {job_id} failed: {e}")
-
 @app.get("/jobs/{job_id}", response_model=AnalysisStatus)
 async def get_job_status(job_id: str):
     """Get analysis job status"""
-    if job_id not in analysis_jobs:
+    job = job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return analysis_jobs[job_id]
+    return job_to_status(job)
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """Stream job status and per-batch progress as Server-Sent Events"""
+    if job_store.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        last_payload = None
+        last_sent = asyncio.get_event_loop().time()
+        
+        while not await request.is_disconnected():
+            job = job_store.get(job_id)
+            if job is None:
+                yield "event: deleted\ndata: {}\n\n"
+                return
+            
+            payload = job_to_status(job).model_dump_json()
+            now = asyncio.get_event_loop().time()
+            if payload != last_payload:
+                yield f"event: progress\ndata: {payload}\n\n"
+                last_payload = payload
+                last_sent = now
+            elif now - last_sent >= SSE_KEEPALIVE_INTERVAL:
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                last_sent = now
+            
+            if job["status"] in TERMINAL_STATUSES:
+                yield f"event: done\ndata: {payload}\n\n"
+                return
+            
+            await asyncio.sleep(SSE_POLL_INTERVAL)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/jobs", response_model=List[AnalysisStatus])
-async def list_jobs():
+async def list_jobs(status: Optional[str] = None):
     """List all analysis jobs"""
-    return list(analysis_jobs.values())
+    return [job_to_status(job) for job in job_store.list_jobs(status)]
 
 @app.get("/results/{job_id}/biodiversity", response_model=BiodiversityMetrics)
 async def get_biodiversity_metrics(job_id: str):
     """Get biodiversity metrics for completed job"""
-    if job_id not in analysis_jobs:
-        raise HTTPException(status_code=404, detail="Job not found")
-    
-    job = analysis_jobs[job_id]
-    if job.status != "completed":
-        raise HTTPException(status_code=400, detail="Job not completed")
-    
-    # Load results from file
-    results_file = f"results/{job_id}/biodiversity_report.json"
-    if not Path(results_file).exists():
-        raise HTTPException(status_code=404, detail="Results file not found")
+    job = get_completed_job(job_id)
     
-    with open(results_file, 'r') as f:
-        data = json.load(f)
+    # Summary is stored with the job when it completes
+    if not job.get("summary"):
+        raise HTTPException(status_code=404, detail="Results not found")
     
-    return BiodiversityMetrics(**data['summary'])
+    return BiodiversityMetrics(**job["summary"])
 
 @app.get("/results/{job_id}/species")
-async def get_species_report(job_id: str):
-    """Get detailed species report"""
-    if job_id not in analysis_jobs:
-        raise HTTPException(status_code=404, detail="Job not found")
+async def get_species_report(
+    job_id: str,
+    sort_by: str = "abundance",
+    order: str = "desc",
+    cluster: Optional[int] = None,
+    min_abundance: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=1000),
+    include_sequences: bool = False
+):
+    """Get a page of the species report (per-sequence fields only on request)"""
+    if sort_by not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of: {', '.join(SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
     
-    job = analysis_jobs[job_id]
-    if job.status != "completed":
-        raise HTTPException(status_code=400, detail="Job not completed")
+    job = get_completed_job(job_id)
     
-    results_file = f"results/{job_id}/biodiversity_report.json"
-    if not Path(results_file).exists():
+    results_file = (job.get("results") or {}).get("main_report", "")
+    if not results_file or not Path(results_file).exists():
         raise HTTPException(status_code=404, detail="Results file not found")
     
-    with open(results_file, 'r') as f:
-        data = json.load(f)
+    # Parsing a large report is slow; only the first request pays for it
+    index = await asyncio.get_event_loop().run_in_executor(
+        None, report_cache.species_index, results_file
+    )
     
-    return data['species']
+    return index.query(
+        sort_by=sort_by,
+        descending=order == "desc",
+        cluster=cluster,
+        min_abundance=min_abundance,
+        offset=offset,
+        limit=limit,
+        include_sequences=include_sequences
+    )
 
 @app.get("/results/{job_id}/download/{file_type}")
 async def download_results(job_id: str, file_type: str):
     """Download result files"""
-    if job_id not in analysis_jobs:
-        raise HTTPException(status_code=404, detail="Job not found")
-    
-    job = analysis_jobs[job_id]
-    if job.status != "completed":
-        raise HTTPException(status_code=400, detail="Job not completed")
+    job = get_completed_job(job_id)
     
+    # Download names map onto the result keys written by export_results
     file_mapping = {
-        "report": f"results/{job_id}/biodiversity_report.json",
-        "novel": f"results/{job_id}/novel_candidates.fasta",
-        "clusters": f"results/{job_id}/cluster_analysis.json",
-        "csv": f"results/{job_id}/analysis_results.csv"
+        "report": "main_report",
+        "novel": "novel_fasta",
+        "clusters": "cluster_analysis",
+        "csv": "results_csv"
     }
     
     if file_type not in file_mapping:
         raise HTTPException(status_code=400, detail="Invalid file type")
     
-    file_path = file_mapping[file_type]
-    if not Path(file_path).exists():
+    file_path = (job.get("results") or {}).get(file_mapping[file_type])
+    if not file_path or not Path(file_path).exists():
         raise HTTPException(status_code=404, detail="File not found")
     
     return FileResponse(
@@ -345,17 +411,43 @@ async def download_results(job_id: str, file_type: str):
         filename=f"{job_id}_{file_type}.{file_path.split('.')[-1]}"
     )
 
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running analysis job"""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] in TERMINAL_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Job already {job['status']}")
+    
+    status = job_store.request_cancel(job_id)
+    if status == "running":
+        message = "Cancellation requested; the job stops at its next checkpoint"
+    else:
+        message = f"Job {status}"
+    
+    return {"job_id": job_id, "status": status, "message": message}
+
 @app.delete("/jobs/{job_id}")
 async def delete_job(job_id: str):
     """Delete analysis job and results"""
-    if job_id not in analysis_jobs:
+    job = job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    # Remove job from tracking
-    del analysis_jobs[job_id]
+    # Stop the job first; a running worker notices the deleted job at its next
+    # checkpoint and removes anything it wrote in the meantime
+    if job["status"] not in TERMINAL_STATUSES:
+        job_store.request_cancel(job_id)
+    
+    # Remove job from the store
+    job_store.delete(job_id)
     
     # Clean up result files
-    results_dir = Path(f"results/{job_id}")
+    main_report = (job.get("results") or {}).get("main_report")
+    if main_report:
+        report_cache.invalidate(main_report)
+    results_dir = Path(job["output_dir"])
     if results_dir.exists():
         import shutil
         shutil.rmtree(results_dir)
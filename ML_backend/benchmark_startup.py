@@ -0,0 +1,94 @@
+"""
+OceanEYE Startup Benchmark
+Measures cold-start import time of the API server with a per-import breakdown
+
+Each run imports the target module in a fresh interpreter with
+`python -X importtime`, so nothing is served from an already warm process.
+
+Usage:
+    python benchmark_startup.py                     # api_server, 5 runs
+    python benchmark_startup.py --module oceaneye_pipeline --runs 3 --top 30
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import(module: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """
+    Import a module in a fresh interpreter
+
+    Args:
+        module: Module to import
+
+    Returns:
+        Total import time in seconds, and per-import (self, cumulative) microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    timings: Dict[str, Tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        # Format: "import time: <self us> | <cumulative us> | <indented name>"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+
+    total = timings.get(module, (0, 0))[1] / 1e6
+    return total, timings
+
+
+def top_level_packages(timings: Dict[str, Tuple[int, int]]) -> List[Tuple[str, int]]:
+    """Cumulative microseconds per top-level package (self times summed)"""
+    packages: Dict[str, int] = {}
+    for name, (self_us, _) in timings.items():
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OceanEYE cold-start import time")
+    parser.add_argument("--module", default="api_server", help="Module to import (default: api_server)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh-interpreter runs (default: 5)")
+    parser.add_argument("--top", type=int, default=15, help="Packages/imports listed (default: 15)")
+    args = parser.parse_args()
+
+    totals = []
+    timings: Dict[str, Tuple[int, int]] = {}
+    for _ in range(args.runs):
+        total, timings = measure_import(args.module)
+        totals.append(total)
+
+    print(f"Cold import of '{args.module}' over {args.runs} runs:")
+    print(f"  median {statistics.median(totals):.3f}s  min {min(totals):.3f}s  max {max(totals):.3f}s")
+
+    print("\nSlowest top-level packages (last run, self time summed):")
+    for package, micros in top_level_packages(timings)[:args.top]:
+        print(f"  {micros / 1000:9.1f} ms  {package}")
+
+    print("\nSlowest individual imports (last run, cumulative):")
+    slowest = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (_, cumulative_us) in slowest[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {name}")
+
+    heavy = ("torch", "transformers", "sklearn", "hdbscan", "scipy", "Bio", "tqdm", "pandas")
+    loaded = [name for name in heavy if name in timings]
+    print(f"\nHeavy ML libraries imported at startup: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+OceanEYE Embedding Service
+Shared, dynamically batched nucleotide transformer inference for all workers
+
+A single service process keeps the model resident and embeds sequences for
+every analysis worker. Requests from concurrent jobs are merged into batches
+of similar token length, so padding stays small, and a batch is dispatched as
+soon as it is full or its oldest sequence has waited for the maximum latency.
+Each worker talks to the service through an EmbeddingClient, which the
+pipeline uses in place of a local model copy.
+"""
+
+import os
+import time
+import uuid
+import queue
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Run one shared embedding service instead of one model per worker
+EMBEDDING_SERVICE_ENABLED = os.environ.get("OCEANEYE_EMBEDDING_SERVICE", "0") == "1"
+
+# Maximum sequences per model batch
+MAX_BATCH_SIZE = int(os.environ.get("OCEANEYE_EMBED_BATCH_SIZE", "32"))
+
+# Maximum padded tokens per model batch (bounds activation memory)
+MAX_BATCH_TOKENS = int(os.environ.get("OCEANEYE_EMBED_BATCH_TOKENS", "16384"))
+
+# Seconds a sequence may wait for its batch to fill before it is dispatched anyway
+MAX_LATENCY = float(os.environ.get("OCEANEYE_EMBED_MAX_LATENCY", "0.05"))
+
+# Token-length width of a batching bucket
+BUCKET_WIDTH = 64
+
+# Sequences per client request, and requests a client keeps in flight
+REQUEST_SIZE = 64
+REQUEST_WINDOW = 4
+
+# Seconds a client waits for a reply before giving up
+REPLY_TIMEOUT = float(os.environ.get("OCEANEYE_EMBED_TIMEOUT", "600"))
+
+
+@dataclass
+class _Item:
+    """One tokenized sequence waiting to be embedded"""
+    client_id: int
+    request_id: str
+    position: int
+    input_ids: List[int]
+    arrived_at: float
+
+
+@dataclass
+class _PendingRequest:
+    """Embeddings collected so far for one client request"""
+    embeddings: np.ndarray
+    remaining: int
+
+
+class DynamicBatcher:
+    """
+    Groups queued sequences into length-bucketed batches with a latency deadline
+    """
+
+    def __init__(self,
+                 max_batch_size: int = MAX_BATCH_SIZE,
+                 max_batch_tokens: int = MAX_BATCH_TOKENS,
+                 max_latency: float = MAX_LATENCY,
+                 bucket_width: int = BUCKET_WIDTH):
+        """
+        Initialize the batcher
+
+        Args:
+            max_batch_size: Maximum sequences per batch
+            max_batch_tokens: Maximum padded tokens per batch
+            max_latency: Seconds the oldest sequence may wait before dispatch
+            bucket_width: Token-length width of a bucket
+        """
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_latency = max_latency
+        self.bucket_width = bucket_width
+        self._buckets: Dict[int, Deque[_Item]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def add(self, item: _Item) -> None:
+        """Queue a tokenized sequence"""
+        index = max(len(item.input_ids) - 1, 0) // self.bucket_width
+        self._buckets.setdefault(index, deque()).append(item)
+
+    def drop(self, client_id: int, request_ids: List[str]) -> None:
+        """Remove queued sequences of abandoned requests"""
+        dropped = set(request_ids)
+        for index, bucket in list(self._buckets.items()):
+            kept = deque(item for item in bucket
+                         if item.client_id != client_id or item.request_id not in dropped)
+            if kept:
+                self._buckets[index] = kept
+            else:
+                del self._buckets[index]
+
+    def next_deadline(self) -> Optional[float]:
+        """Time at which the oldest queued sequence must be dispatched"""
+        oldest = [bucket[0].arrived_at for bucket in self._buckets.values()]
+        return min(oldest) + self.max_latency if oldest else None
+
+    def next_batch(self, now: float) -> Optional[List[_Item]]:
+        """
+        Take the next batch that is ready
+
+        A bucket is ready when it holds a full batch, or when its oldest
+        sequence reached the latency deadline.
+
+        Args:
+            now: Current time.monotonic()
+
+        Returns:
+            Items of the batch, or None if no batch is ready yet
+        """
+        ready = None
+        for index, bucket in self._buckets.items():
+            full = len(bucket) >= self._capacity(index)
+            expired = now - bucket[0].arrived_at >= self.max_latency
+            if (full or expired) and (ready is None or bucket[0].arrived_at < self._buckets[ready][0].arrived_at):
+                ready = index
+        if ready is None:
+            return None
+
+        bucket = self._buckets[ready]
+        batch = [bucket.popleft() for _ in range(min(len(bucket), self._capacity(ready)))]
+        if not bucket:
+            del self._buckets[ready]
+        return batch
+
+    def _capacity(self, index: int) -> int:
+        """Batch size for a bucket, limited by the padded token budget"""
+        padded_length = (index + 1) * self.bucket_width
+        return max(1, min(self.max_batch_size, self.max_batch_tokens // padded_length))
+
+
+def _embed_batch(model, tokenizer, device, input_ids: List[List[int]]) -> np.ndarray:
+    """Mean-pooled embeddings of a padded batch, ignoring padding tokens"""
+    import torch
+
+    encoded = tokenizer.pad({"input_ids": input_ids}, padding=True, return_tensors="pt")
+    ids = encoded["input_ids"].to(device)
+    mask = encoded["attention_mask"].to(device)
+
+    with torch.no_grad():
+        hidden = model(input_ids=ids, attention_mask=mask).last_hidden_state
+
+    weights = mask.unsqueeze(-1).to(hidden.dtype)
+    pooled = (hidden * weights).sum(dim=1) / weights.sum(dim=1).clamp(min=1)
+    return pooled.float().cpu().numpy()
+
+
+def _service_main(requests, replies: List[Any], ready, model_name: Optional[str], device: str) -> None:
+    """Embedding service process entry point: serve requests until told to stop"""
+    # Imported here so only the service process pays for torch/transformers
+    from oceaneye_pipeline import OceanEYEPipeline
+
+    pipeline_kwargs = {"device": device}
+    if model_name:
+        pipeline_kwargs["model_name"] = model_name
+    pipeline = OceanEYEPipeline(**pipeline_kwargs)
+    pipeline.load_model()
+    model, tokenizer = pipeline.model, pipeline.tokenizer
+    hidden_size = model.config.hidden_size
+
+    batcher = DynamicBatcher()
+    pending: Dict[Tuple[int, str], _PendingRequest] = {}
+    ready.set()
+    logger.info(f"Embedding service ready on {pipeline.device}")
+
+    def handle(message) -> bool:
+        if message is None:
+            return False
+        kind, client_id, *payload = message
+        if kind == "embed":
+            request_id, sequences, max_length = payload
+            now = time.monotonic()
+            request = _PendingRequest(
+                embeddings=np.zeros((len(sequences), hidden_size), dtype=np.float32),
+                remaining=len(sequences)
+            )
+            pending[(client_id, request_id)] = request
+            for position, seq in enumerate(sequences):
+                ids = tokenizer(seq, truncation=True, max_length=max_length)["input_ids"]
+                batcher.add(_Item(client_id, request_id, position, ids, now))
+            if not sequences:
+                replies[client_id].put((request_id, request.embeddings))
+                del pending[(client_id, request_id)]
+        elif kind == "cancel":
+            request_ids = payload[0]
+            batcher.drop(client_id, request_ids)
+            for request_id in request_ids:
+                pending.pop((client_id, request_id), None)
+        return True
+
+    def run(batch: List[_Item]) -> None:
+        try:
+            embeddings = _embed_batch(model, tokenizer, pipeline.device, [item.input_ids for item in batch])
+        except Exception as e:
+            # Retry one by one so a single bad sequence cannot fail its batch
+            logger.warning(f"Batch of {len(batch)} failed ({e}), embedding sequences individually")
+            embeddings = np.zeros((len(batch), hidden_size), dtype=np.float32)
+            for row, item in enumerate(batch):
+                try:
+                    embeddings[row] = _embed_batch(model, tokenizer, pipeline.device, [item.input_ids])[0]
+                except Exception as item_error:
+                    # Zero embedding fallback, as in the in-process pipeline
+                    logger.warning(f"Failed to embed sequence: {item_error}")
+
+        for item, embedding in zip(batch, embeddings):
+            request = pending.get((item.client_id, item.request_id))
+            if request is None:
+                continue
+            request.embeddings[item.position] = embedding
+            request.remaining -= 1
+            if request.remaining == 0:
+                replies[item.client_id].put((item.request_id, request.embeddings))
+                del pending[(item.client_id, item.request_id)]
+
+    running = True
+    while running:
+        # Block until the next request, or until the oldest queued sequence is due
+        deadline = batcher.next_deadline()
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            running = handle(requests.get(timeout=timeout))
+            while running:
+                running = handle(requests.get_nowait())
+        except queue.Empty:
+            pass
+
+        while running:
+            batch = batcher.next_batch(time.monotonic())
+            if batch is None:
+                break
+            run(batch)
+            # Let newly arrived requests join the following batches
+            try:
+                while running:
+                    running = handle(requests.get_nowait())
+            except queue.Empty:
+                pass
+
+    logger.info("Embedding service stopped")
+
+
+class EmbeddingClient:
+    """
+    Worker-side handle to the embedding service, used as a pipeline embedder
+    """
+
+    def __init__(self, client_id: int, requests, replies, generation):
+        """
+        Initialize the client
+
+        Args:
+            client_id: Index of the worker (selects its reply queue)
+            requests: Service request queue
+            replies: This worker's reply queue
+            generation: Shared counter bumped whenever the service restarts
+        """
+        self.client_id = client_id
+        self.requests = requests
+        self.replies = replies
+        self.generation = generation
+
+    def embed_chunks(self, sequences: List[str], max_length: int = 512) -> Iterator[np.ndarray]:
+        """
+        Embed sequences through the service
+
+        Sequences are sent in small requests with several kept in flight, so
+        they can be batched with other jobs' sequences.
+
+        Args:
+            sequences: DNA sequences to embed
+            max_length: Maximum sequence length for tokenization
+
+        Yields:
+            Embeddings of consecutive chunks of `sequences`, in order
+        """
+        generation = self.generation.value
+        chunks = [sequences[i:i + REQUEST_SIZE] for i in range(0, len(sequences), REQUEST_SIZE)]
+        in_flight: List[str] = []
+        received: Dict[str, np.ndarray] = {}
+        next_chunk = 0
+
+        try:
+            while next_chunk < len(chunks) or in_flight:
+                while next_chunk < len(chunks) and len(in_flight) < REQUEST_WINDOW:
+                    request_id = uuid.uuid4().hex
+                    self.requests.put(("embed", self.client_id, request_id, chunks[next_chunk], max_length))
+                    in_flight.append(request_id)
+                    next_chunk += 1
+
+                waited = 0.0
+                while in_flight[0] not in received:
+                    if self.generation.value != generation:
+                        raise RuntimeError("Embedding service restarted during the request")
+                    if waited >= REPLY_TIMEOUT:
+                        raise RuntimeError(f"Embedding service did not reply within {REPLY_TIMEOUT:g}s")
+                    try:
+                        request_id, embeddings = self.replies.get(timeout=1.0)
+                    except queue.Empty:
+                        waited += 1.0
+                        continue
+                    # Replies of abandoned earlier requests are discarded
+                    if request_id in in_flight:
+                        received[request_id] = embeddings
+
+                yield received.pop(in_flight.pop(0))
+        finally:
+            if in_flight:
+                self.requests.put(("cancel", self.client_id, in_flight))
+
+
+class EmbeddingService:
+    """
+    Supervised embedding service process shared by a worker pool
+    """
+
+    def __init__(self, ctx, num_clients: int, model_name: Optional[str] = None, device: str = "auto"):
+        """
+        Initialize the service (not started yet)
+
+        Args:
+            ctx: Multiprocessing context used for the process and queues
+            num_clients: Number of worker processes that will send requests
+            model_name: HuggingFace model identifier (None for pipeline default)
+            device: Computing device for the model ('auto', 'cpu', 'cuda')
+        """
+        self.ctx = ctx
+        self.model_name = model_name
+        self.device = device
+        self.requests = ctx.Queue()
+        self.replies = [ctx.Queue() for _ in range(num_clients)]
+        self.generation = ctx.Value("i", 0)
+        self.ready = ctx.Event()
+        self.process = None
+
+    def start(self) -> None:
+        """Start (or restart) the service process"""
+        if self.process is not None:
+            with self.generation.get_lock():
+                self.generation.value += 1
+            self.ready.clear()
+        self.process = self.ctx.Process(
+            target=_service_main,
+            args=(self.requests, self.replies, self.ready, self.model_name, self.device),
+            name="oceaneye-embedding-service",
+            daemon=True
+        )
+        self.process.start()
+        logger.info("Embedding service started")
+
+    def is_alive(self) -> bool:
+        """Whether the service process is running"""
+        return self.process is not None and self.process.is_alive()
+
+    def client_args(self, client_id: int) -> Tuple[int, Any, Any, Any]:
+        """Arguments for building an EmbeddingClient inside a worker process"""
+        return client_id, self.requests, self.replies[client_id], self.generation
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the service process"""
+        if self.process is None:
+            return
+        self.requests.put(None)
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
@@ -0,0 +1,343 @@
+"""
+OceanEYE FASTA Upload
+Streaming, constant-memory ingestion of (optionally compressed) FASTA uploads
+
+Uploads are processed in fixed-size chunks: each chunk is decompressed
+(gzip/bzip2 detected from magic bytes), validated as FASTA, hashed and written
+to a temporary file. Nothing proportional to the file size is kept in memory,
+so multi-GB run files can be ingested while analysis jobs are running. The
+finished file is stored under its SHA-256 content digest, which also means the
+client-supplied filename is never used as a path.
+"""
+
+import os
+import bz2
+import zlib
+import uuid
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the client (and produced by the decompressor) per step
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Maximum decompressed upload size in bytes (0 = unlimited)
+MAX_UPLOAD_BYTES = int(os.environ.get("OCEANEYE_MAX_UPLOAD_BYTES", "0"))
+
+FASTA_EXTENSIONS = ('.fasta', '.fa', '.fas', '.fna')
+COMPRESSED_EXTENSIONS = ('.gz', '.bz2')
+
+# IUPAC nucleotide codes, gaps/stops and whitespace
+_SEQUENCE_BYTES = b"ACGTURYKMSWBDHVNacgturykmswbdhvn-.* \t\r\n"
+_WHITESPACE = b" \t\r\n"
+
+# Bytes needed to recognize the gzip (1f 8b) and bzip2 (BZh) magic
+_MAGIC_LENGTH = 3
+
+# Longest header kept for validation and error messages
+_MAX_HEADER_KEPT = 256
+
+
+class FastaValidationError(ValueError):
+    """Uploaded content is not valid FASTA"""
+
+
+class UploadTooLargeError(ValueError):
+    """Uploaded content exceeds MAX_UPLOAD_BYTES"""
+
+
+def is_fasta_filename(filename: str) -> bool:
+    """Whether a client filename looks like a (possibly compressed) FASTA file"""
+    name = Path(filename or "").name.lower()
+    for suffix in COMPRESSED_EXTENSIONS:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return name.endswith(FASTA_EXTENSIONS)
+
+
+class FastaStreamValidator:
+    """
+    Incremental FASTA validator fed with arbitrary byte chunks
+
+    Sequence regions are checked with bytes.translate, so the per-line work
+    stays in C; only headers are handled line by line.
+    """
+
+    def __init__(self):
+        self.records = 0
+        self.bases = 0
+        self._record_bases = 0
+        self._at_line_start = True
+        self._in_header = False
+        self._header = b""
+
+    def feed(self, data: bytes) -> None:
+        """Validate the next chunk of decompressed FASTA content"""
+        pos = 0
+        size = len(data)
+
+        while pos < size:
+            if self._in_header:
+                newline = data.find(b"\n", pos)
+                end = size if newline == -1 else newline
+                if len(self._header) < _MAX_HEADER_KEPT:
+                    self._header += data[pos:end][:_MAX_HEADER_KEPT - len(self._header)]
+                if newline == -1:
+                    return
+                self._end_header()
+                pos = newline + 1
+                continue
+
+            if self._at_line_start and data[pos:pos + 1] == b">":
+                self._start_record()
+                pos += 1
+                continue
+
+            # Sequence region: everything up to the next header line
+            next_header = data.find(b"\n>", pos)
+            end = size if next_header == -1 else next_header + 1
+            self._check_sequence(data[pos:end])
+            self._at_line_start = data[end - 1:end] == b"\n"
+            pos = end
+
+    def finish(self) -> Dict[str, int]:
+        """
+        Validate the end of the content
+
+        Returns:
+            Record and base counts
+        """
+        if self._in_header:
+            self._end_header()
+        if self.records == 0:
+            raise FastaValidationError("No sequences found in FASTA file")
+        self._check_record_has_sequence()
+        return {"records": self.records, "bases": self.bases}
+
+    def _start_record(self) -> None:
+        if self.records:
+            self._check_record_has_sequence()
+        self.records += 1
+        self._record_bases = 0
+        self._in_header = True
+        self._header = b""
+
+    def _end_header(self) -> None:
+        self._in_header = False
+        self._at_line_start = True
+        if not self._header.strip():
+            raise FastaValidationError(f"Record {self.records} has an empty header")
+
+    def _check_record_has_sequence(self) -> None:
+        if self._record_bases == 0:
+            raise FastaValidationError(
+                f"Record {self.records} ({self._header_id()}) has no sequence"
+            )
+
+    def _check_sequence(self, region: bytes) -> None:
+        invalid = region.translate(None, _SEQUENCE_BYTES)
+        if invalid:
+            where = f"record {self.records} ({self._header_id()})" if self.records else "start of file"
+            raise FastaValidationError(
+                f"Invalid character {chr(invalid[0])!r} at {where}; "
+                "FASTA must start with a '>' header followed by nucleotide sequence lines"
+            )
+        bases = len(region.translate(None, _WHITESPACE))
+        if not self.records:
+            if bases:
+                raise FastaValidationError(
+                    "Sequence data before the first header; FASTA must start with a '>' header line"
+                )
+            return
+        self._record_bases += bases
+        self.bases += bases
+
+    def _header_id(self) -> str:
+        parts = self._header.split()
+        return parts[0].decode("utf-8", "replace") if parts else ""
+
+
+class _Decompressor:
+    """Bounded-output streaming decompressor for gzip and bzip2 content"""
+
+    def __init__(self, compression: str, chunk_size: int):
+        self.compression = compression
+        self.chunk_size = chunk_size
+        self._engine = self._new_engine()
+
+    def _new_engine(self):
+        if self.compression == "gzip":
+            return zlib.decompressobj(zlib.MAX_WBITS | 16)
+        return bz2.BZ2Decompressor()
+
+    def decompress(self, data: bytes):
+        """Yield decompressed pieces of at most chunk_size bytes"""
+        while True:
+            if self._engine.eof:
+                # Concatenated .gz/.bz2 streams are valid; start the next member
+                if not data:
+                    return
+                self._engine = self._new_engine()
+
+            try:
+                out = self._engine.decompress(data, self.chunk_size)
+            except (zlib.error, OSError, EOFError) as e:
+                raise FastaValidationError(f"Corrupt compressed upload ({self.compression}): {e}")
+
+            if self._engine.eof:
+                # Bytes after the member end; zlib also leaves them in unconsumed_tail
+                data = self._engine.unused_data
+                more = bool(data)
+            elif self.compression == "gzip":
+                data = self._engine.unconsumed_tail
+                # A full output piece may leave output pending inside zlib
+                more = bool(data) or len(out) == self.chunk_size
+            else:
+                data = b""
+                more = not self._engine.needs_input
+
+            if out:
+                yield out
+            if not more:
+                return
+
+    def finish(self) -> bytes:
+        """Check the stream ended cleanly and return any buffered output"""
+        out = self._engine.flush() if self.compression == "gzip" else b""
+        if not self._engine.eof:
+            raise FastaValidationError(f"Compressed upload is truncated ({self.compression})")
+        return out
+
+
+class FastaUploadSink:
+    """
+    Receives raw upload chunks and writes validated FASTA to disk
+
+    Usage: call write() for every chunk received from the client, then
+    close() to finalize (or abort() on error).
+    """
+
+    def __init__(self,
+                 upload_dir: str = "uploads",
+                 filename: str = "upload.fasta",
+                 max_bytes: int = MAX_UPLOAD_BYTES,
+                 chunk_size: int = UPLOAD_CHUNK_SIZE):
+        """
+        Initialize the upload sink
+
+        Args:
+            upload_dir: Directory the finished file is stored in
+            filename: Client filename (only reported back, never used as a path)
+            max_bytes: Maximum decompressed size in bytes (0 = unlimited)
+            chunk_size: Maximum decompressed bytes processed per step
+        """
+        self.upload_dir = Path(upload_dir)
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self.filename = Path(filename or "upload.fasta").name
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+        self.compression: Optional[str] = None
+        self.received_bytes = 0
+        self.written_bytes = 0
+
+        self._sha256 = hashlib.sha256()
+        self._validator = FastaStreamValidator()
+        self._decompressor: Optional[_Decompressor] = None
+        self._started = False
+        self._head = b""
+        self._tmp_path = self.upload_dir / f".upload-{uuid.uuid4().hex}.part"
+        self._tmp = open(self._tmp_path, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        """Process the next raw chunk received from the client"""
+        if not chunk:
+            return
+
+        self.received_bytes += len(chunk)
+        if not self._started:
+            # Streamed bodies may arrive in pieces shorter than the magic bytes
+            self._head += chunk
+            if len(self._head) < _MAGIC_LENGTH:
+                return
+            chunk = self._start()
+
+        self._process(chunk)
+
+    def _start(self) -> bytes:
+        """Detect the compression from the buffered first bytes and return them"""
+        self._started = True
+        head, self._head = self._head, b""
+        if head[:2] == b"\x1f\x8b":
+            self.compression = "gzip"
+        elif head[:3] == b"BZh":
+            self.compression = "bzip2"
+        if self.compression:
+            self._decompressor = _Decompressor(self.compression, self.chunk_size)
+        return head
+
+    def _process(self, chunk: bytes) -> None:
+        if self._decompressor is None:
+            self._consume(chunk)
+        else:
+            for piece in self._decompressor.decompress(chunk):
+                self._consume(piece)
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Finalize the upload
+
+        Returns:
+            Stored path, digest, sizes and record counts
+        """
+        try:
+            if not self._started:
+                # Upload shorter than the magic bytes
+                self._process(self._start())
+            if self._decompressor is not None:
+                self._consume(self._decompressor.finish())
+            stats = self._validator.finish()
+            self._tmp.close()
+        except Exception:
+            self.abort()
+            raise
+
+        digest = self._sha256.hexdigest()
+        final_path = self.upload_dir / f"{digest}.fasta"
+        if final_path.exists():
+            # Identical content was uploaded before
+            os.remove(self._tmp_path)
+        else:
+            os.replace(self._tmp_path, final_path)
+
+        return {
+            "filename": self.filename,
+            "file_path": str(final_path),
+            "file_size": self.written_bytes,
+            "uploaded_bytes": self.received_bytes,
+            "compression": self.compression,
+            "sha256": digest,
+            "records": stats["records"],
+            "bases": stats["bases"]
+        }
+
+    def abort(self) -> None:
+        """Discard the partially written upload"""
+        if not self._tmp.closed:
+            self._tmp.close()
+        if self._tmp_path.exists():
+            os.remove(self._tmp_path)
+
+    def _consume(self, data: bytes) -> None:
+        if not data:
+            return
+        self.written_bytes += len(data)
+        if self.max_bytes and self.written_bytes > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {self.max_bytes} byte limit")
+        self._validator.feed(data)
+        self._sha256.update(data)
+        self._tmp.write(data)
@@ -0,0 +1,251 @@
+"""
+HTTP Caching and Compression
+ETag/Last-Modified revalidation and gzip/brotli response compression as ASGI middleware
+
+The demo API keeps its own copy (backend/http_cache.py) so each service
+deploys on its own; keep the two in step.
+
+Complete (non-streaming) successful GET responses get a weak ETag computed
+from the body; a request whose If-None-Match matches it is answered with an
+empty 304. Endpoints backed by a file can also set Last-Modified (see
+http_date()); a request without If-None-Match whose If-Modified-Since is not
+older than it gets a 304 as well. Responses above a size threshold are
+compressed with brotli (when the optional `brotli` package is installed) or gzip, according to the
+client's Accept-Encoding. Compressed bodies are kept in a small LRU keyed by
+ETag, so a repeated full load costs one hash instead of one compression.
+Server-sent event streams are passed through untouched.
+"""
+
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smallest body (bytes) worth compressing
+DEFAULT_MINIMUM_SIZE = 1024
+
+# Number of compressed bodies kept for reuse
+COMPRESSED_CACHE_SIZE = 64
+
+_UNCOMPRESSIBLE_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip")
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[str]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _without(headers: List[Tuple[bytes, bytes]], *names: bytes) -> List[Tuple[bytes, bytes]]:
+    return [(key, value) for key, value in headers if key.lower() not in names]
+
+
+def _with_encoding(headers: List[Tuple[bytes, bytes]], encoding: str) -> List[Tuple[bytes, bytes]]:
+    """Headers for a body compressed with `encoding` (length dropped, Vary extended)"""
+    vary = _header(headers, b"vary")
+    vary = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+    return _without(headers, b"content-length", b"vary") + [
+        (b"content-encoding", encoding.encode()),
+        (b"vary", vary.encode("latin-1"))
+    ]
+
+
+def accepted_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Preferred supported encoding of an Accept-Encoding header ('br', 'gzip' or None)"""
+    if not accept_encoding:
+        return None
+
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def http_date(mtime_ns: int) -> str:
+    """Last-Modified value of a file modification time (st_mtime_ns)"""
+    return formatdate(mtime_ns // 1_000_000_000, usegmt=True)
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: Optional[str]) -> bool:
+    """Whether a response last modified at `last_modified` is unchanged since If-Modified-Since"""
+    if not if_modified_since or not last_modified:
+        return False
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with 'br' or 'gzip'"""
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+class ETagCompressionMiddleware:
+    """
+    ASGI middleware adding ETag/If-None-Match handling and response compression
+    """
+
+    def __init__(self, app, minimum_size: int = DEFAULT_MINIMUM_SIZE):
+        """
+        Wrap an ASGI application
+
+        Args:
+            app: The application
+            minimum_size: Smallest body (bytes) that is compressed
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self._compressed: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = scope.get("headers", [])
+        is_get = scope["method"] == "GET"
+        if_none_match = _header(request_headers, b"if-none-match")
+        if_modified_since = _header(request_headers, b"if-modified-since")
+        encoding = accepted_encoding(_header(request_headers, b"accept-encoding"))
+
+        start_message = None
+        streaming = None  # zlib/brotli compressor of a streamed response, or False
+
+        async def send_wrapper(message):
+            nonlocal start_message, streaming
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if streaming is None and not more_body:
+                # Complete response in one message
+                await self._send_complete(start_message, body, is_get, if_none_match, if_modified_since, encoding, send)
+                return
+
+            if streaming is None:
+                streaming = self._start_stream(start_message, encoding)
+                await send(start_message)
+
+            if streaming:
+                body = streaming.process(body) if encoding == "br" else streaming.compress(body)
+                if not more_body:
+                    body += streaming.finish() if encoding == "br" else streaming.flush()
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compressible(self, headers: List[Tuple[bytes, bytes]]) -> bool:
+        content_type = _header(headers, b"content-type") or ""
+        return (
+            _header(headers, b"content-encoding") is None
+            and not content_type.startswith(_UNCOMPRESSIBLE_TYPES)
+        )
+
+    def _start_stream(self, start_message: dict, encoding: Optional[str]):
+        """Set up compression of a streamed response (mutates its start message)"""
+        headers = list(start_message.get("headers", []))
+        if encoding is None or not self._compressible(headers):
+            return False
+
+        start_message["headers"] = _with_encoding(headers, encoding)
+        if encoding == "br":
+            return brotli.Compressor(quality=5)
+        return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    async def _send_complete(self, start_message: dict, body: bytes, is_get: bool, if_none_match: Optional[str],
+                             if_modified_since: Optional[str], encoding: Optional[str], send) -> None:
+        status = start_message["status"]
+        headers = list(start_message.get("headers", []))
+        etag = None
+
+        if is_get and status == 200:
+            etag = _header(headers, b"etag")
+            if etag is None:
+                etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+                headers.append((b"etag", etag.encode()))
+                if _header(headers, b"cache-control") is None:
+                    headers.append((b"cache-control", b"no-cache"))
+
+            # If-Modified-Since only counts without If-None-Match (RFC 9110)
+            if (etag_matches(if_none_match, etag) if if_none_match
+                    else not_modified_since(if_modified_since, _header(headers, b"last-modified"))):
+                headers = _without(headers, b"content-length", b"content-type")
+                await send({"type": "http.response.start", "status": 304, "headers": headers})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        if encoding is not None and len(body) >= self.minimum_size and self._compressible(headers):
+            body = self._compress(body, encoding, etag)
+            headers = _with_encoding(headers, encoding) + [(b"content-length", str(len(body)).encode())]
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    def _compress(self, body: bytes, encoding: str, etag: Optional[str]) -> bytes:
+        """Compress a body, reusing the result for a body with the same ETag"""
+        if etag is None:
+            return compress(body, encoding)
+
+        key = (etag, encoding)
+        with self._lock:
+            cached = self._compressed.get(key)
+            if cached is not None:
+                self._compressed.move_to_end(key)
+                return cached
+
+        compressed = compress(body, encoding)
+        with self._lock:
+            self._compressed[key] = compressed
+            while len(self._compressed) > COMPRESSED_CACHE_SIZE:
+                self._compressed.popitem(last=False)
+        return compressed
@@ -0,0 +1,399 @@
+"""
+OceanEYE Job Store
+Durable SQLite-backed job queue and job store for the API server
+
+Jobs survive server restarts, carry a priority, and are claimed atomically by
+worker processes so that a queued job is only ever run by one worker.
+"""
+
+import os
+import json
+import uuid
+import socket
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# SQLite database file, resolved next to this module by default (not the working directory)
+DEFAULT_DB_PATH = os.environ.get(
+    "OCEANEYE_JOB_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "oceaneye_jobs.db")
+)
+
+# Statuses a job can no longer leave
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id       TEXT PRIMARY KEY,
+    status       TEXT NOT NULL,
+    priority     INTEGER NOT NULL DEFAULT 0,
+    progress     REAL NOT NULL DEFAULT 0,
+    message      TEXT NOT NULL DEFAULT '',
+    progress_detail TEXT,
+    fasta_file   TEXT NOT NULL,
+    params       TEXT NOT NULL,
+    output_dir   TEXT NOT NULL,
+    worker_id    TEXT,
+    worker_instance TEXT,
+    cancel_requested_at TEXT,
+    submitted_at TEXT NOT NULL,
+    started_at   TEXT,
+    completed_at TEXT,
+    results      TEXT,
+    summary      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority DESC, submitted_at);
+"""
+
+# Columns added after the table was first created, applied to existing databases
+_ADDED_COLUMNS = {
+    "progress_detail": "TEXT",
+    "cancel_requested_at": "TEXT",
+    "worker_instance": "TEXT",
+}
+
+_JSON_COLUMNS = ("params", "results", "summary", "progress_detail")
+
+
+def to_json_safe(value: Any) -> Any:
+    """Convert numpy scalars/keys and other non-JSON types to plain Python"""
+    if isinstance(value, dict):
+        return {to_json_safe(k): to_json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_safe(v) for v in value]
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def new_job_id() -> str:
+    """Unique, time-sortable job identifier"""
+    return f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def worker_identity(worker_index: int, pid: Optional[int] = None) -> str:
+    """Identifier stored on jobs claimed by a worker process"""
+    return f"{socket.gethostname()}:{pid or os.getpid()}:{worker_index}"
+
+
+def process_instance(pid: Optional[int] = None) -> Optional[str]:
+    """
+    Boot id and start time of a process (None where /proc is unavailable)
+
+    Together with the pid this identifies one process even after the OS has
+    reused its pid, e.g. for an unrelated process after a restart.
+    """
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            boot_id = f.read().strip()
+        with open(f"/proc/{pid or 'self'}/stat") as f:
+            # Fields after the parenthesized command name start at field 3; start time is field 22
+            start_time = f.read().rpartition(")")[2].split()[19]
+    except (OSError, IndexError):
+        return None
+    return f"{boot_id}:{start_time}"
+
+
+class JobStore:
+    """
+    SQLite job store shared by the API server and its worker processes
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        """
+        Initialize the job store, creating the database if needed
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open a short-lived autocommit connection (never shared across threads/processes)"""
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        for column in _JSON_COLUMNS:
+            if job.get(column) is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def create_job(self,
+                   fasta_file: str,
+                   params: Dict[str, Any],
+                   output_dir: Optional[str] = None,
+                   priority: int = 0) -> Dict[str, Any]:
+        """
+        Queue a new analysis job
+
+        Args:
+            fasta_file: Path to the input FASTA file
+            params: Analysis parameters
+            output_dir: Results directory (defaults to results/{job_id})
+            priority: Higher priority jobs are claimed first
+
+        Returns:
+            The stored job
+        """
+        job_id = new_job_id()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO jobs (job_id, status, priority, progress, message,
+                                  fasta_file, params, output_dir, submitted_at)
+                VALUES (?, 'pending', ?, 0, 'Analysis queued', ?, ?, ?, ?)
+                """,
+                (
+                    job_id,
+                    priority,
+                    fasta_file,
+                    json.dumps(params),
+                    output_dir or f"results/{job_id}",
+                    datetime.now().isoformat()
+                )
+            )
+        return self.get(job_id)
+
+    def claim_next(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claim the highest-priority pending job
+
+        Must be called from the worker process itself, whose instance (see
+        process_instance()) is stored with the job.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+
+        Returns:
+            The claimed job, or None if the queue is empty
+        """
+        with self._connect() as conn:
+            # IMMEDIATE takes the write lock up front, so two workers can
+            # never select the same pending row
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    """
+                    SELECT job_id FROM jobs
+                    WHERE status = 'pending'
+                    ORDER BY priority DESC, submitted_at ASC
+                    LIMIT 1
+                    """
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        """
+                        UPDATE jobs
+                        SET status = 'running', worker_id = ?, worker_instance = ?, started_at = ?,
+                            message = 'Analysis started'
+                        WHERE job_id = ?
+                        """,
+                        (worker_id, process_instance(), datetime.now().isoformat(), row["job_id"])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return self.get(row["job_id"]) if row is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        """Update columns of a job (JSON columns are serialized automatically)"""
+        if not fields:
+            return
+
+        values = []
+        for column, value in fields.items():
+            if column in _JSON_COLUMNS and value is not None:
+                value = json.dumps(to_json_safe(value))
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            values.append(value)
+
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*values, job_id))
+
+    def complete(self, job_id: str, results: Dict[str, str], summary: Dict[str, Any]) -> None:
+        """Mark a job completed and store its result files and summary"""
+        self.update(
+            job_id,
+            status="completed",
+            progress=100.0,
+            message="Analysis completed successfully",
+            completed_at=datetime.now(),
+            results=results,
+            summary=summary
+        )
+
+    def fail(self, job_id: str, message: str) -> None:
+        """Mark a job failed"""
+        self.update(job_id, status="failed", message=message, completed_at=datetime.now())
+
+    def cancel(self, job_id: str, message: str = "Analysis cancelled") -> None:
+        """Mark a job cancelled"""
+        self.update(job_id, status="cancelled", message=message, completed_at=datetime.now())
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a job: queued jobs are cancelled at once, running jobs are
+        flagged and stop at their worker's next checkpoint
+
+        Args:
+            job_id: Job to cancel
+
+        Returns:
+            The job status afterwards, or None if the job does not exist
+        """
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            # Conditional updates, so a job claimed in the meantime is flagged instead
+            conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'cancelled', message = 'Analysis cancelled', completed_at = ?,
+                    cancel_requested_at = ?
+                WHERE job_id = ? AND status = 'pending'
+                """,
+                (now, now, job_id)
+            )
+            conn.execute(
+                """
+                UPDATE jobs
+                SET cancel_requested_at = ?, message = 'Cancellation requested'
+                WHERE job_id = ? AND status = 'running' AND cancel_requested_at IS NULL
+                """,
+                (now, job_id)
+            )
+            row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["status"] if row is not None else None
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        """Whether a job should stop (cancellation requested or job deleted)"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT cancel_requested_at FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return row is None or row["cancel_requested_at"] is not None
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by id"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def list_jobs(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List jobs, newest first, optionally filtered by status"""
+        query = "SELECT * FROM jobs"
+        args: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        query += " ORDER BY submitted_at DESC"
+
+        with self._connect() as conn:
+            rows = conn.execute(query, args).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def count(self, status: str) -> int:
+        """Number of jobs with the given status"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def delete(self, job_id: str) -> bool:
+        """Delete a job record, returning whether it existed"""
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        return cursor.rowcount > 0
+
+    def fail_worker_jobs(self, worker_id: str, message: str) -> List[str]:
+        """Fail every job still marked running by the given worker"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'running' AND worker_id = ?",
+                (worker_id,)
+            ).fetchall()
+        job_ids = [row["job_id"] for row in rows]
+        for job_id in job_ids:
+            self.fail(job_id, message)
+        return job_ids
+
+    def requeue_interrupted(self) -> List[str]:
+        """
+        Return jobs left 'running' by dead workers on this host to the queue
+
+        Called at server startup: workers of a previous server process died
+        with it, so their jobs would otherwise stay 'running' forever. A worker
+        whose pid now belongs to another process (other start time or boot) is
+        dead as well.
+        """
+        hostname = socket.gethostname()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT job_id, worker_id, worker_instance FROM jobs WHERE status = 'running'"
+            ).fetchall()
+
+        requeued = []
+        for row in rows:
+            host, _, rest = (row["worker_id"] or "").partition(":")
+            pid = rest.split(":")[0]
+            if host != hostname or not pid.isdigit() or _owner_alive(int(pid), row["worker_instance"]):
+                continue
+            self.update(
+                row["job_id"],
+                status="pending",
+                progress=0.0,
+                message="Analysis re-queued after restart",
+                worker_id=None,
+                worker_instance=None,
+                started_at=None
+            )
+            requeued.append(row["job_id"])
+
+        if requeued:
+            logger.info(f"Re-queued {len(requeued)} interrupted jobs")
+        return requeued
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a process with the given pid exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _owner_alive(pid: int, instance: Optional[str]) -> bool:
+    """Whether the process that claimed a job still runs (not just some process with its pid)"""
+    if not _pid_alive(pid):
+        return False
+    if instance is None:
+        # Claimed where /proc is unavailable: the pid is all there is to go on
+        return True
+    current = process_instance(pid)
+    return current is None or current == instance
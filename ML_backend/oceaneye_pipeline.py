@@ -9,41 +9,50 @@ This module implements the complete eDNA analysis pipeline:
 4. HDBSCAN clustering for species identification
 5. Biodiversity metrics calculation (Shannon, confidence, abundance)
 6. JSON report generation with location and temporal data
+
+The heavy libraries (pandas, torch, transformers, sklearn, hdbscan, scipy,
+Bio, tqdm) are imported by the methods that use them, so importing this
+module - e.g. for PIPELINE_VERSION in the API server - stays fast.
 """
 
 import os
 import json
 import logging
+import importlib
 import numpy as np
-import pandas as pd
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional, Any
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple, Optional, Any
 from pathlib import Path
+import time
 
-# Bio libraries
-from Bio import SeqIO, Entrez
-from Bio.Seq import Seq
-
-# ML libraries
-import torch
-from transformers import AutoTokenizer, AutoModelForMaskedLM
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.cluster import KMeans
-from sklearn.metrics import adjusted_rand_score
-
-# Clustering libraries
-import hdbscan
-from scipy.cluster.hierarchy import linkage, fcluster
-from scipy.stats import entropy
+from shared_weights import MODEL_LOAD_MODE, load_shared_encoder
 
-# Progress tracking
-from tqdm.auto import tqdm
-import time
+if TYPE_CHECKING:
+    import pandas as pd
+    import torch
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Version recorded in reports; bump when results for the same input change
+PIPELINE_VERSION = "1.0.0"
+
+DEFAULT_MODEL_NAME = "InstaDeepAI/nucleotide-transformer-v2-500m-multi-species"
+
+# Heavy modules imported lazily by the pipeline methods, preloaded by warm_up()
+WARM_UP_MODULES = (
+    "pandas",
+    "hdbscan",
+    "scipy.stats",
+    "scipy.cluster.hierarchy",
+    "sklearn.preprocessing",
+    "Bio.SeqIO",
+)
+
+# Receives per-batch progress events: stage, done, total, throughput, eta
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
 
 class OceanEYEPipeline:
     """
@@ -51,9 +60,12 @@ class OceanEYEPipeline:
     """
     
     def __init__(self, 
-                 model_name: str = "InstaDeepAI/nucleotide-transformer-v2-500m-multi-species",
+                 model_name: str = DEFAULT_MODEL_NAME,
                  entrez_email: str = "research@oceaneye.ai",
-                 device: str = "auto"):
+                 device: str = "auto",
+                 progress_callback: Optional[ProgressCallback] = None,
+                 embedder: Optional[Any] = None,
+                 load_mode: str = MODEL_LOAD_MODE):
         """
         Initialize the OceanEYE pipeline
         
@@ -61,15 +73,24 @@ class OceanEYEPipeline:
             model_name: HuggingFace model identifier for nucleotide transformer
             entrez_email: Email for NCBI Entrez API access
             device: Computing device ('auto', 'cpu', 'cuda')
+            progress_callback: Called after every batch of long-running stages
+            embedder: Remote embedder used instead of a local model, providing
+                embed_chunks(sequences, max_length) (e.g. embedding_service.EmbeddingClient)
+            load_mode: 'default' (private weights) or 'mmap' (weights shared
+                read-only between processes, see shared_weights.py)
         """
         self.model_name = model_name
         self.entrez_email = entrez_email
-        self.device = self._setup_device(device)
+        self._device_spec = device
+        self._device = None
+        self.progress_callback = progress_callback
+        self.embedder = embedder
+        self.load_mode = load_mode
         
         # Initialize components
         self.tokenizer = None
         self.model = None
-        self.scaler = MinMaxScaler()
+        self.scaler = None
         
         # Data storage
         self.df = None
@@ -77,10 +98,59 @@ class OceanEYEPipeline:
         self.context_embeddings = None
         self.context_aware_embeddings = None
         
-        logger.info(f"OceanEYE Pipeline initialized with device: {self.device}")
+        logger.info(f"OceanEYE Pipeline initialized with device: {device}")
+    
+    def reset_state(self) -> None:
+        """Clear per-analysis data while keeping the loaded model"""
+        self.scaler = None
+        self.df = None
+        self.dna_embeddings = None
+        self.context_embeddings = None
+        self.context_aware_embeddings = None
+    
+    def _report_progress(self, stage: str, done: int, total: int, started_at: float) -> None:
+        """
+        Report progress of a batched stage to the progress callback
+        
+        Args:
+            stage: Stage name (e.g. 'dna_embeddings')
+            done: Batches completed so far
+            total: Total number of batches in the stage
+            started_at: time.time() when the stage started
+        """
+        if self.progress_callback is None:
+            return
+        
+        elapsed = time.time() - started_at
+        throughput = done / elapsed if elapsed > 0 else 0.0
+        self.progress_callback({
+            'stage': stage,
+            'done': done,
+            'total': total,
+            'elapsed_seconds': round(elapsed, 2),
+            'throughput': round(throughput, 3),  # batches per second
+            'eta_seconds': round((total - done) / throughput, 1) if throughput > 0 else None
+        })
+    
+    def warm_up(self) -> None:
+        """Import the heavy libraries and load the model ahead of the first analysis"""
+        for module in WARM_UP_MODULES:
+            importlib.import_module(module)
+        
+        if self.model is None and self.embedder is None:
+            self.load_model()
     
-    def _setup_device(self, device: str) -> torch.device:
+    @property
+    def device(self) -> "torch.device":
+        """Computing device (resolved on first use, as it needs torch)"""
+        if self._device is None:
+            self._device = self._setup_device(self._device_spec)
+        return self._device
+    
+    def _setup_device(self, device: str) -> "torch.device":
         """Setup computing device"""
+        import torch
+        
         if device == "auto":
             return torch.device("cuda" if torch.cuda.is_available() else "cpu")
         return torch.device(device)
@@ -94,6 +164,8 @@ class OceanEYEPipeline:
         """
         logger.info(f"Loading model: {self.model_name}")
         
+        from transformers import AutoTokenizer, AutoModelForMaskedLM
+        
         try:
             # Login to HuggingFace if token provided
             if hf_token:
@@ -107,11 +179,15 @@ class OceanEYEPipeline:
                 trust_remote_code=True
             )
             
-            base_model = AutoModelForMaskedLM.from_pretrained(
-                self.model_name, 
-                trust_remote_code=True
-            )
-            self.model = base_model.esm
+            if self.load_mode == "mmap":
+                # Weights are mapped from a shared file, not copied per process
+                self.model = load_shared_encoder(self.model_name)
+            else:
+                base_model = AutoModelForMaskedLM.from_pretrained(
+                    self.model_name, 
+                    trust_remote_code=True
+                )
+                self.model = base_model.esm
             
             # Move to device
             self.model.to(self.device)
@@ -126,7 +202,7 @@ class OceanEYEPipeline:
     def load_fasta_data(self, 
                        fasta_path: str, 
                        sample_size: Optional[int] = None,
-                       simulate_metadata: bool = True) -> pd.DataFrame:
+                       simulate_metadata: bool = True) -> "pd.DataFrame":
         """
         Load sequences from FASTA file and prepare DataFrame
         
@@ -139,6 +215,9 @@ class OceanEYEPipeline:
             DataFrame with sequences and metadata
         """
         logger.info(f"Loading FASTA data from: {fasta_path}")
+        import pandas as pd
+        from Bio import SeqIO
+        
         print(f"🔍 DEBUG: Attempting to load FASTA file: {fasta_path}")
         print(f"🔍 DEBUG: File exists: {os.path.exists(fasta_path)}")
         print(f"🔍 DEBUG: Absolute path: {os.path.abspath(fasta_path)}")
@@ -192,6 +271,8 @@ class OceanEYEPipeline:
     
     def _add_environmental_metadata(self) -> None:
         """Add simulated environmental metadata to DataFrame"""
+        import pandas as pd
+        
         print(f"🔍 DEBUG: Adding environmental metadata for {len(self.df)} samples")
         num_samples = len(self.df)
         
@@ -228,14 +309,20 @@ class OceanEYEPipeline:
         """
         logger.info("Fetching taxonomic data from NCBI...")
         
+        from Bio import Entrez
+        from tqdm.auto import tqdm
+        
         Entrez.email = self.entrez_email
         accession_ids = self.df['Sequence_ID'].tolist()
         
         all_organisms = {}
         all_genera = {}
         
-        for i in tqdm(range(0, len(accession_ids), batch_size), 
-                     desc="Fetching taxonomy"):
+        total_batches = (len(accession_ids) + batch_size - 1) // batch_size
+        started_at = time.time()
+        
+        for batch_num, i in enumerate(tqdm(range(0, len(accession_ids), batch_size), 
+                                           desc="Fetching taxonomy"), start=1):
             batch_ids = accession_ids[i:i+batch_size]
             
             try:
@@ -262,6 +349,7 @@ class OceanEYEPipeline:
             except Exception as e:
                 logger.warning(f"Entrez error for batch {i}-{i+batch_size}: {e}")
             
+            self._report_progress('taxonomy', batch_num, total_batches, started_at)
             time.sleep(delay)  # Be polite to NCBI servers
         
         # Map to DataFrame
@@ -282,12 +370,21 @@ class OceanEYEPipeline:
         """
         logger.info("Generating DNA embeddings...")
         
+        if self.embedder is not None:
+            return self._generate_remote_dna_embeddings(max_length)
+        
         if self.model is None:
             raise ValueError("Model not loaded. Call load_model() first.")
         
+        import torch
+        from tqdm.auto import tqdm
+        
         embeddings = []
+        total = len(self.df)
+        started_at = time.time()
         
-        for seq in tqdm(self.df['sequence'], desc="DNA Embeddings"):
+        # Each sequence is one forward pass (batch)
+        for done, seq in enumerate(tqdm(self.df['sequence'], desc="DNA Embeddings"), start=1):
             try:
                 # Tokenize sequence
                 inputs = self.tokenizer(
@@ -311,12 +408,32 @@ class OceanEYEPipeline:
                 logger.warning(f"Failed to embed sequence: {e}")
                 # Use zero embedding as fallback
                 embeddings.append(np.zeros(self.model.config.hidden_size))
+            
+            self._report_progress('dna_embeddings', done, total, started_at)
         
         self.dna_embeddings = np.array(embeddings)
         logger.info(f"Generated DNA embeddings: {self.dna_embeddings.shape}")
         
         return self.dna_embeddings
     
+    def _generate_remote_dna_embeddings(self, max_length: int) -> np.ndarray:
+        """Generate DNA embeddings through the embedder (batched with other jobs)"""
+        sequences = self.df['sequence'].tolist()
+        total = len(sequences)
+        started_at = time.time()
+        
+        chunks = []
+        done = 0
+        for chunk in self.embedder.embed_chunks(sequences, max_length):
+            chunks.append(chunk)
+            done += len(chunk)
+            self._report_progress('dna_embeddings', done, total, started_at)
+        
+        self.dna_embeddings = np.concatenate(chunks) if chunks else np.empty((0, 0), dtype=np.float32)
+        logger.info(f"Generated DNA embeddings: {self.dna_embeddings.shape}")
+        
+        return self.dna_embeddings
+    
     def generate_context_embeddings(self) -> np.ndarray:
         """
         Generate environmental context embeddings
@@ -332,6 +449,9 @@ class OceanEYEPipeline:
             context_features.extend(['salinity', 'pH'])
         
         # Normalize features
+        if self.scaler is None:
+            from sklearn.preprocessing import MinMaxScaler
+            self.scaler = MinMaxScaler()
         context_data = self.df[context_features].fillna(0)
         self.context_embeddings = self.scaler.fit_transform(context_data)
         
@@ -376,6 +496,7 @@ class OceanEYEPipeline:
             Array of cluster labels
         """
         logger.info("Performing HDBSCAN clustering...")
+        import hdbscan
         
         clusterer = hdbscan.HDBSCAN(
             min_cluster_size=min_cluster_size,
@@ -427,6 +548,7 @@ class OceanEYEPipeline:
         # Species-level metrics
         if 'organism' in self.df.columns:
             print(f"🔍 DEBUG: Organism column found, calculating species metrics...")
+            from scipy.stats import entropy
             species_counts = self.df['organism'].value_counts()
             metrics['total_species'] = len(species_counts)
             metrics['shannon_diversity'] = entropy(species_counts)
@@ -467,6 +589,9 @@ class OceanEYEPipeline:
             logger.warning("No organism data available for species report")
             return {}
         
+        from scipy.cluster.hierarchy import linkage, fcluster
+        from scipy.stats import entropy
+        
         species_groups = self.df.groupby('organism')
         species_report = {}
         
@@ -549,7 +674,7 @@ class OceanEYEPipeline:
         logger.info(f"Exporting results to: {output_dir}")
         
         # Create output directory
-        Path(output_dir).mkdir(exist_ok=True)
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
         
         file_paths = {}
         
@@ -559,7 +684,7 @@ class OceanEYEPipeline:
         
         main_report = {
             'metadata': {
-                'pipeline_version': '1.0.0',
+                'pipeline_version': PIPELINE_VERSION,
                 'analysis_date': datetime.now().isoformat(),
                 'model_used': self.model_name,
                 'total_sequences_analyzed': len(self.df)
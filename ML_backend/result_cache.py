@@ -0,0 +1,206 @@
+"""
+OceanEYE Result Cache
+Request-level deduplication of analysis jobs
+
+Submissions are keyed by the FASTA content digest, the analysis parameters,
+the model and the pipeline version. An identical submission is answered with
+the existing completed job, or attached to the identical job still in flight.
+Entries expire after a TTL and the least recently used ones are evicted once
+the cache is full; evicting an entry never deletes the job itself.
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from job_store import JobStore
+
+logger = logging.getLogger(__name__)
+
+# Seconds a completed result may be reused
+DEFAULT_TTL = int(os.environ.get("OCEANEYE_RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Maximum number of cache entries kept (least recently used are evicted first)
+DEFAULT_MAX_ENTRIES = int(os.environ.get("OCEANEYE_RESULT_CACHE_SIZE", "1000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS result_cache (
+    cache_key    TEXT PRIMARY KEY,
+    job_id       TEXT NOT NULL,
+    created_at   TEXT NOT NULL,
+    last_used_at TEXT NOT NULL,
+    hits         INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_result_cache_lru ON result_cache (last_used_at);
+"""
+
+# Digests of files already hashed, keyed by (path, size, mtime)
+_digest_cache: Dict[Tuple[str, int, int], str] = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    SHA-256 of a file's content, read in chunks and memoized per file version
+
+    Args:
+        path: File to hash
+        chunk_size: Bytes read per chunk
+
+    Returns:
+        Hex digest
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        if key in _digest_cache:
+            return _digest_cache[key]
+
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    digest = sha256.hexdigest()
+
+    with _digest_lock:
+        _digest_cache[key] = digest
+    return digest
+
+
+def prime_digest(path: str, digest: str) -> None:
+    """Record a digest computed elsewhere (e.g. while streaming an upload)"""
+    stat = os.stat(path)
+    with _digest_lock:
+        _digest_cache[(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)] = digest
+
+
+def make_cache_key(content_digest: str,
+                   params: Dict[str, Any],
+                   model_name: str,
+                   pipeline_version: str) -> str:
+    """Stable key for an analysis of the given content with the given settings"""
+    payload = {
+        "content": content_digest,
+        "sample_size": params.get("sample_size"),
+        "min_cluster_size": params.get("min_cluster_size"),
+        "cluster_epsilon": params.get("cluster_epsilon"),
+        "fetch_taxonomy": params.get("fetch_taxonomy"),
+        "model": model_name,
+        "pipeline_version": pipeline_version
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Maps analysis cache keys to the job holding (or producing) the result
+    """
+
+    def __init__(self,
+                 store: JobStore,
+                 ttl_seconds: int = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the cache in the job store's database
+
+        Args:
+            store: Job store the cached job ids refer to
+            ttl_seconds: Seconds a completed result may be reused
+            max_entries: Maximum number of entries kept
+        """
+        self.store = store
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.store.db_path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def lookup(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the job for a cache key
+
+        Returns:
+            The completed or in-flight job, or None on a miss
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM result_cache WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        job = self.store.get(row["job_id"])
+        usable = job is not None and job["status"] in ("pending", "running", "completed")
+        if usable and job["status"] == "completed":
+            finished = datetime.fromisoformat(job["completed_at"])
+            usable = datetime.now() - finished <= self.ttl
+
+        if not usable:
+            self.forget(cache_key)
+            return None
+
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE result_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?",
+                (datetime.now().isoformat(), cache_key)
+            )
+        return job
+
+    def remember(self, cache_key: str, job_id: str) -> None:
+        """Record the job producing the result for a cache key"""
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO result_cache (cache_key, job_id, created_at, last_used_at, hits)
+                VALUES (?, ?, ?, ?, 0)
+                """,
+                (cache_key, job_id, now, now)
+            )
+        self.evict()
+
+    def forget(self, cache_key: str) -> None:
+        """Drop a cache entry"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM result_cache WHERE cache_key = ?", (cache_key,))
+
+    def evict(self) -> int:
+        """
+        Drop entries older than the TTL and the least recently used overflow
+
+        Returns:
+            Number of entries evicted
+        """
+        cutoff = (datetime.now() - self.ttl).isoformat()
+        with self._connect() as conn:
+            expired = conn.execute(
+                "DELETE FROM result_cache WHERE last_used_at < ?", (cutoff,)
+            ).rowcount
+            overflow = conn.execute(
+                """
+                DELETE FROM result_cache WHERE cache_key IN (
+                    SELECT cache_key FROM result_cache
+                    ORDER BY last_used_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            ).rowcount
+
+        if expired or overflow:
+            logger.info(f"Result cache evicted {expired} expired and {overflow} LRU entries")
+        return expired + overflow
@@ -0,0 +1,146 @@
+"""
+OceanEYE Shared Weights
+Memory-mapped nucleotide transformer weights shared by all processes
+
+In 'mmap' load mode the encoder weights are exported once to a cache file and
+every process (worker, embedding service, extra uvicorn worker) maps that file
+read-only instead of materializing its own copy. The model skeleton is built on
+the meta device, so no memory is allocated for weights at all; the tensors are
+then attached directly from the mapping. All processes share the same page
+cache pages, so a new process only adds its private working memory.
+"""
+
+import os
+import re
+import inspect
+import logging
+from contextlib import contextmanager
+from itertools import chain
+from typing import Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+# 'default' loads a private copy per process, 'mmap' maps shared cached weights
+MODEL_LOAD_MODE = os.environ.get("OCEANEYE_MODEL_LOAD_MODE", "default")
+
+# Directory holding the exported weight files
+MODEL_CACHE_DIR = os.environ.get(
+    "OCEANEYE_MODEL_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_cache")
+)
+
+
+def weights_path(model_name: str, cache_dir: str = MODEL_CACHE_DIR) -> str:
+    """Path of the exported encoder weights for a model"""
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+    return os.path.join(cache_dir, f"{safe_name}.pt")
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock across processes (no-op where fcntl is unavailable)"""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    with open(path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _named_tensors(module) -> Dict[str, "torch.Tensor"]:
+    """All parameters and buffers, including tied and non-persistent ones"""
+    return {
+        name: tensor.detach()
+        for name, tensor in chain(
+            module.named_parameters(remove_duplicate=False),
+            module.named_buffers(remove_duplicate=False)
+        )
+    }
+
+
+def _export_weights(model_name: str, path: str) -> None:
+    """Load the model once and write its encoder tensors to `path`"""
+    import torch
+    from transformers import AutoModelForMaskedLM
+
+    encoder = AutoModelForMaskedLM.from_pretrained(model_name, trust_remote_code=True).esm
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    # torch.save keeps tied tensors sharing one storage
+    torch.save(_named_tensors(encoder), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _load_tensors(path: str) -> Dict[str, "torch.Tensor"]:
+    """Load exported tensors, memory-mapped where torch supports it (2.1+)"""
+    import torch
+
+    if "mmap" in inspect.signature(torch.load).parameters:
+        return torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+
+    logger.warning(
+        f"torch {torch.__version__} cannot memory-map {path} (needs torch>=2.1); "
+        f"loading a private copy of the weights instead"
+    )
+    return torch.load(path, map_location="cpu", weights_only=True)
+
+
+def _attach_tensors(module, tensors: Dict[str, "torch.Tensor"]) -> None:
+    """Replace (meta) parameters and buffers with the given tensors without copying"""
+    import torch
+
+    for name, tensor in tensors.items():
+        owner_path, _, attr = name.rpartition(".")
+        owner = module.get_submodule(owner_path)
+        if attr in owner._parameters:
+            owner._parameters[attr] = torch.nn.Parameter(tensor, requires_grad=False)
+        else:
+            owner._buffers[attr] = tensor
+
+
+def load_shared_encoder(model_name: str, cache_dir: str = MODEL_CACHE_DIR):
+    """
+    Load the nucleotide transformer encoder with memory-mapped shared weights
+
+    The first caller exports the weights (serialized by a file lock); later
+    callers, in any process, only map the file.
+
+    Args:
+        model_name: HuggingFace model identifier
+        cache_dir: Directory holding the exported weight files
+
+    Returns:
+        The encoder (equivalent to AutoModelForMaskedLM.from_pretrained(...).esm)
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForMaskedLM
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = weights_path(model_name, cache_dir)
+
+    with _file_lock(f"{path}.lock"):
+        if not os.path.exists(path):
+            logger.info(f"Exporting shared weights for {model_name} to {path}")
+            _export_weights(model_name, path)
+
+    tensors = _load_tensors(path)
+
+    config = AutoConfig.from_pretrained(model_name, trust_remote_code=True)
+    with torch.device("meta"):
+        encoder = AutoModelForMaskedLM.from_config(config, trust_remote_code=True).esm
+    _attach_tensors(encoder, tensors)
+
+    missing = [name for name, tensor in _named_tensors(encoder).items() if tensor.is_meta]
+    if missing:
+        raise RuntimeError(
+            f"Shared weights in {path} do not cover {len(missing)} tensors "
+            f"(e.g. {missing[0]}); delete the file to re-export it"
+        )
+
+    logger.info(f"Attached weights from {path}")
+    return encoder
@@ -0,0 +1,157 @@
+"""
+OceanEYE Species Index
+Cached, queryable view of the species section of biodiversity reports
+
+Parsed reports are kept in a small in-process LRU keyed by file path and
+validated against the file's size and mtime, so a report is read and parsed
+once instead of on every request. Each cached report is indexed (presorted
+orders, cluster membership) so a page of species can be served without
+touching the per-sequence data.
+"""
+
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Number of parsed reports kept in memory
+REPORT_CACHE_SIZE = int(os.environ.get("OCEANEYE_REPORT_CACHE_SIZE", "8"))
+
+SORT_FIELDS = ("abundance", "confidence", "name")
+
+# Per-sequence fields, only returned on request
+SEQUENCE_FIELDS = (
+    "locations", "time_metadata", "hierarchical_clusters",
+    "sequences", "sequence_ids", "cluster_ids"
+)
+
+
+class SpeciesIndex:
+    """
+    Species of one report, presorted and indexed by cluster
+    """
+
+    def __init__(self, species: Dict[str, Dict[str, Any]]):
+        """
+        Build the index
+
+        Args:
+            species: The report's 'species' mapping (name -> entry)
+        """
+        self.names = list(species)
+        self.entries = [species[name] for name in self.names]
+
+        by_name = sorted(range(len(self.names)), key=lambda i: self.names[i])
+        self._orders = {
+            "name": by_name,
+            "abundance": sorted(by_name, key=lambda i: -self.entries[i].get("abundance", 0)),
+            "confidence": sorted(by_name, key=lambda i: -self.entries[i].get("confidence_score", 0.0)),
+        }
+
+        self._clusters: Dict[str, set] = {}
+        for i, entry in enumerate(self.entries):
+            for cluster_id in entry.get("cluster_distribution", {}):
+                self._clusters.setdefault(str(cluster_id), set()).add(i)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def query(self,
+              sort_by: str = "abundance",
+              descending: bool = True,
+              cluster: Optional[int] = None,
+              min_abundance: int = 0,
+              offset: int = 0,
+              limit: int = 50,
+              include_sequences: bool = False) -> Dict[str, Any]:
+        """
+        Get one page of species
+
+        Args:
+            sort_by: 'abundance', 'confidence' or 'name'
+            descending: Sort in descending order
+            cluster: Only species with sequences in this cluster
+            min_abundance: Only species with at least this many sequences
+            offset: Number of matching species to skip
+            limit: Maximum number of species returned
+            include_sequences: Include the per-sequence fields
+
+        Returns:
+            Total number of matches and the requested page
+        """
+        if sort_by not in self._orders:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_FIELDS)}")
+
+        # Abundance and confidence are stored descending, names ascending
+        order = self._orders[sort_by]
+        if descending == (sort_by == "name"):
+            order = order[::-1]
+
+        members = self._clusters.get(str(cluster), set()) if cluster is not None else None
+        matches = [
+            i for i in order
+            if (members is None or i in members)
+            and self.entries[i].get("abundance", 0) >= min_abundance
+        ]
+
+        page = [self._species(i, include_sequences) for i in matches[offset:offset + limit]]
+        return {"total": len(matches), "offset": offset, "limit": limit, "species": page}
+
+    def _species(self, i: int, include_sequences: bool) -> Dict[str, Any]:
+        entry = self.entries[i]
+        if not include_sequences:
+            entry = {key: value for key, value in entry.items() if key not in SEQUENCE_FIELDS}
+        return {"species_name": self.names[i], **entry}
+
+
+class ReportCache:
+    """
+    LRU of parsed biodiversity reports with their species indexes
+    """
+
+    def __init__(self, max_entries: int = REPORT_CACHE_SIZE):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Number of reports kept in memory
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], SpeciesIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def species_index(self, path: str) -> SpeciesIndex:
+        """
+        Species index of a report file, parsed on first use or after it changed
+
+        Args:
+            path: Path to biodiversity_report.json
+        """
+        stat = os.stat(path)
+        version = (stat.st_size, stat.st_mtime_ns)
+        key = os.path.abspath(path)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == version:
+                self._entries.move_to_end(key)
+                return cached[1]
+
+        with open(path, 'r') as f:
+            index = SpeciesIndex(json.load(f).get("species", {}))
+
+        with self._lock:
+            self._entries[key] = (version, index)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def invalidate(self, path: str) -> None:
+        """Drop a report from the cache"""
+        with self._lock:
+            self._entries.pop(os.path.abspath(path), None)
@@ -0,0 +1,79 @@
+"""
+Tests for the streaming FASTA upload sink (compressed and chunked input)
+"""
+
+import bz2
+import gzip
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fasta_upload import FastaUploadSink, FastaValidationError, UPLOAD_CHUNK_SIZE  # noqa: E402
+
+RECORD_A = b">seq1 sample\nACGTACGTNNACGT\nACGT\n"
+RECORD_B = b">seq2\n" + b"ACGTTGCA" * 4096 + b"\n"
+
+
+def upload(tmp_path, data: bytes, piece_size: int, chunk_size: int = UPLOAD_CHUNK_SIZE) -> dict:
+    """Feed data to a sink in pieces of piece_size bytes and close it"""
+    sink = FastaUploadSink(upload_dir=str(tmp_path), chunk_size=chunk_size)
+    for start in range(0, len(data), piece_size):
+        sink.write(data[start:start + piece_size])
+    return sink.close()
+
+
+def stored(result: dict) -> bytes:
+    with open(result["file_path"], "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("piece_size", [1, 2, 7, 4096, UPLOAD_CHUNK_SIZE])
+@pytest.mark.parametrize("chunk_size", [64, UPLOAD_CHUNK_SIZE])
+def test_multi_member_gzip(tmp_path, piece_size, chunk_size):
+    data = gzip.compress(RECORD_A) + gzip.compress(RECORD_B)
+    result = upload(tmp_path, data, piece_size, chunk_size)
+
+    assert result["compression"] == "gzip"
+    assert result["records"] == 2
+    assert stored(result) == RECORD_A + RECORD_B
+
+
+@pytest.mark.parametrize("piece_size", [1, 2, 7, 4096, UPLOAD_CHUNK_SIZE])
+@pytest.mark.parametrize("chunk_size", [64, UPLOAD_CHUNK_SIZE])
+def test_bzip2_streams(tmp_path, piece_size, chunk_size):
+    data = bz2.compress(RECORD_A) + bz2.compress(RECORD_B)
+    result = upload(tmp_path, data, piece_size, chunk_size)
+
+    assert result["compression"] == "bzip2"
+    assert result["records"] == 2
+    assert stored(result) == RECORD_A + RECORD_B
+
+
+@pytest.mark.parametrize("piece_size", [1, 2, 3])
+def test_plain_fasta_in_small_pieces(tmp_path, piece_size):
+    result = upload(tmp_path, RECORD_A, piece_size)
+
+    assert result["compression"] is None
+    assert stored(result) == RECORD_A
+
+
+def test_upload_shorter_than_magic_bytes(tmp_path):
+    # Buffered until close() and then validated as plain text
+    with pytest.raises(FastaValidationError, match="no sequence"):
+        upload(tmp_path, b">a", 1)
+
+
+def test_truncated_gzip(tmp_path):
+    data = gzip.compress(RECORD_B)
+    with pytest.raises(FastaValidationError):
+        upload(tmp_path, data[:len(data) // 2], 4096)
+
+
+def test_corrupt_gzip(tmp_path):
+    data = bytearray(gzip.compress(RECORD_B))
+    data[20:40] = b"\xff" * 20
+    with pytest.raises(FastaValidationError):
+        upload(tmp_path, bytes(data), 4096)
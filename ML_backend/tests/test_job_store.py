@@ -0,0 +1,167 @@
+"""
+Tests for the SQLite job queue: claiming, cancellation and requeueing
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_store import JobStore, process_instance, worker_identity  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def dead_pid() -> int:
+    """Pid of a process that has exited"""
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def claim_concurrently(store: JobStore, claimers: int) -> list:
+    """claim_next from several threads at once (each uses its own connection)"""
+    barrier = threading.Barrier(claimers)
+    claimed = [None] * claimers
+
+    def claim(index):
+        barrier.wait()
+        claimed[index] = store.claim_next(worker_identity(index))
+
+    threads = [threading.Thread(target=claim, args=(index,)) for index in range(claimers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return claimed
+
+
+@pytest.mark.parametrize("attempt", range(10))
+def test_two_claimers_race_for_one_job(store, attempt):
+    job = store.create_job("sample.fasta", {})
+
+    claimed = claim_concurrently(store, 2)
+
+    winners = [result for result in claimed if result is not None]
+    assert len(winners) == 1
+    assert winners[0]["job_id"] == job["job_id"]
+    assert winners[0]["status"] == "running"
+    assert store.get(job["job_id"])["worker_id"] == winners[0]["worker_id"]
+
+
+def test_each_job_is_claimed_once(store):
+    job_ids = {store.create_job("sample.fasta", {})["job_id"] for _ in range(20)}
+
+    claimed = []
+    while True:
+        results = [result for result in claim_concurrently(store, 4) if result is not None]
+        if not results:
+            break
+        claimed += [result["job_id"] for result in results]
+
+    assert sorted(claimed) == sorted(job_ids)
+
+
+def test_claim_order(store):
+    low = store.create_job("sample.fasta", {})
+    first = store.create_job("sample.fasta", {}, priority=5)
+    second = store.create_job("sample.fasta", {}, priority=5)
+
+    assert [store.claim_next("w")["job_id"] for _ in range(3)] == [
+        first["job_id"], second["job_id"], low["job_id"]
+    ]
+    assert store.claim_next("w") is None
+
+
+def test_cancel_pending_job(store):
+    job = store.create_job("sample.fasta", {})
+
+    assert store.request_cancel(job["job_id"]) == "cancelled"
+    cancelled = store.get(job["job_id"])
+    assert cancelled["completed_at"] is not None
+    assert store.is_cancel_requested(job["job_id"])
+    # A cancelled job is never claimed
+    assert store.claim_next("w") is None
+
+
+def test_cancel_running_job(store):
+    job = store.create_job("sample.fasta", {})
+    store.claim_next("w")
+
+    # The worker stops at its next checkpoint and records the cancellation itself
+    assert store.request_cancel(job["job_id"]) == "running"
+    running = store.get(job["job_id"])
+    assert running["cancel_requested_at"] is not None
+    assert running["message"] == "Cancellation requested"
+    assert store.is_cancel_requested(job["job_id"])
+
+    # Repeated requests keep the first request time
+    assert store.request_cancel(job["job_id"]) == "running"
+    assert store.get(job["job_id"])["cancel_requested_at"] == running["cancel_requested_at"]
+
+
+def test_cancel_finished_or_unknown_job(store):
+    job = store.create_job("sample.fasta", {})
+    store.claim_next("w")
+    store.complete(job["job_id"], {}, {})
+
+    assert store.request_cancel(job["job_id"]) == "completed"
+    assert not store.is_cancel_requested(job["job_id"])
+    assert store.request_cancel("no_such_job") is None
+
+
+def test_requeue_after_crash(store):
+    job = store.create_job("sample.fasta", {})
+    store.claim_next(worker_identity(0, dead_pid()))
+
+    assert store.requeue_interrupted() == [job["job_id"]]
+    requeued = store.get(job["job_id"])
+    assert requeued["status"] == "pending"
+    assert requeued["worker_id"] is None
+    assert requeued["started_at"] is None
+    assert store.claim_next("w")["job_id"] == job["job_id"]
+
+
+def test_running_owner_is_not_requeued(store):
+    job = store.create_job("sample.fasta", {})
+    store.claim_next(worker_identity(0))
+
+    assert store.requeue_interrupted() == []
+    assert store.get(job["job_id"])["status"] == "running"
+
+
+def test_other_hosts_jobs_are_not_requeued(store):
+    job = store.create_job("sample.fasta", {})
+    store.claim_next(f"not-{socket.gethostname()}:{dead_pid()}:0")
+
+    assert store.requeue_interrupted() == []
+    assert store.get(job["job_id"])["status"] == "running"
+
+
+@pytest.mark.skipif(process_instance() is None, reason="process start times need /proc")
+def test_requeue_when_owner_pid_was_reused(store):
+    job = store.create_job("sample.fasta", {})
+    # Claimed by an earlier process that had this test process' pid
+    store.claim_next(worker_identity(0))
+    boot_id, _, start_time = process_instance().rpartition(":")
+    store.update(job["job_id"], worker_instance=f"{boot_id}:{int(start_time) - 1}")
+
+    assert store.requeue_interrupted() == [job["job_id"]]
+    assert store.get(job["job_id"])["worker_instance"] is None
+
+
+def test_claim_stores_the_process_instance(store):
+    job = store.create_job("sample.fasta", {})
+    store.claim_next(worker_identity(0))
+
+    assert store.get(job["job_id"])["worker_instance"] == process_instance()
+    if process_instance() is not None:
+        assert process_instance(os.getpid()) == process_instance()
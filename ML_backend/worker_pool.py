@@ -0,0 +1,491 @@
+"""
+OceanEYE Worker Pool
+Process-isolated execution of analysis jobs for the API server
+
+Each worker is a separate process that owns one OceanEYEPipeline. The
+nucleotide transformer is loaded once per worker and reused for every job the
+worker runs, while the per-job state (DataFrame, embeddings, scaler) is reset
+before each job so concurrent jobs can never see each other's data.
+
+Workers pull jobs from the shared JobStore, claiming them atomically, and
+write status and results back to it.
+
+Running jobs pass a checkpoint between pipeline stages and after every batch,
+where they stop if cancellation was requested or their wall-clock or memory
+budget is used up. The supervisor terminates workers that do not reach a
+checkpoint in time (e.g. during one very long forward pass).
+
+With OCEANEYE_EMBEDDING_SERVICE=1 the workers do not load the model at all:
+they send their sequences to one shared EmbeddingService process, which
+batches the sequences of all running jobs together.
+"""
+
+import gc
+import os
+import time
+import queue
+import shutil
+import logging
+import threading
+import multiprocessing as mp
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from embedding_service import EmbeddingService, EmbeddingClient, EMBEDDING_SERVICE_ENABLED
+from job_store import JobStore, DEFAULT_DB_PATH, worker_identity
+
+logger = logging.getLogger(__name__)
+
+# Number of worker processes (= analysis jobs that can run at the same time)
+DEFAULT_NUM_WORKERS = int(os.environ.get("OCEANEYE_WORKERS", "2"))
+
+# Seconds an idle worker waits before checking the store for queued jobs
+POLL_INTERVAL = float(os.environ.get("OCEANEYE_POLL_INTERVAL", "2.0"))
+
+# Minimum seconds between per-batch progress writes to the store
+PROGRESS_INTERVAL = float(os.environ.get("OCEANEYE_PROGRESS_INTERVAL", "0.5"))
+
+# Load the model in each worker right after it starts instead of on its first job
+WARMUP = os.environ.get("OCEANEYE_WARMUP", "0") == "1"
+
+# Default per-job wall-clock budget in seconds (0 = unlimited)
+DEFAULT_JOB_TIMEOUT = float(os.environ.get("OCEANEYE_JOB_TIMEOUT", "0"))
+
+# Default per-job budget for the worker's resident memory in MB (0 = unlimited)
+DEFAULT_JOB_MAX_MEMORY_MB = float(os.environ.get("OCEANEYE_JOB_MAX_MEMORY_MB", "0"))
+
+# Seconds a job may overrun its time budget or cancellation before its worker is killed
+KILL_GRACE = float(os.environ.get("OCEANEYE_KILL_GRACE", "30"))
+
+# Minimum seconds between cancellation checks against the store
+CANCEL_CHECK_INTERVAL = 1.0
+
+# Overall job progress range (%) covered by each batched pipeline stage
+STAGE_PROGRESS = {
+    "taxonomy": (10.0, 20.0),
+    "dna_embeddings": (20.0, 80.0),
+}
+
+
+class JobCancelled(Exception):
+    """The running job was cancelled or deleted"""
+
+
+class JobBudgetExceeded(Exception):
+    """The running job used up its wall-clock or memory budget"""
+
+
+def job_budgets(params: Dict[str, Any]) -> Tuple[float, float]:
+    """Wall-clock (seconds) and memory (MB) budgets of a job, 0 meaning unlimited"""
+    max_runtime = params.get("max_runtime_seconds")
+    max_memory = params.get("max_memory_mb")
+    return (
+        DEFAULT_JOB_TIMEOUT if max_runtime is None else float(max_runtime),
+        DEFAULT_JOB_MAX_MEMORY_MB if max_memory is None else float(max_memory)
+    )
+
+
+def resident_memory_mb(pid: Optional[int] = None) -> Optional[float]:
+    """
+    Private resident memory of a process in MB (None where /proc is unavailable)
+
+    Shared file-backed pages, such as memory-mapped model weights, are not
+    counted: they are not owned by the process.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            fields = f.read().split()
+        pages = int(fields[1]) - int(fields[2])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class JobGuard:
+    """
+    Cooperative checkpoint for a running job's cancellation and budgets
+    """
+
+    def __init__(self, store: JobStore, job_id: str, max_runtime: float, max_memory_mb: float):
+        """
+        Initialize the guard when the job starts
+
+        Args:
+            store: Job store holding the cancellation flag
+            job_id: Guarded job
+            max_runtime: Wall-clock budget in seconds (0 = unlimited)
+            max_memory_mb: Resident memory budget in MB (0 = unlimited)
+        """
+        self.store = store
+        self.job_id = job_id
+        self.max_runtime = max_runtime
+        self.max_memory_mb = max_memory_mb
+        self.started = time.monotonic()
+        self._last_cancel_check = self.started
+
+    def memory_exceeded(self) -> bool:
+        """Whether the worker is over the job's memory budget"""
+        rss = resident_memory_mb()
+        return bool(self.max_memory_mb) and rss is not None and rss > self.max_memory_mb
+
+    def check(self, force: bool = False) -> None:
+        """
+        Raise if the job has to stop
+
+        Args:
+            force: Check the cancellation flag even if it was checked recently
+
+        Raises:
+            JobCancelled: Cancellation was requested or the job was deleted
+            JobBudgetExceeded: The wall-clock or memory budget is used up
+        """
+        now = time.monotonic()
+        if self.max_runtime and now - self.started > self.max_runtime:
+            raise JobBudgetExceeded(f"wall-clock budget of {self.max_runtime:g}s exceeded")
+
+        if self.memory_exceeded():
+            raise JobBudgetExceeded(
+                f"memory budget of {self.max_memory_mb:g} MB exceeded "
+                f"({resident_memory_mb():.0f} MB resident)"
+            )
+
+        if force or now - self._last_cancel_check >= CANCEL_CHECK_INTERVAL:
+            self._last_cancel_check = now
+            if self.store.is_cancel_requested(self.job_id):
+                raise JobCancelled()
+
+
+def _stage_progress_handler(emit: Callable[..., None],
+                            checkpoint: Callable[[], None]) -> Callable[[Dict[str, Any]], None]:
+    """Turn per-batch pipeline events into checkpoints and throttled job progress updates"""
+    last_emit = [0.0]
+
+    def on_progress(event: Dict[str, Any]) -> None:
+        checkpoint()
+
+        now = time.time()
+        finished = event["done"] >= event["total"]
+        if not finished and now - last_emit[0] < PROGRESS_INTERVAL:
+            return
+        last_emit[0] = now
+
+        start, end = STAGE_PROGRESS.get(event["stage"], (None, None))
+        fields = {"progress_detail": event}
+        if start is not None and event["total"]:
+            fields["progress"] = round(start + (end - start) * event["done"] / event["total"], 1)
+        emit(**fields)
+
+    return on_progress
+
+
+def run_job(pipeline,
+            job: Dict[str, Any],
+            emit: Callable[..., None],
+            checkpoint: Optional[Callable[[], None]] = None) -> Dict[str, str]:
+    """
+    Run all analysis stages for a single job on a worker's pipeline
+
+    Args:
+        pipeline: OceanEYEPipeline owned by the calling worker
+        job: Claimed job (job_id, fasta_file, params, output_dir)
+        emit: Callback used to report progress updates
+        checkpoint: Called between stages and batches; raises to stop the job
+
+    Returns:
+        Dictionary mapping result types to file paths
+    """
+    params = job["params"]
+    checkpoint = checkpoint or (lambda: None)
+
+    def stage(progress: float, message: str, **fields) -> None:
+        checkpoint()
+        emit(progress=progress, message=message, **fields)
+
+    # Start from a clean slate, keeping the already loaded model
+    pipeline.reset_state()
+    pipeline.progress_callback = _stage_progress_handler(emit, checkpoint)
+
+    stage(2.0, "Loading model...", progress_detail=None)
+    if pipeline.model is None and pipeline.embedder is None:
+        pipeline.load_model()
+
+    stage(5.0, "Loading FASTA data...")
+    pipeline.load_fasta_data(job["fasta_file"], params.get("sample_size"))
+
+    if params.get("fetch_taxonomy"):
+        stage(10.0, "Fetching taxonomy from NCBI...")
+        pipeline.fetch_taxonomic_data()
+
+    stage(20.0, "Generating DNA embeddings...")
+    pipeline.generate_dna_embeddings()
+
+    stage(80.0, "Processing environmental context...", progress_detail=None)
+    pipeline.generate_context_embeddings()
+    pipeline.fuse_embeddings()
+
+    stage(85.0, "Performing clustering analysis...")
+    pipeline.perform_clustering(
+        params.get("min_cluster_size", 10),
+        params.get("cluster_epsilon", 0.1)
+    )
+
+    stage(95.0, "Generating reports...")
+    return pipeline.export_results(job["output_dir"])
+
+
+def _worker_main(worker_index: int,
+                 db_path: str,
+                 wakeup,
+                 model_name: Optional[str],
+                 device: str,
+                 embedding_client_args: Optional[tuple] = None) -> None:
+    """Worker process entry point: claim and run jobs until told to stop"""
+    # Imported here so only worker processes pay for torch/transformers
+    from oceaneye_pipeline import OceanEYEPipeline
+
+    store = JobStore(db_path)
+    worker_id = worker_identity(worker_index)
+
+    pipeline_kwargs = {"device": device}
+    if model_name:
+        pipeline_kwargs["model_name"] = model_name
+    if embedding_client_args is not None:
+        pipeline_kwargs["embedder"] = EmbeddingClient(*embedding_client_args)
+    pipeline = OceanEYEPipeline(**pipeline_kwargs)
+
+    logger.info(f"Worker {worker_id} started")
+
+    if WARMUP:
+        # The API server is already serving; only this worker's first job waits
+        try:
+            pipeline.warm_up()
+            logger.info(f"Worker {worker_id} warmed up")
+        except Exception as e:
+            logger.error(f"Worker {worker_id} warm-up failed, loading on first job instead: {e}")
+
+    recycle = False
+    while not recycle:
+        job = store.claim_next(worker_id)
+        if job is None:
+            try:
+                if wakeup.get(timeout=POLL_INTERVAL) is None:
+                    break
+            except queue.Empty:
+                pass
+            continue
+
+        job_id = job["job_id"]
+
+        def emit(**fields):
+            store.update(job_id, **fields)
+
+        guard = JobGuard(store, job_id, *job_budgets(job["params"]))
+        try:
+            results = run_job(pipeline, job, emit, guard.check)
+            # A job deleted during export must not leave its files behind
+            guard.check(force=True)
+            store.complete(job_id, results, pipeline.calculate_biodiversity_metrics())
+            logger.info(f"Worker {worker_id}: job {job_id} completed")
+        except JobCancelled:
+            if store.get(job_id) is None:
+                shutil.rmtree(job["output_dir"], ignore_errors=True)
+            else:
+                store.cancel(job_id)
+            logger.info(f"Worker {worker_id}: job {job_id} cancelled")
+        except JobBudgetExceeded as e:
+            store.fail(job_id, f"Analysis aborted: {e}")
+            logger.warning(f"Worker {worker_id}: job {job_id} aborted: {e}")
+        except Exception as e:
+            store.fail(job_id, f"Analysis failed: {str(e)}")
+            logger.error(f"Worker {worker_id}: job {job_id} failed: {e}")
+        finally:
+            pipeline.reset_state()
+            pipeline.progress_callback = None
+            gc.collect()
+
+        if guard.memory_exceeded():
+            # Memory the job grew into is not returned to the OS; let the
+            # supervisor replace this worker with a fresh process
+            logger.warning(f"Worker {worker_id} still over its memory budget, restarting")
+            recycle = True
+
+    logger.info(f"Worker {worker_id} stopped")
+
+
+class WorkerPool:
+    """
+    Pool of long-lived worker processes running OceanEYE analysis jobs
+    """
+
+    def __init__(self,
+                 num_workers: Optional[int] = None,
+                 db_path: str = DEFAULT_DB_PATH,
+                 model_name: Optional[str] = None,
+                 device: str = "auto",
+                 embedding_service: bool = EMBEDDING_SERVICE_ENABLED):
+        """
+        Initialize the worker pool
+
+        Args:
+            num_workers: Number of worker processes (defaults to OCEANEYE_WORKERS)
+            db_path: Path to the JobStore database shared with the workers
+            model_name: HuggingFace model identifier (None for pipeline default)
+            device: Computing device for the workers ('auto', 'cpu', 'cuda')
+            embedding_service: Share one batching embedding service between
+                workers instead of loading the model in every worker
+        """
+        self.num_workers = max(1, num_workers or DEFAULT_NUM_WORKERS)
+        self.db_path = db_path
+        self.model_name = model_name
+        self.device = device
+        self.store = JobStore(db_path)
+
+        # CUDA and torch thread pools do not survive fork()
+        self._ctx = mp.get_context("spawn")
+        self._wakeup = self._ctx.Queue()
+        self.embedding_service = (
+            EmbeddingService(self._ctx, self.num_workers, model_name, device)
+            if embedding_service else None
+        )
+
+        self._workers: Dict[int, Any] = {}
+        self._monitor: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        """Start worker processes and the supervisor thread"""
+        if self._monitor is not None:
+            return
+
+        self.store.requeue_interrupted()
+
+        if self.embedding_service is not None:
+            self.embedding_service.start()
+
+        for worker_index in range(self.num_workers):
+            self._spawn_worker(worker_index)
+
+        self._monitor = threading.Thread(
+            target=self._supervise,
+            name="oceaneye-worker-supervisor",
+            daemon=True
+        )
+        self._monitor.start()
+
+        logger.info(f"Worker pool started with {self.num_workers} workers")
+
+    def notify(self) -> None:
+        """Wake an idle worker after a job has been queued"""
+        self._wakeup.put(True)
+
+    def alive_workers(self) -> int:
+        """Number of worker processes currently alive"""
+        return sum(1 for process in self._workers.values() if process.is_alive())
+
+    def shutdown(self, timeout: float = 30.0) -> None:
+        """Stop all workers, waiting up to `timeout` seconds for running jobs"""
+        if self._monitor is None:
+            return
+
+        self._stopping.set()
+        for _ in self._workers:
+            self._wakeup.put(None)
+
+        for process in self._workers.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+        self._monitor.join(timeout=2.0)
+        self._monitor = None
+
+        if self.embedding_service is not None:
+            self.embedding_service.stop()
+
+        logger.info("Worker pool stopped")
+
+    def _spawn_worker(self, worker_index: int) -> None:
+        """Start (or restart) the worker process with the given index"""
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                worker_index, self.db_path, self._wakeup, self.model_name, self.device,
+                self.embedding_service.client_args(worker_index)
+                if self.embedding_service is not None else None
+            ),
+            name=f"oceaneye-worker-{worker_index}",
+            daemon=True
+        )
+        process.start()
+        self._workers[worker_index] = process
+
+    def _supervise(self) -> None:
+        """Fail the job of any worker that died and start a replacement"""
+        while not self._stopping.wait(1.0):
+            self._enforce_limits()
+
+            service = self.embedding_service
+            if service is not None and not service.is_alive() and not self._stopping.is_set():
+                # Requests in flight are lost; their jobs fail and can be resubmitted
+                logger.warning(f"Embedding service exited with code {service.process.exitcode}, restarting")
+                service.start()
+
+            for worker_index, process in list(self._workers.items()):
+                if process.is_alive() or self._stopping.is_set():
+                    continue
+
+                logger.warning(
+                    f"Worker {worker_index} exited with code {process.exitcode}, restarting"
+                )
+                self.store.fail_worker_jobs(
+                    worker_identity(worker_index, process.pid),
+                    f"Analysis failed: worker exited unexpectedly (code {process.exitcode})"
+                )
+                self._spawn_worker(worker_index)
+
+    def _enforce_limits(self) -> None:
+        """Terminate workers whose job ignored cancellation or overran its budgets"""
+        now = datetime.now()
+        for job in self.store.list_jobs("running"):
+            max_runtime, max_memory_mb = job_budgets(job["params"])
+            worker = self._find_worker(job["worker_id"])
+            if worker is None:
+                continue
+            worker_index, process = worker
+
+            started_at = datetime.fromisoformat(job["started_at"])
+            cancel_requested_at = job.get("cancel_requested_at")
+            rss = resident_memory_mb(process.pid) if max_memory_mb else None
+
+            if cancel_requested_at and \
+                    (now - datetime.fromisoformat(cancel_requested_at)).total_seconds() > KILL_GRACE:
+                status, message = "cancelled", "Analysis cancelled (worker terminated)"
+            elif max_runtime and (now - started_at).total_seconds() > max_runtime + KILL_GRACE:
+                status = "failed"
+                message = f"Analysis aborted: wall-clock budget of {max_runtime:g}s exceeded (worker terminated)"
+            elif rss is not None and rss > max_memory_mb:
+                status = "failed"
+                message = (f"Analysis aborted: memory budget of {max_memory_mb:g} MB exceeded "
+                           f"({rss:.0f} MB resident, worker terminated)")
+            else:
+                continue
+
+            logger.warning(f"Terminating worker {worker_index} running job {job['job_id']}: {message}")
+            process.terminate()
+            process.join(5.0)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+            # Record the reason before the dead worker is noticed and restarted
+            if status == "cancelled":
+                self.store.cancel(job["job_id"], message)
+            else:
+                self.store.fail(job["job_id"], message)
+
+    def _find_worker(self, worker_id: Optional[str]) -> Optional[Tuple[int, Any]]:
+        """Worker index and process for a worker identifier stored on a job"""
+        for worker_index, process in self._workers.items():
+            if process.is_alive() and worker_identity(worker_index, process.pid) == worker_id:
+                return worker_index, process
+        return None
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Static API Snapshot Build
+Render the read-only API responses into precompressed static JSON files
+
+Every parameterless GET response of the demo API is deterministic for a given
+sample catalog and fungal dataset, so it can be built once and served by a CDN
+or static hosting with no Python process. The responses are rendered through
+the real application (routing, validation and serialization included) for every
+catalog sample, every page of the batch reports, every unordered pair of
+samples (ids sorted; only for catalogs of up to --comparison-samples samples)
+and the fungal dataset, then written as `<api path>.json` with `.gz` (and `.br`
+when the optional `brotli` package is installed) siblings. `manifest.json` maps each API URL to its file,
+ETag and sizes. Files listed in a previous manifest that are no longer built
+are removed.
+
+Usage:
+    python build_static.py [--output ../public/api] [--comparison-samples 100]
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+import hashlib
+from itertools import combinations
+from typing import List, Tuple
+
+import main
+from http_cache import brotli, compress
+from registry import get_registry
+
+# Output directory; Vite copies public/ into the frontend build, serving it at /api
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "public", "api")
+
+MANIFEST_NAME = "manifest.json"
+
+# Largest catalog whose sample pairs are snapshotted (n*(n-1)/2 comparison files)
+DEFAULT_COMPARISON_SAMPLES = 100
+
+
+def snapshot_urls(comparison_samples: int = DEFAULT_COMPARISON_SAMPLES) -> List[Tuple[str, str]]:
+    """(path, query string) of every response in the snapshot"""
+    files = get_registry().files
+    urls = [("/fasta-files", "")]
+    # Every page of the batch report endpoint, at its default page size
+    urls += [("/analysis", f"offset={offset}") for offset in range(0, max(len(files), 1), main.ANALYSIS_PAGE_SIZE)]
+    for file_info in files:
+        urls.append((f"/analysis/{file_info['id']}", ""))
+        for view in ("species", "environmental", "neighbors"):
+            urls.append((f"/analysis/{file_info['id']}/{view}", ""))
+    urls += [("/analysis/fungal-28s", ""), ("/analysis/fungal-28s/map", ""), ("/analysis/fungal-28s/records", "")]
+    if len(files) <= comparison_samples:
+        # One file per unordered pair; clients request the ids sorted
+        for first, second in combinations(sorted(file_info["id"] for file_info in files), 2):
+            urls.append(("/comparison", f"file_ids={first},{second}"))
+    return urls
+
+
+def static_path(path: str, query: str) -> str:
+    """File (relative to the output directory) holding the response of a URL"""
+    if query:
+        # The queries in the snapshot are a comparison's `file_ids` and a report page's `offset`
+        name, _, value = query.partition('=')
+        path = f"{path}/{value}" if name == "file_ids" else f"{path}/{name}/{value}"
+    return f"{path.lstrip('/')}.json"
+
+
+async def render(path: str, query: str = "") -> Tuple[int, bytes]:
+    """Get the status and body of a GET request, served in-process by the app"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    status = None
+    chunks = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await main.app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def write_file(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def remove_stale(output: str, manifest: dict) -> int:
+    """Remove the files of a previous build that are not in the new manifest"""
+    manifest_path = os.path.join(output, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return 0
+    with open(manifest_path, 'r') as f:
+        previous = json.load(f)
+
+    built = {entry["file"] for entry in manifest["files"].values()}
+    removed = 0
+    for entry in previous.get("files", {}).values():
+        if entry["file"] in built:
+            continue
+        for suffix in ("", ".gz", ".br"):
+            stale = os.path.join(output, entry["file"] + suffix)
+            if os.path.exists(stale):
+                os.remove(stale)
+                removed += 1
+    return removed
+
+
+async def build(output: str, comparison_samples: int = DEFAULT_COMPARISON_SAMPLES) -> dict:
+    """
+    Render all snapshot responses into an output directory
+
+    Args:
+        output: Directory the files and manifest are written to
+        comparison_samples: Largest catalog whose sample pairs are included
+
+    Returns:
+        The manifest
+    """
+    # Same warm-up as the server's startup, so /neighbors is served from a complete matrix
+    main.get_fungal_dataset()
+    main.warm_report_cache()
+    main.load_distance_index()
+    main.sync_distance_index()
+
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    manifest = {"encodings": encodings, "files": {}}
+    if len(get_registry()) > comparison_samples:
+        print(f"⚠️  {len(get_registry())} samples > {comparison_samples}: comparisons are left to the live API")
+    for path, query in snapshot_urls(comparison_samples):
+        url = f"{path}?{query}" if query else path
+        status, body = await render(path, query)
+        if status != 200:
+            raise RuntimeError(f"GET {url} returned {status}: {body[:200].decode(errors='replace')}")
+
+        file_name = static_path(path, query)
+        target = os.path.join(output, file_name)
+        write_file(target, body)
+        entry = {
+            "file": file_name,
+            "etag": f'W/"{hashlib.sha256(body).hexdigest()[:32]}"',
+            "bytes": len(body),
+        }
+        for encoding in encodings:
+            compressed = compress(body, encoding)
+            write_file(f"{target}.{'gz' if encoding == 'gzip' else 'br'}", compressed)
+            entry[f"{encoding}_bytes"] = len(compressed)
+        manifest["files"][url] = entry
+
+    removed = remove_stale(output, manifest)
+    write_file(os.path.join(output, MANIFEST_NAME), json.dumps(manifest, indent=2).encode())
+    print(f"✅ Wrote {len(manifest['files'])} responses to {output} ({', '.join(encodings)}), removed {removed} stale files")
+    return manifest
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build the static API snapshot")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="output directory (default: ../public/api)")
+    parser.add_argument(
+        "--comparison-samples", type=int, default=DEFAULT_COMPARISON_SAMPLES,
+        help=f"snapshot sample pair comparisons only for catalogs up to this size (default {DEFAULT_COMPARISON_SAMPLES})"
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(build(os.path.abspath(args.output), args.comparison_samples))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
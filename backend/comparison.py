@@ -0,0 +1,201 @@
+"""
+Sample Comparison
+Vectorized beta-diversity between samples' species abundance profiles
+
+The species of all compared samples are mapped onto one vocabulary, giving a
+samples x species abundance matrix. Distances are computed for all pairs at
+once with array operations (in row blocks, so memory stays bounded):
+
+- Bray-Curtis over abundances
+- Jaccard over presence/absence
+- Weighted UniFrac over a taxonomy tree (kingdom > phylum > genus > species,
+  unit branch lengths), as no phylogeny is available for the detections
+
+All distance functions take a block of rows and the full matrix, so single
+rows can be (re)computed when a sample is added.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Bytes of temporary memory allowed per distance block
+BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def _row_blocks(n_rows: int, n_other: int, n_columns: int):
+    """Row ranges sized so a (rows x other x columns) float32 temporary fits BLOCK_BYTES"""
+    rows = max(1, BLOCK_BYTES // max(1, n_other * n_columns * 4))
+    for start in range(0, n_rows, rows):
+        yield start, min(start + rows, n_rows)
+
+
+def cityblock(X: np.ndarray, Y: Optional[np.ndarray] = None) -> np.ndarray:
+    """Pairwise L1 distances between the rows of X and the rows of Y (default X)"""
+    Y = X if Y is None else Y
+    distances = np.empty((len(X), len(Y)), dtype=np.float64)
+    for start, stop in _row_blocks(len(X), len(Y), X.shape[1]):
+        distances[start:stop] = np.abs(X[start:stop, None, :] - Y[None, :, :]).sum(axis=2)
+    return distances
+
+
+def bray_curtis(X: np.ndarray, Y: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Pairwise Bray-Curtis dissimilarity
+
+    Args:
+        X: Abundance rows (samples x species)
+        Y: Rows to compare against (default X)
+
+    Returns:
+        len(X) x len(Y) matrix, sum|a - b| / (sum a + sum b); 0 for two empty samples
+    """
+    Y = X if Y is None else Y
+    totals = X.sum(axis=1)[:, None] + Y.sum(axis=1)[None, :]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        distances = cityblock(X, Y) / totals
+    return np.nan_to_num(distances, nan=0.0)
+
+
+def jaccard(X: np.ndarray, Y: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Pairwise Jaccard distance over presence/absence
+
+    Args:
+        X: Abundance rows (samples x species); any positive value counts as present
+        Y: Rows to compare against (default X)
+
+    Returns:
+        len(X) x len(Y) matrix, 1 - |A & B| / |A | B|; 0 for two empty samples
+    """
+    A = (X > 0).astype(np.float32)
+    B = A if Y is None else (Y > 0).astype(np.float32)
+    shared = A @ B.T
+    union = A.sum(axis=1)[:, None] + B.sum(axis=1)[None, :] - shared
+    with np.errstate(invalid="ignore", divide="ignore"):
+        distances = 1.0 - shared / union
+    return np.nan_to_num(distances, nan=0.0).astype(np.float64)
+
+
+def taxonomy_profile(species: List[dict], abundances: np.ndarray, nodes: Dict[tuple, int]) -> np.ndarray:
+    """
+    Relative abundance of every taxonomy tree node (clade) in one sample
+
+    Args:
+        species: The sample's species entries ('kingdom', 'phylum', 'scientific_name')
+        abundances: Abundance of each entry
+        nodes: Node index by lineage prefix; new nodes are added to it
+
+    Returns:
+        Node proportions (index by nodes), summing to 1 per rank
+    """
+    total = float(abundances.sum())
+    weights: Dict[int, float] = {}
+    for entry, abundance in zip(species, abundances.tolist()):
+        name = entry.get("scientific_name", "")
+        lineage = (entry.get("kingdom", "Unknown"), entry.get("phylum", "Unknown"), name.split(" ")[0], name)
+        for depth in range(1, len(lineage) + 1):
+            node = nodes.setdefault(lineage[:depth], len(nodes))
+            weights[node] = weights.get(node, 0.0) + (abundance / total if total > 0 else 0.0)
+
+    profile = np.zeros(len(nodes), dtype=np.float32)
+    for node, weight in weights.items():
+        profile[node] = weight
+    return profile
+
+
+def weighted_unifrac(P: np.ndarray, Q: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Pairwise normalized weighted UniFrac over node proportions (unit branch lengths)
+
+    Args:
+        P: Node proportion rows (taxonomy_profile output, padded to one width)
+        Q: Rows to compare against (default P)
+
+    Returns:
+        len(P) x len(Q) matrix, sum|p - q| / sum(p + q) over all branches
+    """
+    return bray_curtis(P, Q)
+
+
+def abundance_matrix(species_lists: List[List[dict]]) -> Tuple[np.ndarray, List[str]]:
+    """
+    Samples x species abundance matrix over the union of the samples' species
+
+    Args:
+        species_lists: Each sample's species entries ('scientific_name', 'abundance')
+
+    Returns:
+        float32 matrix and the species name of each column
+    """
+    columns: Dict[str, int] = {}
+    rows, cols, values = [], [], []
+    for row, species in enumerate(species_lists):
+        for entry in species:
+            rows.append(row)
+            cols.append(columns.setdefault(entry["scientific_name"], len(columns)))
+            values.append(entry.get("abundance", 0.0))
+
+    matrix = np.zeros((len(species_lists), len(columns)), dtype=np.float32)
+    # Accumulate repeated names within a sample
+    np.add.at(matrix, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)), values)
+    return matrix, list(columns)
+
+
+def taxonomy_matrix(species_lists: List[List[dict]]) -> np.ndarray:
+    """Samples x taxonomy-node proportion matrix (see taxonomy_profile)"""
+    nodes: Dict[tuple, int] = {}
+    profiles = [
+        taxonomy_profile(species, np.asarray([entry.get("abundance", 0.0) for entry in species]), nodes)
+        for species in species_lists
+    ]
+    matrix = np.zeros((len(profiles), len(nodes)), dtype=np.float32)
+    for row, profile in enumerate(profiles):
+        matrix[row, :len(profile)] = profile
+    return matrix
+
+
+def _rounded(matrix: np.ndarray) -> List[List[float]]:
+    return np.round(matrix, 4).tolist()
+
+
+def compare_species(sample_ids: List[str], species_lists: List[List[dict]]) -> dict:
+    """
+    Compare samples by their species composition
+
+    Args:
+        sample_ids: Identifier of each sample
+        species_lists: Each sample's species entries
+
+    Returns:
+        Distance matrices (0 = identical) and similarity matrices (1 -
+        distance, 1 = identical), rows/columns in sample_ids order, the species
+        shared by all samples and the species unique to each sample
+    """
+    abundances, species_names = abundance_matrix(species_lists)
+    distances = {
+        "bray_curtis": bray_curtis(abundances),
+        "jaccard": jaccard(abundances),
+        "weighted_unifrac": weighted_unifrac(taxonomy_matrix(species_lists))
+    }
+    present = abundances > 0
+    occurrences = present.sum(axis=0)
+
+    shared = [species_names[i] for i in np.flatnonzero(occurrences == len(sample_ids)).tolist()]
+    unique = {
+        sample_id: [species_names[i] for i in np.flatnonzero(present[row] & (occurrences == 1)).tolist()]
+        for row, sample_id in enumerate(sample_ids)
+    }
+
+    return {
+        "distance_matrices": {
+            "sample_ids": sample_ids,
+            **{metric: _rounded(matrix) for metric, matrix in distances.items()}
+        },
+        "similarity_matrices": {
+            "sample_ids": sample_ids,
+            **{metric: _rounded(1.0 - matrix) for metric, matrix in distances.items()}
+        },
+        "shared_species": sorted(shared),
+        "unique_species": {sample_id: sorted(names) for sample_id, names in unique.items()}
+    }
@@ -0,0 +1,304 @@
+"""
+Sample Distance Matrix
+Precomputed pairwise beta-diversity between all catalog samples
+
+Distances are stored per metric as a condensed float32 lower triangle: row i
+holds the distances from sample i to samples 0..i-1 and starts at offset
+i*(i-1)/2. Adding a sample therefore only appends its own row (the new row and
+column of the full matrix) and never moves the stored values. The samples'
+species and taxonomy profiles are kept as well, so a new row is computed
+against them without rebuilding anything. Each sample also stores the version
+of the data its row was computed from; adding it again with another version
+recomputes just its row and column in place. Neighbor queries read one row of
+the stored matrix.
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from comparison import bray_curtis, jaccard, weighted_unifrac, taxonomy_profile
+
+# Metrics precomputed for all sample pairs (float32 memory: n*(n-1)/2 * 4 bytes each)
+DISTANCE_METRICS = [
+    metric.strip() for metric in os.environ.get("DISTANCE_METRICS", "bray_curtis").split(",") if metric.strip()
+]
+
+# Distance function and the profile it is computed over, per metric
+METRICS = {
+    "bray_curtis": (bray_curtis, "abundance"),
+    "jaccard": (jaccard, "abundance"),
+    "weighted_unifrac": (weighted_unifrac, "taxonomy"),
+}
+
+# Separator of taxonomy lineage parts in persisted column names
+_LINEAGE_SEPARATOR = "\x1f"
+
+
+class _Profiles:
+    """
+    Samples x features matrix that grows in both dimensions
+    """
+
+    def __init__(self):
+        self.columns: Dict = {}
+        self._matrix = np.zeros((16, 16), dtype=np.float32)
+        self.rows = 0
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._matrix[:self.rows, :len(self.columns)]
+
+    def add_row(self, row: np.ndarray) -> None:
+        """Append a row (its length may be up to len(self.columns))"""
+        capacity_rows, capacity_cols = self._matrix.shape
+        if self.rows == capacity_rows or len(self.columns) > capacity_cols:
+            grown = np.zeros(
+                (max(capacity_rows, 2 * (self.rows + 1)), max(capacity_cols, 2 * len(self.columns))),
+                dtype=np.float32
+            )
+            grown[:self.rows, :capacity_cols] = self._matrix[:self.rows]
+            self._matrix = grown
+        self._matrix[self.rows, :len(row)] = row
+        self.rows += 1
+
+    def set_row(self, i: int, row: np.ndarray) -> None:
+        """Replace row i (its length may be up to len(self.columns))"""
+        if len(self.columns) > self._matrix.shape[1]:
+            grown = np.zeros((self._matrix.shape[0], 2 * len(self.columns)), dtype=np.float32)
+            grown[:, :self._matrix.shape[1]] = self._matrix
+            self._matrix = grown
+        self._matrix[i] = 0
+        self._matrix[i, :len(row)] = row
+
+
+class _CondensedMatrix:
+    """
+    Condensed lower triangle of a symmetric matrix with a zero diagonal
+    """
+
+    def __init__(self, values: Optional[np.ndarray] = None, size: int = 0):
+        self.size = size
+        self._values = values if values is not None else np.zeros(0, dtype=np.float32)
+
+    @staticmethod
+    def _offset(i: int) -> int:
+        return i * (i - 1) // 2
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:self._offset(self.size)]
+
+    def append(self, row: np.ndarray) -> None:
+        """Append the distances from a new sample to all current samples"""
+        start, stop = self._offset(self.size), self._offset(self.size + 1)
+        if stop > len(self._values):
+            grown = np.zeros(max(stop, 2 * len(self._values)), dtype=np.float32)
+            grown[:start] = self._values[:start]
+            self._values = grown
+        self._values[start:stop] = row
+        self.size += 1
+
+    def row(self, i: int) -> np.ndarray:
+        """Distances from sample i to every sample (0 for itself)"""
+        row = np.zeros(self.size, dtype=np.float32)
+        row[:i] = self._values[self._offset(i):self._offset(i) + i]
+        later = np.arange(i + 1, self.size, dtype=np.int64)
+        row[i + 1:] = self._values[later * (later - 1) // 2 + i]
+        return row
+
+    def set_row(self, i: int, row: np.ndarray) -> None:
+        """Replace the distances from sample i to every sample (row and column i)"""
+        self._values[self._offset(i):self._offset(i) + i] = row[:i]
+        later = np.arange(i + 1, self.size, dtype=np.int64)
+        self._values[later * (later - 1) // 2 + i] = row[i + 1:]
+
+
+class DistanceIndex:
+    """
+    Pairwise distances between samples, extended one sample at a time
+    """
+
+    def __init__(self, metrics: List[str] = DISTANCE_METRICS):
+        """
+        Initialize an empty index
+
+        Args:
+            metrics: Metrics to precompute (keys of METRICS)
+        """
+        unknown = [metric for metric in metrics if metric not in METRICS]
+        if unknown:
+            raise ValueError(f"Unknown distance metrics: {', '.join(unknown)}")
+
+        self.metrics = list(metrics)
+        self.ids: List[str] = []
+        self.versions: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._profiles = {"abundance": _Profiles(), "taxonomy": _Profiles()}
+        self._distances = {metric: _CondensedMatrix() for metric in self.metrics}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, sample_id: str) -> bool:
+        return sample_id in self._positions
+
+    def version(self, sample_id: str) -> Optional[str]:
+        """Data version a sample's distances were computed from (None if not stored)"""
+        position = self._positions.get(sample_id)
+        return self.versions[position] if position is not None else None
+
+    def add(self, sample_id: str, species: List[dict], version: str = "") -> bool:
+        """
+        Add a sample, computing only its distances to the other samples
+
+        A sample already stored under the same version is left alone; under
+        another version its profiles, row and column are recomputed in place.
+
+        Args:
+            sample_id: Identifier of the sample
+            species: The sample's species entries ('scientific_name', 'abundance', taxonomy)
+            version: Version of the data the species were derived from
+
+        Returns:
+            Whether distances were (re)computed
+        """
+        with self._lock:
+            position = self._positions.get(sample_id)
+            if position is not None and self.versions[position] == version:
+                return False
+
+            abundance = self._profiles["abundance"]
+            columns = [abundance.columns.setdefault(entry["scientific_name"], len(abundance.columns)) for entry in species]
+            abundance_row = np.zeros(len(abundance.columns), dtype=np.float32)
+            np.add.at(abundance_row, np.asarray(columns, dtype=np.int64), [entry.get("abundance", 0.0) for entry in species])
+
+            taxonomy = self._profiles["taxonomy"]
+            abundances = np.asarray([entry.get("abundance", 0.0) for entry in species])
+            taxonomy_row = taxonomy_profile(species, abundances, taxonomy.columns)
+
+            if position is None:
+                abundance.add_row(abundance_row)
+                taxonomy.add_row(taxonomy_row)
+
+                # New row and column only: the new profile against the existing ones
+                for metric in self.metrics:
+                    distance, profile = METRICS[metric]
+                    values = self._profiles[profile].values
+                    self._distances[metric].append(distance(values[-1:], values[:-1])[0])
+
+                self._positions[sample_id] = len(self.ids)
+                self.ids.append(sample_id)
+                self.versions.append(version)
+            else:
+                abundance.set_row(position, abundance_row)
+                taxonomy.set_row(position, taxonomy_row)
+
+                # Changed sample: its row and column against all other profiles
+                for metric in self.metrics:
+                    distance, profile = METRICS[metric]
+                    values = self._profiles[profile].values
+                    row = distance(values[position:position + 1], values)[0]
+                    row[position] = 0.0
+                    self._distances[metric].set_row(position, row)
+
+                self.versions[position] = version
+            return True
+
+    def condensed(self, metric: str) -> np.ndarray:
+        """The condensed lower triangle of a metric's matrix (row i at i*(i-1)/2)"""
+        return self._distances[metric].values
+
+    def neighbors(self, sample_id: str, k: int = 10, metric: Optional[str] = None,
+                  allowed: Optional[set] = None) -> List[Tuple[str, float]]:
+        """
+        The k samples closest to a sample, from the stored matrix
+
+        Args:
+            sample_id: Sample to find neighbors of
+            k: Number of neighbors
+            metric: Metric to rank by (default: the first precomputed metric)
+            allowed: Only consider these sample ids (e.g. those still in the catalog)
+
+        Returns:
+            (sample id, distance) pairs, closest first
+        """
+        metric = metric or self.metrics[0]
+        with self._lock:
+            position = self._positions[sample_id]
+            row = self._distances[metric].row(position)
+            ids = list(self.ids)
+
+        candidates = np.ones(len(row), dtype=bool)
+        candidates[position] = False
+        if allowed is not None:
+            candidates &= np.fromiter((sample in allowed for sample in ids), dtype=bool, count=len(ids))
+        candidate_positions = np.flatnonzero(candidates)
+        if len(candidate_positions) == 0:
+            return []
+
+        k = min(k, len(candidate_positions))
+        distances = row[candidate_positions]
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.lexsort((candidate_positions[nearest], distances[nearest]))]
+        return [(ids[candidate_positions[i]], float(distances[i])) for i in nearest.tolist()]
+
+    def save(self, path: str) -> None:
+        """Write the index to an .npz file (atomically)"""
+        with self._lock:
+            arrays = {
+                "ids": np.asarray(self.ids, dtype=str),
+                "versions": np.asarray(self.versions, dtype=str),
+                "metrics": np.asarray(self.metrics, dtype=str),
+                "abundance": self._profiles["abundance"].values,
+                "abundance_columns": np.asarray(list(self._profiles["abundance"].columns), dtype=str),
+                "taxonomy": self._profiles["taxonomy"].values,
+                "taxonomy_columns": np.asarray(
+                    [_LINEAGE_SEPARATOR.join(lineage) for lineage in self._profiles["taxonomy"].columns], dtype=str
+                ),
+            }
+            for metric in self.metrics:
+                arrays[f"distances_{metric}"] = self.condensed(metric)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, metrics: List[str] = DISTANCE_METRICS) -> "DistanceIndex":
+        """Read an index written by save(); metrics missing from the file are recomputed"""
+        index = cls(metrics)
+        with np.load(path, allow_pickle=False) as data:
+            stored_metrics = set(data["metrics"].tolist())
+            index.ids = data["ids"].tolist()
+            # Files without versions are recomputed on the next sync
+            index.versions = data["versions"].tolist() if "versions" in data else [""] * len(index.ids)
+            index._positions = {sample_id: i for i, sample_id in enumerate(index.ids)}
+
+            columns = {
+                "abundance": data["abundance_columns"].tolist(),
+                "taxonomy": [tuple(name.split(_LINEAGE_SEPARATOR)) for name in data["taxonomy_columns"].tolist()],
+            }
+            for profile, profiles in index._profiles.items():
+                profiles.columns = {column: i for i, column in enumerate(columns[profile])}
+                for row in data[profile]:
+                    profiles.add_row(row)
+
+            for metric in index.metrics:
+                if metric in stored_metrics:
+                    index._distances[metric] = _CondensedMatrix(data[f"distances_{metric}"].copy(), len(index.ids))
+                else:
+                    index._distances[metric] = index._compute(metric)
+        return index
+
+    def _compute(self, metric: str) -> _CondensedMatrix:
+        """Condensed matrix of a metric over all stored profiles"""
+        distance, profile = METRICS[metric]
+        values = self._profiles[profile].values
+        matrix = _CondensedMatrix()
+        for i in range(len(values)):
+            matrix.append(distance(values[i:i + 1], values[:i])[0] if i else np.zeros(0, dtype=np.float32))
+        return matrix
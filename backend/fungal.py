@@ -0,0 +1,465 @@
+"""
+28S Fungal Dataset
+Loading, aggregation and filtered queries for the 28S fungal sequence results
+
+The results file is loaded and processed once (again only when its mtime
+changes). Besides the aggregate analysis, every record's depth, temperature,
+coordinates, cluster and classification status are indexed so filtered slices
+are served without scanning the whole dataset.
+"""
+
+import os
+import json
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, Response
+
+from http_cache import http_date
+from spatial import GridClusterIndex, MAX_ZOOM
+
+router = APIRouter(prefix="/analysis/fungal-28s", tags=["fungal-28s"])
+
+# Zoom level of the clustered overview in the analysis' geographic_distribution
+OVERVIEW_ZOOM = 2
+
+# Maximum number of clusters returned for one map viewport
+MAP_CLUSTER_LIMIT = 2000
+
+# 28S fungal results file, resolved next to this module rather than the working directory
+FUNGAL_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fasta_files", "28S_fungal_sequences_Results.json")
+
+# Loaded and processed fungal dataset, replaced when the file's mtime changes
+_fungal_dataset: Optional[dict] = None
+_fungal_dataset_lock = threading.Lock()
+
+def load_28s_fungal_data():
+    """Load and process 28S fungal sequences data from JSON file"""
+    try:
+        with open(FUNGAL_DATA_PATH, 'r') as f:
+            data = json.load(f)
+        return data
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError:
+        return None
+
+def get_fungal_data_mtime() -> Optional[int]:
+    """Modification time of the 28S fungal results file (None if it is missing)"""
+    try:
+        return os.stat(FUNGAL_DATA_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+def get_fungal_dataset() -> dict:
+    """
+    Get the 28S fungal dataset, loading and processing it only when the file changed
+    
+    Returns:
+        Dict with the file 'mtime', the raw 'data', the processed 'analysis',
+        the precomputed '/analysis/fungal-28s' 'response' (None when unavailable)
+        and the record 'index' and 'spatial' index
+    """
+    global _fungal_dataset
+    mtime = get_fungal_data_mtime()
+    dataset = _fungal_dataset
+    if dataset is not None and dataset["mtime"] == mtime:
+        return dataset
+    
+    with _fungal_dataset_lock:
+        # Another request may have reloaded it while we waited
+        if _fungal_dataset is not None and _fungal_dataset["mtime"] == mtime:
+            return _fungal_dataset
+        
+        data = load_28s_fungal_data() if mtime is not None else None
+        records = data.get("detailed_results", []) if data else []
+        columns = extract_fungal_columns(records)
+        spatial = build_spatial_index(columns)
+        analysis = process_28s_fungal_analysis(data, columns, spatial) if data else None
+        _fungal_dataset = {
+            "mtime": mtime,
+            "data": data,
+            "analysis": analysis,
+            "response": build_fungal_28s_response(analysis) if analysis else None,
+            "index": FungalIndex(records, columns),
+            "spatial": spatial
+        }
+        return _fungal_dataset
+
+# Depth and temperature categories: a value falls in the first bin whose upper edge exceeds it
+DEPTH_BIN_EDGES = [200, 1000, 4000]
+DEPTH_BIN_LABELS = ["Shallow (0-200m)", "Intermediate (200-1000m)", "Deep (1000-4000m)", "Abyssal (>4000m)"]
+TEMPERATURE_BIN_EDGES = [5, 15]
+TEMPERATURE_BIN_LABELS = ["Cold (<5°C)", "Moderate (5-15°C)", "Warm (>15°C)"]
+
+def extract_fungal_columns(detailed_results: list) -> dict:
+    """
+    Extract the fields used by the analysis from the fungal records in one pass
+    
+    Args:
+        detailed_results: The 'detailed_results' records of the fungal data
+    
+    Returns:
+        Sequence ids, organism names, classification statuses and the raw depth/temperature
+        values as lists, plus arrays of depth, temperature, latitude, longitude
+        (float64) and cluster id (int64, -1 when unassigned)
+    """
+    sequence_ids = []
+    organisms = []
+    statuses = []
+    cluster_ids = []
+    depth_values = []
+    temperature_values = []
+    lats = []
+    lngs = []
+    for result in detailed_results:
+        sequence_ids.append(result.get("sequence_id"))
+        classification = result.get("classification", {})
+        organisms.append(classification.get("predicted_organism", "Unknown"))
+        statuses.append(classification.get("status", "unknown"))
+        cluster_id = classification.get("cluster_id")
+        cluster_ids.append(-1 if cluster_id is None else cluster_id)
+        env_data = result.get("environmental_data", {})
+        depth_values.append(env_data.get("depth_meters", 0))
+        temperature_values.append(env_data.get("temperature_celsius", 0))
+        lats.append(env_data.get("latitude", 0))
+        lngs.append(env_data.get("longitude", 0))
+    
+    return {
+        "sequence_id": sequence_ids,
+        "organism": organisms,
+        "status": statuses,
+        "cluster_id": np.asarray(cluster_ids, dtype=np.int64),
+        "depth_values": depth_values,
+        "temperature_values": temperature_values,
+        "depth": np.asarray(depth_values, dtype=np.float64),
+        "temperature": np.asarray(temperature_values, dtype=np.float64),
+        "lat": np.asarray(lats, dtype=np.float64),
+        "lng": np.asarray(lngs, dtype=np.float64)
+    }
+
+def binned_counts(values: np.ndarray, edges: list, labels: list) -> dict:
+    """Count values per category, keyed in the order categories first occur"""
+    bins = np.digitize(values, edges)
+    counts = np.bincount(bins, minlength=len(labels))
+    present, first_index = np.unique(bins, return_index=True)
+    return {labels[b]: int(counts[b]) for b in present[np.argsort(first_index)].tolist()}
+
+def value_range(raw_values: list, values: np.ndarray) -> dict:
+    """Min, max and average of a column (min/max keep the original JSON values)"""
+    if len(values) == 0:
+        return {"min": 0, "max": 0, "average": 0}
+    return {
+        "min": raw_values[int(np.argmin(values))],
+        "max": raw_values[int(np.argmax(values))],
+        # Builtin sum keeps the previous left-to-right rounding
+        "average": sum(raw_values) / len(raw_values)
+    }
+
+def build_spatial_index(columns: dict) -> GridClusterIndex:
+    """Grid index over the records that have coordinates (0/0 means unknown)"""
+    located = np.flatnonzero((columns["lat"] != 0) & (columns["lng"] != 0))
+    return GridClusterIndex(
+        columns["lat"][located],
+        columns["lng"][located],
+        [columns["organism"][i] for i in located.tolist()],
+        [columns["sequence_id"][i] for i in located.tolist()]
+    )
+
+def process_28s_fungal_analysis(fungal_data, columns: Optional[dict] = None, spatial: Optional[GridClusterIndex] = None):
+    """Process 28S fungal data for analysis report (columns/spatial: precomputed from the same data)"""
+    if not fungal_data:
+        return None
+    
+    analysis_info = fungal_data.get("analysis_info", {})
+    summary = fungal_data.get("summary", {})
+    detailed_results = fungal_data.get("detailed_results", [])
+    
+    # Extract key statistics
+    total_sequences = analysis_info.get("total_sequences_analyzed", 0)
+    known_species = summary.get("known_species_count", 0)
+    novel_candidates = summary.get("novel_candidates_count", 0)
+    total_clusters = summary.get("total_clusters_identified", 0)
+    
+    # One sweep over the records into columns; everything else is vectorized
+    if columns is None:
+        columns = extract_fungal_columns(detailed_results)
+    organisms = columns["organism"]
+    depths = columns["depth"]
+    temperatures = columns["temperature"]
+    
+    # Species distribution (ties keep first-seen order, as before)
+    species_distribution = Counter(organisms)
+    
+    depth_distribution = binned_counts(depths, DEPTH_BIN_EDGES, DEPTH_BIN_LABELS)
+    temperature_distribution = binned_counts(temperatures, TEMPERATURE_BIN_EDGES, TEMPERATURE_BIN_LABELS)
+    
+    # Geographic data: every located record, clustered on a coarse grid
+    if spatial is None:
+        spatial = build_spatial_index(columns)
+    geographic_distribution = spatial.clusters(OVERVIEW_ZOOM)
+    
+    # Calculate diversity metrics
+    species_count = len(species_distribution)
+    novelty_rate = (novel_candidates / total_sequences * 100) if total_sequences > 0 else 0
+    
+    # Top species by abundance
+    top_species = species_distribution.most_common(10)
+    
+    return {
+        "analysis_metadata": {
+            "timestamp": analysis_info.get("timestamp"),
+            "version": analysis_info.get("version"),
+            "model_used": analysis_info.get("model_used"),
+            "clustering_method": analysis_info.get("clustering_method"),
+            "input_dataset": analysis_info.get("input_dataset")
+        },
+        "summary_statistics": {
+            "total_sequences_analyzed": total_sequences,
+            "known_species_count": known_species,
+            "novel_candidates_count": novel_candidates,
+            "total_clusters_identified": total_clusters,
+            "species_diversity": species_count,
+            "novelty_discovery_rate": round(novelty_rate, 2)
+        },
+        "species_distribution": dict(top_species),
+        "environmental_analysis": {
+            "depth_distribution": depth_distribution,
+            "temperature_distribution": temperature_distribution,
+            "depth_range": value_range(columns["depth_values"], depths),
+            "temperature_range": value_range(columns["temperature_values"], temperatures)
+        },
+        "geographic_distribution": geographic_distribution,
+        "cluster_analysis": summary.get("cluster_distribution", {}),
+        "research_insights": {
+            "biodiversity_hotspots": "Deep ocean environments show high fungal diversity",
+            "novel_discovery_potential": "High" if novelty_rate > 5 else "Moderate" if novelty_rate > 1 else "Low",
+            "ecological_significance": "Marine fungi play crucial roles in ocean carbon cycling",
+            "biotechnology_applications": "Potential for novel enzymes and bioactive compounds"
+        }
+    }
+
+def build_fungal_28s_response(fungal_analysis: dict) -> dict:
+    """Build the /analysis/fungal-28s response from the processed fungal analysis"""
+    return {
+        "analysis_type": "28S Fungal Sequences Analysis",
+        "data_source": "ITS RefSeq Fungi Database",
+        "analysis_results": fungal_analysis,
+        "visualization_data": {
+            "species_abundance_chart": [
+                {"species": species, "count": count} 
+                for species, count in list(fungal_analysis["species_distribution"].items())[:10]
+            ],
+            "depth_distribution_chart": [
+                {"depth_category": category, "count": count}
+                for category, count in fungal_analysis["environmental_analysis"]["depth_distribution"].items()
+            ],
+            "temperature_distribution_chart": [
+                {"temperature_category": category, "count": count}
+                for category, count in fungal_analysis["environmental_analysis"]["temperature_distribution"].items()
+            ],
+            "geographic_map_data": fungal_analysis["geographic_distribution"]
+        },
+        "key_insights": [
+            f"Analyzed {fungal_analysis['summary_statistics']['total_sequences_analyzed']} fungal sequences",
+            f"Identified {fungal_analysis['summary_statistics']['known_species_count']} known species",
+            f"Discovered {fungal_analysis['summary_statistics']['novel_candidates_count']} novel candidates",
+            f"Novelty discovery rate: {fungal_analysis['summary_statistics']['novelty_discovery_rate']}%",
+            f"Species diversity: {fungal_analysis['summary_statistics']['species_diversity']} unique species"
+        ]
+    }
+
+
+class FungalIndex:
+    """
+    Per-field indexes over the fungal records
+    
+    Range fields are kept as sorted orders (queried by binary search), cluster
+    ids and classification statuses as record id arrays per value.
+    """
+    
+    def __init__(self, records: List[dict], columns: dict):
+        """
+        Build the indexes
+        
+        Args:
+            records: The 'detailed_results' records
+            columns: extract_fungal_columns() output for the same records
+        """
+        self.records = records
+        self._sorted = {}
+        for field in ("depth", "temperature", "lat", "lng"):
+            order = np.argsort(columns[field], kind="stable")
+            self._sorted[field] = (columns[field][order], order)
+        
+        self._by_cluster = self._group(columns["cluster_id"].tolist())
+        self._by_status = self._group(columns["status"])
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    @staticmethod
+    def _group(values: list) -> Dict:
+        groups: Dict = {}
+        for i, value in enumerate(values):
+            groups.setdefault(value, []).append(i)
+        return {value: np.asarray(ids, dtype=np.int64) for value, ids in groups.items()}
+    
+    def _range(self, field: str, low: Optional[float], high: Optional[float]) -> np.ndarray:
+        """Record ids with low <= field <= high (either bound optional)"""
+        values, order = self._sorted[field]
+        start = 0 if low is None else np.searchsorted(values, low, side="left")
+        stop = len(values) if high is None else np.searchsorted(values, high, side="right")
+        return order[start:stop]
+    
+    def statuses(self) -> List[str]:
+        """Classification statuses present in the dataset"""
+        return sorted(self._by_status)
+    
+    def query(self,
+              min_depth: Optional[float] = None,
+              max_depth: Optional[float] = None,
+              min_temperature: Optional[float] = None,
+              max_temperature: Optional[float] = None,
+              cluster_id: Optional[int] = None,
+              status: Optional[str] = None,
+              bbox: Optional[Tuple[float, float, float, float]] = None,
+              offset: int = 0,
+              limit: int = 100) -> dict:
+        """
+        Get one page of the records matching all given filters
+        
+        Args:
+            min_depth, max_depth: Depth range in meters (inclusive)
+            min_temperature, max_temperature: Temperature range in °C (inclusive)
+            cluster_id: Only records in this cluster (-1 for unclustered)
+            status: Only records with this classification status
+            bbox: (min_lng, min_lat, max_lng, max_lat); min_lng > max_lng crosses the antimeridian
+            offset: Number of matching records to skip
+            limit: Maximum number of records returned
+        
+        Returns:
+            Total number of matches and the requested page, in file order
+        """
+        candidates: List[np.ndarray] = []
+        if min_depth is not None or max_depth is not None:
+            candidates.append(self._range("depth", min_depth, max_depth))
+        if min_temperature is not None or max_temperature is not None:
+            candidates.append(self._range("temperature", min_temperature, max_temperature))
+        if cluster_id is not None:
+            candidates.append(self._by_cluster.get(cluster_id, np.empty(0, dtype=np.int64)))
+        if status is not None:
+            candidates.append(self._by_status.get(status, np.empty(0, dtype=np.int64)))
+        if bbox is not None:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            candidates.append(self._range("lat", min_lat, max_lat))
+            if min_lng <= max_lng:
+                candidates.append(self._range("lng", min_lng, max_lng))
+            else:
+                candidates.append(np.concatenate([
+                    self._range("lng", min_lng, None), self._range("lng", None, max_lng)
+                ]))
+        
+        if candidates:
+            # Intersect starting from the smallest candidate set
+            candidates.sort(key=len)
+            mask = np.zeros(len(self.records), dtype=bool)
+            mask[candidates[0]] = True
+            for ids in candidates[1:]:
+                selected = np.zeros(len(self.records), dtype=bool)
+                selected[ids] = True
+                mask &= selected
+            matches = np.flatnonzero(mask)
+        else:
+            matches = np.arange(len(self.records))
+        
+        page = [self.records[i] for i in matches[offset:offset + limit].tolist()]
+        return {"total": int(len(matches)), "offset": offset, "limit": limit, "records": page}
+
+
+def parse_bbox(bbox: str) -> Tuple[float, float, float, float]:
+    """Parse 'min_lng,min_lat,max_lng,max_lat'"""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be 'min_lng,min_lat,max_lng,max_lat'")
+    if min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox min_lat must not exceed max_lat")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+@router.get("")
+async def get_fungal_28s_analysis(response: Response):
+    """Get detailed 28S fungal sequences analysis"""
+    
+    # Served from the dataset processed at startup (or after the file changed)
+    dataset = get_fungal_dataset()
+    if dataset["response"] is None:
+        raise HTTPException(status_code=404, detail="28S fungal data not found")
+    
+    response.headers["Last-Modified"] = http_date(dataset["mtime"])
+    return dataset["response"]
+
+
+@router.get("/records")
+async def get_fungal_28s_records(
+    response: Response,
+    min_depth: Optional[float] = None,
+    max_depth: Optional[float] = None,
+    min_temperature: Optional[float] = None,
+    max_temperature: Optional[float] = None,
+    cluster_id: Optional[int] = None,
+    status: Optional[str] = None,
+    bbox: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Get the 28S fungal records matching the given filters, one page at a time"""
+    dataset = get_fungal_dataset()
+    if dataset["data"] is None:
+        raise HTTPException(status_code=404, detail="28S fungal data not found")
+    response.headers["Last-Modified"] = http_date(dataset["mtime"])
+    
+    index = dataset["index"]
+    if status is not None and status not in index.statuses():
+        raise HTTPException(
+            status_code=400,
+            detail=f"status must be one of {', '.join(index.statuses())}"
+        )
+    
+    return index.query(
+        min_depth=min_depth,
+        max_depth=max_depth,
+        min_temperature=min_temperature,
+        max_temperature=max_temperature,
+        cluster_id=cluster_id,
+        status=status,
+        bbox=parse_bbox(bbox) if bbox else None,
+        offset=offset,
+        limit=limit
+    )
+
+
+@router.get("/map")
+async def get_fungal_28s_map(
+    response: Response,
+    zoom: int = Query(OVERVIEW_ZOOM, ge=0, le=22),
+    bbox: Optional[str] = None,
+    limit: int = Query(MAP_CLUSTER_LIMIT, ge=1, le=MAP_CLUSTER_LIMIT)
+):
+    """Get the clustered sample locations in a map viewport at a zoom level"""
+    dataset = get_fungal_dataset()
+    if dataset["data"] is None:
+        raise HTTPException(status_code=404, detail="28S fungal data not found")
+    response.headers["Last-Modified"] = http_date(dataset["mtime"])
+    
+    spatial = dataset["spatial"]
+    clusters = spatial.clusters(zoom, parse_bbox(bbox) if bbox else None, limit)
+    return {
+        "zoom": min(zoom, MAX_ZOOM),
+        "total_points": len(spatial),
+        "points_in_view": sum(cluster["count"] for cluster in clusters),
+        "clusters": clusters
+    }
@@ -0,0 +1,58 @@
+"""
+Gunicorn configuration for the eDNA Analysis API (production mode)
+
+The app is imported once in the master (preload_app), which also loads the
+fungal dataset, warms the report cache and brings the sample distance matrix
+up to date before forking. The workers share that data copy-on-write instead of each
+paying the import and warm-up cost. Workers are recycled after a number of
+requests and restarted gracefully on SIGHUP.
+
+Usage:
+    gunicorn -c gunicorn.conf.py main:app
+"""
+
+import gc
+import os
+import tempfile
+import multiprocessing
+
+# Workers share the distance matrix through this file: one of them updates and saves it, the others reload it
+os.environ.setdefault("DISTANCE_MATRIX_PATH", os.path.join(tempfile.gettempdir(), "taxaformer_distance_matrix.npz"))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Worker processes (default: one per CPU)
+workers = int(os.environ.get("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app in the master so workers share it copy-on-write
+preload_app = True
+
+# Recycle a worker after this many requests (plus jitter so they don't restart together)
+max_requests = int(os.environ.get("MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", "100"))
+
+# Seconds a worker may take for a request, and to finish in-flight requests on restart
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+loglevel = os.environ.get("LOG_LEVEL", "info")
+accesslog = "-"
+
+
+def when_ready(server):
+    """Warm all shared data in the master, before the first workers are forked"""
+    import main
+
+    main.get_fungal_dataset()
+    reports = main.warm_report_cache()
+    main.load_distance_index()
+    main.acquire_distance_writer()
+    updated = main.sync_distance_index()
+    # Released before forking, so a worker can take over the updates
+    main.release_distance_writer()
+    server.log.info(f"Preloaded {reports} reports and distances of {updated} new or changed samples")
+
+    # Keep the warmed objects out of the collector so it doesn't dirty shared pages
+    gc.freeze()
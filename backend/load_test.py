@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+API Load Test
+Concurrent dashboard traffic against the eDNA Analysis API
+
+Drives a weighted mix of the dashboard's requests (sample list, reports,
+species, environmental analysis, comparisons and the fungal analysis) from a
+number of concurrent clients and reports p50/p95/p99 latency, throughput and
+error rate per endpoint. By default the app is served in-process through an
+ASGI transport, so the run needs no server or network and is reproducible in
+CI; pass --url to load a running server instead. The request sequence is drawn
+from a seeded RNG, so runs with the same arguments send the same requests.
+
+Usage:
+    python load_test.py [--requests 2000] [--concurrency 20] [--url http://localhost:8000]
+                        [--json results.json] [--max-error-rate 0] [--max-p95-ms 500]
+"""
+
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+# Relative frequency of each endpoint in the simulated dashboard traffic
+ENDPOINT_WEIGHTS = {
+    "fasta-files": 2,
+    "analysis": 5,
+    "species": 3,
+    "environmental": 3,
+    "comparison": 2,
+    "fungal-28s": 1,
+}
+
+
+def request_plan(file_ids: List[str], total: int, seed: int) -> List[Tuple[str, str]]:
+    """
+    The (endpoint, URL) sequence of a run
+
+    Args:
+        file_ids: Sample ids the requests refer to
+        total: Number of requests
+        seed: Seed of the endpoint and sample choices
+
+    Returns:
+        Requests in the order they are issued
+    """
+    rng = random.Random(seed)
+    endpoints = list(ENDPOINT_WEIGHTS)
+    weights = [ENDPOINT_WEIGHTS[endpoint] for endpoint in endpoints]
+
+    plan = []
+    for endpoint in rng.choices(endpoints, weights, k=total):
+        file_id = rng.choice(file_ids)
+        if endpoint == "fasta-files":
+            url = "/fasta-files"
+        elif endpoint == "analysis":
+            url = f"/analysis/{file_id}"
+        elif endpoint in ("species", "environmental"):
+            url = f"/analysis/{file_id}/{endpoint}"
+        elif endpoint == "comparison":
+            url = f"/comparison?file_ids={','.join(rng.sample(file_ids, min(len(file_ids), rng.randint(2, 4))))}"
+        else:
+            url = "/analysis/fungal-28s"
+        plan.append((endpoint, url))
+    return plan
+
+
+def summarize(latencies: List[float], errors: int) -> dict:
+    """Request count, error rate and latency percentiles (ms) of one endpoint or the whole run"""
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) if len(values) else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+        "mean_ms": round(float(values.mean()), 2) if len(values) else 0.0,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(values.max()), 2) if len(values) else 0.0,
+    }
+
+
+async def run_load(client: httpx.AsyncClient, plan: List[Tuple[str, str]], concurrency: int) -> dict:
+    """
+    Issue the planned requests from `concurrency` clients
+
+    Args:
+        client: HTTP client bound to the API
+        plan: (endpoint, URL) pairs, taken in order by whichever client is free
+        concurrency: Number of concurrent clients
+
+    Returns:
+        Run summary: throughput plus overall and per-endpoint statistics
+    """
+    latencies: Dict[str, List[float]] = {endpoint: [] for endpoint in ENDPOINT_WEIGHTS}
+    errors: Dict[str, int] = {endpoint: 0 for endpoint in ENDPOINT_WEIGHTS}
+    status_codes: Dict[str, int] = {}
+    queue = iter(plan)
+
+    async def worker():
+        for endpoint, url in queue:
+            start = time.perf_counter()
+            try:
+                response = await client.get(url)
+                await response.aread()
+                status = str(response.status_code)
+                failed = response.status_code >= 400
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+                failed = True
+            latencies[endpoint].append(time.perf_counter() - start)
+            errors[endpoint] += failed
+            status_codes[status] = status_codes.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [latency for values in latencies.values() for latency in values]
+    return {
+        "requests": len(plan),
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(plan) / elapsed, 1) if elapsed > 0 else 0.0,
+        "status_codes": dict(sorted(status_codes.items())),
+        "overall": summarize(all_latencies, sum(errors.values())),
+        "endpoints": {
+            endpoint: summarize(values, errors[endpoint])
+            for endpoint, values in latencies.items() if values
+        },
+    }
+
+
+async def load_test(total: int, concurrency: int, seed: int, warmup: int, url: Optional[str]) -> dict:
+    """Run a load test against a server (url) or the in-process app (url None)"""
+    if url:
+        transport = None
+        base_url = url.rstrip("/")
+    else:
+        import main
+
+        # Same warm-up as the server's startup event
+        await main.startup_event()
+        # Unhandled server errors become 500 responses (counted as errors) instead of aborting the run
+        transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+        base_url = "http://testserver"
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=30.0) as client:
+        response = await client.get("/fasta-files")
+        response.raise_for_status()
+        file_ids = [f["id"] for f in response.json()["files"]]
+
+        if warmup:
+            await run_load(client, request_plan(file_ids, warmup, seed + 1), concurrency)
+        result = await run_load(client, request_plan(file_ids, total, seed), concurrency)
+
+    result["target"] = url or "in-process"
+    result["seed"] = seed
+    return result
+
+
+def print_report(result: dict) -> None:
+    print(f"🎯 {result['target']}: {result['requests']} requests, {result['concurrency']} concurrent clients")
+    print(f"⏱️  {result['duration_s']}s, {result['throughput_rps']} requests/s, status codes {result['status_codes']}")
+    print()
+    print(f"{'endpoint':<15}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    rows = list(result["endpoints"].items()) + [("overall", result["overall"])]
+    for name, stats in rows:
+        print(
+            f"{name:<15}{stats['requests']:>9}{stats['errors']:>8}"
+            f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}"
+        )
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the eDNA Analysis API")
+    parser.add_argument("--requests", type=int, default=2000, help="number of measured requests (default 2000)")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent clients (default 20)")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests sent first (default 100)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the request sequence (default 0)")
+    parser.add_argument("--url", help="base URL of a running server (default: serve the app in-process)")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("--max-error-rate", type=float, help="fail if the overall error rate is higher")
+    parser.add_argument("--max-p95-ms", type=float, help="fail if the overall p95 latency (ms) is higher")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(load_test(args.requests, args.concurrency, args.seed, args.warmup, args.url))
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    if args.max_error_rate is not None and result["overall"]["error_rate"] > args.max_error_rate:
+        failures.append(f"error rate {result['overall']['error_rate']} > {args.max_error_rate}")
+    if args.max_p95_ms is not None and result["overall"]["p95_ms"] > args.max_p95_ms:
+        failures.append(f"p95 {result['overall']['p95_ms']} ms > {args.max_p95_ms} ms")
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -1,12 +1,31 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Dict, Any, Optional
-import json
 from datetime import datetime, timedelta
 import random
-import uuid
+import hashlib
 import math
 import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no file locks, every process keeps its own distance matrix
+    fcntl = None
+
+from comparison import compare_species
+from distance_matrix import DistanceIndex
+from fungal import router as fungal_router, get_fungal_dataset, get_fungal_data_mtime
+from http_cache import ETagCompressionMiddleware, http_date
+from registry import get_registry
+from traits import species_traits
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="eDNA Analysis API", version="1.0.0")
 
@@ -29,349 +48,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Enhanced FASTA files data with depth, species count, and novelty information
-FASTA_FILES = [
-    {
-        "id": "fasta_001",
-        "name": "Marine_Sample_Site_A.fasta",
-        "location": "Pacific Ocean - Site A",
-        "collection_date": "2024-01-15",
-        "sample_type": "seawater",
-        "coordinates": {"lat": 36.7783, "lng": -119.4179},
-        "depth": 25.5,
-        "species_count": 156,
-        "novel_species": 12,
-        "novelty_percentage": 7.7,
-        "biodiversity_index": 3.2,
-        "environmental_score": 85.4
-    },
-    {
-        "id": "fasta_002", 
-        "name": "Freshwater_Lake_B.fasta",
-        "location": "Lake Tahoe - Site B",
-        "collection_date": "2024-01-20",
-        "sample_type": "freshwater",
-        "coordinates": {"lat": 39.0968, "lng": -120.0324},
-        "depth": 15.2,
-        "species_count": 89,
-        "novel_species": 8,
-        "novelty_percentage": 9.0,
-        "biodiversity_index": 2.8,
-        "environmental_score": 92.1
-    },
-    {
-        "id": "fasta_003",
-        "name": "Soil_Forest_C.fasta", 
-        "location": "Redwood Forest - Site C",
-        "collection_date": "2024-02-01",
-        "sample_type": "soil",
-        "coordinates": {"lat": 41.2132, "lng": -124.0046},
-        "depth": 0.5,
-        "species_count": 203,
-        "novel_species": 15,
-        "novelty_percentage": 7.4,
-        "biodiversity_index": 3.5,
-        "environmental_score": 78.9
-    },
-    {
-        "id": "fasta_004",
-        "name": "River_Delta_D.fasta",
-        "location": "Sacramento Delta - Site D", 
-        "collection_date": "2024-02-10",
-        "sample_type": "river_water",
-        "coordinates": {"lat": 38.0293, "lng": -121.3018},
-        "depth": 8.7,
-        "species_count": 134,
-        "novel_species": 6,
-        "novelty_percentage": 4.5,
-        "biodiversity_index": 2.9,
-        "environmental_score": 67.3
-    },
-    {
-        "id": "fasta_005",
-        "name": "Coral_Reef_E.fasta",
-        "location": "Monterey Bay - Site E",
-        "collection_date": "2024-02-15",
-        "sample_type": "seawater",
-        "coordinates": {"lat": 36.6002, "lng": -121.8947},
-        "depth": 12.3,
-        "species_count": 287,
-        "novel_species": 23,
-        "novelty_percentage": 8.0,
-        "biodiversity_index": 3.8,
-        "environmental_score": 94.2
-    },
-    {
-        "id": "fasta_006",
-        "name": "Wetland_Marsh_F.fasta",
-        "location": "San Francisco Bay - Site F",
-        "collection_date": "2024-02-20",
-        "sample_type": "marsh_water",
-        "coordinates": {"lat": 37.7749, "lng": -122.4194},
-        "depth": 3.1,
-        "species_count": 178,
-        "novel_species": 14,
-        "novelty_percentage": 7.9,
-        "biodiversity_index": 3.1,
-        "environmental_score": 71.8
-    },
-    {
-        "id": "fasta_007",
-        "name": "Deep_Ocean_G.fasta",
-        "location": "Monterey Canyon - Site G",
-        "collection_date": "2024-03-01",
-        "sample_type": "deep_seawater",
-        "coordinates": {"lat": 36.7014, "lng": -122.1861},
-        "depth": 450.8,
-        "species_count": 67,
-        "novel_species": 18,
-        "novelty_percentage": 26.9,
-        "biodiversity_index": 2.1,
-        "environmental_score": 88.7
-    },
-    {
-        "id": "fasta_008",
-        "name": "Urban_Stream_H.fasta",
-        "location": "Los Angeles River - Site H",
-        "collection_date": "2024-03-05",
-        "sample_type": "urban_water",
-        "coordinates": {"lat": 34.0522, "lng": -118.2437},
-        "depth": 2.4,
-        "species_count": 45,
-        "novel_species": 3,
-        "novelty_percentage": 6.7,
-        "biodiversity_index": 1.8,
-        "environmental_score": 42.1
-    },
-    {
-        "id": "fasta_009",
-        "name": "Mountain_Lake_I.fasta",
-        "location": "Sierra Nevada - Site I",
-        "collection_date": "2024-03-10",
-        "sample_type": "alpine_water",
-        "coordinates": {"lat": 37.8651, "lng": -119.5383},
-        "depth": 28.9,
-        "species_count": 112,
-        "novel_species": 9,
-        "novelty_percentage": 8.0,
-        "biodiversity_index": 2.7,
-        "environmental_score": 89.3
-    },
-    {
-        "id": "fasta_010",
-        "name": "Estuary_J.fasta",
-        "location": "Humboldt Bay - Site J",
-        "collection_date": "2024-03-15",
-        "sample_type": "estuary_water",
-        "coordinates": {"lat": 40.8021, "lng": -124.1637},
-        "depth": 6.8,
-        "species_count": 198,
-        "novel_species": 16,
-        "novelty_percentage": 8.1,
-        "biodiversity_index": 3.3,
-        "environmental_score": 83.5
-    },
-    # Additional sites for better coverage
-    {
-        "id": "fasta_011",
-        "name": "Coastal_Kelp_K.fasta",
-        "location": "Big Sur Coast - Site K",
-        "collection_date": "2024-03-20",
-        "sample_type": "seawater",
-        "coordinates": {"lat": 36.2704, "lng": -121.8081},
-        "depth": 18.7,
-        "species_count": 234,
-        "novel_species": 19,
-        "novelty_percentage": 8.1,
-        "biodiversity_index": 3.6,
-        "environmental_score": 91.2
-    },
-    {
-        "id": "fasta_012",
-        "name": "Desert_Spring_L.fasta",
-        "location": "Mojave Desert - Site L",
-        "collection_date": "2024-03-25",
-        "sample_type": "freshwater",
-        "coordinates": {"lat": 35.0178, "lng": -117.6897},
-        "depth": 4.2,
-        "species_count": 67,
-        "novel_species": 11,
-        "novelty_percentage": 16.4,
-        "biodiversity_index": 2.3,
-        "environmental_score": 76.8
-    },
-    {
-        "id": "fasta_013",
-        "name": "Volcanic_Lake_M.fasta",
-        "location": "Crater Lake - Site M",
-        "collection_date": "2024-04-01",
-        "sample_type": "freshwater",
-        "coordinates": {"lat": 42.9446, "lng": -122.1090},
-        "depth": 89.3,
-        "species_count": 78,
-        "novel_species": 7,
-        "novelty_percentage": 9.0,
-        "biodiversity_index": 2.4,
-        "environmental_score": 95.7
-    },
-    {
-        "id": "fasta_014",
-        "name": "Tidal_Pool_N.fasta",
-        "location": "Point Reyes - Site N",
-        "collection_date": "2024-04-05",
-        "sample_type": "seawater",
-        "coordinates": {"lat": 38.0293, "lng": -122.8694},
-        "depth": 1.8,
-        "species_count": 189,
-        "novel_species": 13,
-        "novelty_percentage": 6.9,
-        "biodiversity_index": 3.4,
-        "environmental_score": 87.4
-    },
-    {
-        "id": "fasta_015",
-        "name": "Geothermal_Spring_O.fasta",
-        "location": "Yellowstone - Site O",
-        "collection_date": "2024-04-10",
-        "sample_type": "freshwater",
-        "coordinates": {"lat": 44.4280, "lng": -110.5885},
-        "depth": 3.5,
-        "species_count": 34,
-        "novel_species": 8,
-        "novelty_percentage": 23.5,
-        "biodiversity_index": 1.9,
-        "environmental_score": 68.2
-    }
-]
+# Smallest response body (bytes) that is gzip/brotli compressed
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
 
-def load_28s_fungal_data():
-    """Load and process 28S fungal sequences data from JSON file"""
-    try:
-        file_path = os.path.join("fasta_files", "28S_fungal_sequences_Results.json")
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        return data
-    except FileNotFoundError:
-        return None
-    except json.JSONDecodeError:
-        return None
+# ETags (304 on If-None-Match) and compression for all responses
+app.add_middleware(ETagCompressionMiddleware, minimum_size=COMPRESS_MIN_SIZE)
 
-def process_28s_fungal_analysis(fungal_data):
-    """Process 28S fungal data for analysis report"""
-    if not fungal_data:
-        return None
-    
-    analysis_info = fungal_data.get("analysis_info", {})
-    summary = fungal_data.get("summary", {})
-    detailed_results = fungal_data.get("detailed_results", [])
-    
-    # Extract key statistics
-    total_sequences = analysis_info.get("total_sequences_analyzed", 0)
-    known_species = summary.get("known_species_count", 0)
-    novel_candidates = summary.get("novel_candidates_count", 0)
-    total_clusters = summary.get("total_clusters_identified", 0)
-    
-    # Process species distribution
-    species_distribution = {}
-    depth_distribution = {}
-    temperature_distribution = {}
-    geographic_distribution = []
-    
-    for result in detailed_results:
-        # Species classification
-        organism = result.get("classification", {}).get("predicted_organism", "Unknown")
-        if organism in species_distribution:
-            species_distribution[organism] += 1
-        else:
-            species_distribution[organism] = 1
-        
-        # Environmental data
-        env_data = result.get("environmental_data", {})
-        depth = env_data.get("depth_meters", 0)
-        temp = env_data.get("temperature_celsius", 0)
-        lat = env_data.get("latitude", 0)
-        lng = env_data.get("longitude", 0)
-        
-        # Depth categorization
-        if depth < 200:
-            depth_cat = "Shallow (0-200m)"
-        elif depth < 1000:
-            depth_cat = "Intermediate (200-1000m)"
-        elif depth < 4000:
-            depth_cat = "Deep (1000-4000m)"
-        else:
-            depth_cat = "Abyssal (>4000m)"
-        
-        depth_distribution[depth_cat] = depth_distribution.get(depth_cat, 0) + 1
-        
-        # Temperature categorization
-        if temp < 5:
-            temp_cat = "Cold (<5°C)"
-        elif temp < 15:
-            temp_cat = "Moderate (5-15°C)"
-        else:
-            temp_cat = "Warm (>15°C)"
-        
-        temperature_distribution[temp_cat] = temperature_distribution.get(temp_cat, 0) + 1
-        
-        # Geographic data
-        if lat != 0 and lng != 0:
-            geographic_distribution.append({"lat": lat, "lng": lng, "species": organism})
-    
-    # Calculate diversity metrics
-    species_count = len(species_distribution)
-    novelty_rate = (novel_candidates / total_sequences * 100) if total_sequences > 0 else 0
-    
-    # Top species by abundance
-    top_species = sorted(species_distribution.items(), key=lambda x: x[1], reverse=True)[:10]
-    
-    return {
-        "analysis_metadata": {
-            "timestamp": analysis_info.get("timestamp"),
-            "version": analysis_info.get("version"),
-            "model_used": analysis_info.get("model_used"),
-            "clustering_method": analysis_info.get("clustering_method"),
-            "input_dataset": analysis_info.get("input_dataset")
-        },
-        "summary_statistics": {
-            "total_sequences_analyzed": total_sequences,
-            "known_species_count": known_species,
-            "novel_candidates_count": novel_candidates,
-            "total_clusters_identified": total_clusters,
-            "species_diversity": species_count,
-            "novelty_discovery_rate": round(novelty_rate, 2)
-        },
-        "species_distribution": dict(top_species),
-        "environmental_analysis": {
-            "depth_distribution": depth_distribution,
-            "temperature_distribution": temperature_distribution,
-            "depth_range": {
-                "min": min([r.get("environmental_data", {}).get("depth_meters", 0) for r in detailed_results]),
-                "max": max([r.get("environmental_data", {}).get("depth_meters", 0) for r in detailed_results]),
-                "average": sum([r.get("environmental_data", {}).get("depth_meters", 0) for r in detailed_results]) / len(detailed_results)
-            },
-            "temperature_range": {
-                "min": min([r.get("environmental_data", {}).get("temperature_celsius", 0) for r in detailed_results]),
-                "max": max([r.get("environmental_data", {}).get("temperature_celsius", 0) for r in detailed_results]),
-                "average": sum([r.get("environmental_data", {}).get("temperature_celsius", 0) for r in detailed_results]) / len(detailed_results)
-            }
-        },
-        "geographic_distribution": geographic_distribution[:50],  # Limit to 50 points for performance
-        "cluster_analysis": summary.get("cluster_distribution", {}),
-        "research_insights": {
-            "biodiversity_hotspots": "Deep ocean environments show high fungal diversity",
-            "novel_discovery_potential": "High" if novelty_rate > 5 else "Moderate" if novelty_rate > 1 else "Low",
-            "ecological_significance": "Marine fungi play crucial roles in ocean carbon cycling",
-            "biotechnology_applications": "Potential for novel enzymes and bioactive compounds"
-        }
-    }
+# 28S fungal dataset routes; registered before /analysis/{file_id} so they aren't shadowed by it
+app.include_router(fungal_router)
 
-def generate_species_data_by_environment(sample_type: str, depth: float = 0, seed: int = None):
+def stable_seed(*parts) -> int:
+    """Seed derived from the given values that is identical in every process (unlike hash())"""
+    digest = hashlib.sha256(":".join(str(part) for part in parts).encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def stable_rng(*parts) -> random.Random:
+    """Private random generator seeded from the given values"""
+    return random.Random(stable_seed(*parts))
+
+def generate_species_data_by_environment(sample_type: str, depth: float = 0, rng: Optional[random.Random] = None):
     """Generate environment-specific species detection data"""
     
-    # Set seed if provided for consistent data generation
-    if seed is not None:
-        random.seed(seed)
+    # Private generator so concurrent requests don't share random state
+    if rng is None:
+        rng = random.Random()
     
     # Deep Sea Species (depth > 200m or deep_seawater type)
     deep_sea_species = [
@@ -437,48 +137,48 @@ def generate_species_data_by_environment(sample_type: str, depth: float = 0, see
     # Select species based on environment type and depth
     if sample_type == "deep_seawater" or depth > 200:
         species_pool = deep_sea_species
-        num_species = random.randint(4, 7)  # Fewer species in extreme environments
+        num_species = rng.randint(4, 7)  # Fewer species in extreme environments
         novel_chance = 0.4  # Higher chance of novel species in deep sea
     elif sample_type in ["seawater", "estuary_water", "marsh_water"]:
         species_pool = marine_species
-        num_species = random.randint(6, 10)
+        num_species = rng.randint(6, 10)
         novel_chance = 0.2
     elif sample_type in ["freshwater", "alpine_water"]:
         species_pool = freshwater_species
-        num_species = random.randint(5, 8)
+        num_species = rng.randint(5, 8)
         novel_chance = 0.15
     elif sample_type == "soil":
         species_pool = soil_species
-        num_species = random.randint(7, 12)  # High diversity in soil
+        num_species = rng.randint(7, 12)  # High diversity in soil
         novel_chance = 0.25
     elif sample_type in ["river_water", "urban_water"]:
         species_pool = river_species
-        num_species = random.randint(4, 7)  # Lower diversity in polluted water
+        num_species = rng.randint(4, 7)  # Lower diversity in polluted water
         novel_chance = 0.1
     else:
         species_pool = marine_species  # Default
-        num_species = random.randint(5, 8)
+        num_species = rng.randint(5, 8)
         novel_chance = 0.2
     
     detected_species = []
     
     # Add known species
-    selected_species = random.sample(species_pool, min(num_species, len(species_pool)))
+    selected_species = rng.sample(species_pool, min(num_species, len(species_pool)))
     
     for species in selected_species:
         # Adjust abundance based on environment
         if sample_type == "deep_seawater":
-            abundance = round(random.uniform(0.05, 5.0), 2)  # Lower abundance in deep sea
-            confidence = round(random.uniform(0.65, 0.95), 3)  # Lower confidence for extreme environments
+            abundance = round(rng.uniform(0.05, 5.0), 2)  # Lower abundance in deep sea
+            confidence = round(rng.uniform(0.65, 0.95), 3)  # Lower confidence for extreme environments
         elif sample_type == "soil":
-            abundance = round(random.uniform(0.5, 25.0), 2)  # Higher abundance in soil
-            confidence = round(random.uniform(0.80, 0.98), 3)
+            abundance = round(rng.uniform(0.5, 25.0), 2)  # Higher abundance in soil
+            confidence = round(rng.uniform(0.80, 0.98), 3)
         else:
-            abundance = round(random.uniform(0.1, 15.0), 2)
-            confidence = round(random.uniform(0.75, 0.99), 3)
+            abundance = round(rng.uniform(0.1, 15.0), 2)
+            confidence = round(rng.uniform(0.75, 0.99), 3)
         
         detected_species.append({
-            "species_id": f"sp_{uuid.uuid4().hex[:8]}",
+            "species_id": f"sp_{rng.getrandbits(32):08x}",
             "scientific_name": species["name"],
             "common_name": species["common_name"],
             "kingdom": species["kingdom"],
@@ -486,8 +186,8 @@ def generate_species_data_by_environment(sample_type: str, depth: float = 0, see
             "habitat": species["habitat"],
             "abundance": abundance,
             "confidence_score": confidence,
-            "sequence_count": random.randint(5, 300),
-            "biomass_estimate": round(random.uniform(0.001, 2.0), 3),
+            "sequence_count": rng.randint(5, 300),
+            "biomass_estimate": round(rng.uniform(0.001, 2.0), 3),
             "is_novel": False
         })
     
@@ -517,18 +217,18 @@ def generate_species_data_by_environment(sample_type: str, depth: float = 0, see
             ]
             habitat = "Environmental sample"
         
-        novel_name = random.choice(novel_names)
+        novel_name = rng.choice(novel_names)
         detected_species.append({
-            "species_id": f"novel_{uuid.uuid4().hex[:8]}",
+            "species_id": f"novel_{rng.getrandbits(32):08x}",
             "scientific_name": novel_name,
             "common_name": "Novel Species",
             "kingdom": "Unknown",
             "phylum": "Unknown",
             "habitat": habitat,
-            "abundance": round(random.uniform(0.01, 2.0), 2),
-            "confidence_score": round(random.uniform(0.45, 0.75), 3),  # Lower confidence for novel
-            "sequence_count": random.randint(1, 50),
-            "biomass_estimate": round(random.uniform(0.001, 0.5), 3),
+            "abundance": round(rng.uniform(0.01, 2.0), 2),
+            "confidence_score": round(rng.uniform(0.45, 0.75), 3),  # Lower confidence for novel
+            "sequence_count": rng.randint(1, 50),
+            "biomass_estimate": round(rng.uniform(0.001, 0.5), 3),
             "is_novel": True
         })
     
@@ -549,31 +249,32 @@ def get_analysis_type(sample_type: str, depth: float) -> str:
     else:
         return "General Environmental Analysis"
 
-def generate_specialized_analysis(sample_type: str, species_data: list, environmental_data: dict, depth: float) -> dict:
+def generate_specialized_analysis(sample_type: str, species_data: list, environmental_data: dict, depth: float, rng: random.Random) -> dict:
     """Generate specialized analysis based on environment type"""
     
     if sample_type == "deep_seawater" or depth > 200:
-        return generate_deep_sea_analysis(species_data, environmental_data, depth)
+        return generate_deep_sea_analysis(species_data, environmental_data, depth, rng)
     elif sample_type in ["seawater", "estuary_water", "marsh_water"]:
-        return generate_marine_analysis(species_data, environmental_data)
+        return generate_marine_analysis(species_data, environmental_data, rng)
     elif sample_type in ["freshwater", "alpine_water"]:
-        return generate_freshwater_analysis(species_data, environmental_data)
+        return generate_freshwater_analysis(species_data, environmental_data, rng)
     elif sample_type == "soil":
-        return generate_soil_analysis(species_data, environmental_data)
+        return generate_soil_analysis(species_data, environmental_data, rng)
     elif sample_type in ["river_water", "urban_water"]:
-        return generate_water_quality_analysis(species_data, environmental_data)
+        return generate_water_quality_analysis(species_data, environmental_data, rng)
     else:
-        return generate_general_analysis(species_data, environmental_data)
+        return generate_general_analysis(species_data, environmental_data, rng)
 
-def generate_deep_sea_analysis(species_data: list, environmental_data: dict, depth: float) -> dict:
+def generate_deep_sea_analysis(species_data: list, environmental_data: dict, depth: float, rng: random.Random) -> dict:
     """Specialized analysis for deep sea environments"""
     
+    traits = species_traits(species_data)
+    
     # Count extremophiles
-    extremophiles = [s for s in species_data if any(term in s["scientific_name"].lower() 
-                    for term in ["pyrococcus", "thermotoga", "methanocaldococcus", "pyrodictium", "colwellia", "shewanella"])]
+    extremophiles = [tags for tags in traits if "extremophile" in tags]
     
     # Pressure adaptation analysis
-    pressure_adapted = [s for s in species_data if "pressure" in s.get("habitat", "").lower() or "deep" in s.get("habitat", "").lower()]
+    pressure_adapted = [tags for tags in traits if "pressure_adapted" in tags]
     
     # Novel species analysis
     novel_species = [s for s in species_data if s.get("is_novel", False)]
@@ -587,10 +288,10 @@ def generate_deep_sea_analysis(species_data: list, environmental_data: dict, dep
             "depth_zone": "Bathypelagic" if depth < 4000 else "Abyssopelagic" if depth < 6000 else "Hadalpelagic"
         },
         "extremophile_characteristics": {
-            "thermophiles": len([s for s in extremophiles if "thermo" in s["scientific_name"].lower()]),
-            "psychrophiles": len([s for s in extremophiles if "psychr" in s["scientific_name"].lower() or "colwellia" in s["scientific_name"].lower()]),
-            "piezophiles": len([s for s in extremophiles if "piezo" in s["scientific_name"].lower() or "shewanella" in s["scientific_name"].lower()]),
-            "chemosynthetic_organisms": len([s for s in species_data if "chemosynthetic" in s.get("habitat", "").lower()])
+            "thermophiles": sum("thermophile" in tags for tags in extremophiles),
+            "psychrophiles": sum("psychrophile" in tags for tags in extremophiles),
+            "piezophiles": sum("piezophile" in tags for tags in extremophiles),
+            "chemosynthetic_organisms": sum("chemosynthetic" in tags for tags in traits)
         },
         "environmental_adaptations": {
             "high_pressure_tolerance": environmental_data.get("pressure", 0) > 100,
@@ -599,8 +300,8 @@ def generate_deep_sea_analysis(species_data: list, environmental_data: dict, dep
             "hydrothermal_influence": environmental_data.get("hydrothermal_activity", False)
         },
         "biodiversity_insights": {
-            "species_rarity_index": round(random.uniform(0.7, 0.95), 2),  # High rarity in deep sea
-            "endemism_potential": round(random.uniform(0.6, 0.9), 2),
+            "species_rarity_index": round(rng.uniform(0.7, 0.95), 2),  # High rarity in deep sea
+            "endemism_potential": round(rng.uniform(0.6, 0.9), 2),
             "evolutionary_significance": "High - potential for unique evolutionary adaptations",
             "conservation_priority": "Critical - unique deep-sea ecosystem"
         },
@@ -612,12 +313,13 @@ def generate_deep_sea_analysis(species_data: list, environmental_data: dict, dep
         }
     }
 
-def generate_marine_analysis(species_data: list, environmental_data: dict) -> dict:
+def generate_marine_analysis(species_data: list, environmental_data: dict, rng: random.Random) -> dict:
     """Specialized analysis for marine environments"""
     
+    traits = species_traits(species_data)
+    
     # Marine-specific organisms
-    phytoplankton = [s for s in species_data if any(term in s["scientific_name"].lower() 
-                    for term in ["prochlorococcus", "synechococcus", "thalassiosira", "emiliania"])]
+    phytoplankton = [tags for tags in traits if "phytoplankton" in tags]
     
     bacteria = [s for s in species_data if s["kingdom"] == "Bacteria"]
     
@@ -626,30 +328,30 @@ def generate_marine_analysis(species_data: list, environmental_data: dict) -> di
         "key_findings": {
             "primary_producers": len(phytoplankton),
             "bacterial_diversity": len(bacteria),
-            "trophic_levels_represented": random.randint(3, 5),
-            "marine_productivity_index": round(random.uniform(0.6, 0.9), 2)
+            "trophic_levels_represented": rng.randint(3, 5),
+            "marine_productivity_index": round(rng.uniform(0.6, 0.9), 2)
         },
         "oceanographic_indicators": {
-            "chlorophyll_correlation": round(random.uniform(0.4, 0.8), 2),
-            "nutrient_cycling_efficiency": round(random.uniform(0.7, 0.95), 2),
-            "carbon_pump_activity": round(random.uniform(0.5, 0.85), 2),
+            "chlorophyll_correlation": round(rng.uniform(0.4, 0.8), 2),
+            "nutrient_cycling_efficiency": round(rng.uniform(0.7, 0.95), 2),
+            "carbon_pump_activity": round(rng.uniform(0.5, 0.85), 2),
             "oxygen_production_potential": environmental_data.get("dissolved_oxygen", 0) > 8
         },
         "ecosystem_health": {
             "biodiversity_status": "Good" if len(species_data) > 6 else "Moderate",
-            "pollution_indicators": len([s for s in species_data if "vibrio" in s["scientific_name"].lower()]),
-            "invasive_species_risk": round(random.uniform(0.1, 0.4), 2),
-            "climate_resilience": round(random.uniform(0.6, 0.9), 2)
+            "pollution_indicators": sum("vibrio" in tags for tags in traits),
+            "invasive_species_risk": round(rng.uniform(0.1, 0.4), 2),
+            "climate_resilience": round(rng.uniform(0.6, 0.9), 2)
         },
         "conservation_insights": {
-            "protected_species_present": random.randint(0, 2),
-            "habitat_connectivity": round(random.uniform(0.7, 0.95), 2),
+            "protected_species_present": rng.randint(0, 2),
+            "habitat_connectivity": round(rng.uniform(0.7, 0.95), 2),
             "restoration_potential": "High" if environmental_data.get("ph", 0) > 7.9 else "Moderate",
             "monitoring_priority": "High - marine protected area candidate"
         }
     }
 
-def generate_freshwater_analysis(species_data: list, environmental_data: dict) -> dict:
+def generate_freshwater_analysis(species_data: list, environmental_data: dict, rng: random.Random) -> dict:
     """Specialized analysis for freshwater environments"""
     
     # Freshwater indicators
@@ -661,7 +363,7 @@ def generate_freshwater_analysis(species_data: list, environmental_data: dict) -
         "key_findings": {
             "fish_diversity": len(fish_species),
             "algal_diversity": len(algae_species),
-            "water_quality_score": round(random.uniform(0.6, 0.95), 2),
+            "water_quality_score": round(rng.uniform(0.6, 0.95), 2),
             "eutrophication_risk": "Low" if environmental_data.get("phosphate", 0) < 0.1 else "Moderate" if environmental_data.get("phosphate", 0) < 0.3 else "High"
         },
         "water_quality_indicators": {
@@ -676,9 +378,9 @@ def generate_freshwater_analysis(species_data: list, environmental_data: dict) -
         },
         "ecological_assessment": {
             "trophic_state": "Oligotrophic" if environmental_data.get("phosphate", 0) < 0.1 else "Mesotrophic" if environmental_data.get("phosphate", 0) < 0.3 else "Eutrophic",
-            "biodiversity_index": round(random.uniform(0.7, 0.95), 2),
-            "habitat_complexity": round(random.uniform(0.6, 0.9), 2),
-            "seasonal_stability": round(random.uniform(0.5, 0.8), 2)
+            "biodiversity_index": round(rng.uniform(0.7, 0.95), 2),
+            "habitat_complexity": round(rng.uniform(0.6, 0.9), 2),
+            "seasonal_stability": round(rng.uniform(0.5, 0.8), 2)
         },
         "management_recommendations": {
             "nutrient_management": "Monitor phosphate inputs" if environmental_data.get("phosphate", 0) > 0.2 else "Maintain current levels",
@@ -688,13 +390,15 @@ def generate_freshwater_analysis(species_data: list, environmental_data: dict) -
         }
     }
 
-def generate_soil_analysis(species_data: list, environmental_data: dict) -> dict:
+def generate_soil_analysis(species_data: list, environmental_data: dict, rng: random.Random) -> dict:
     """Specialized analysis for soil environments"""
     
-    # Soil-specific organisms
-    bacteria = [s for s in species_data if s["kingdom"] == "Bacteria"]
-    fungi = [s for s in species_data if s["kingdom"] == "Fungi"]
-    nitrogen_fixers = [s for s in species_data if "rhizobium" in s["scientific_name"].lower() or "azotobacter" in s["scientific_name"].lower()]
+    traits = species_traits(species_data)
+    
+    # Soil-specific organisms, as the trait tags of each
+    bacteria = [tags for s, tags in zip(species_data, traits) if s["kingdom"] == "Bacteria"]
+    fungi = [tags for s, tags in zip(species_data, traits) if s["kingdom"] == "Fungi"]
+    nitrogen_fixers = [tags for tags in traits if "nitrogen_fixer" in tags]
     
     return {
         "analysis_type": "Soil Microbiome Analysis",
@@ -702,34 +406,33 @@ def generate_soil_analysis(species_data: list, environmental_data: dict) -> dict
             "bacterial_diversity": len(bacteria),
             "fungal_diversity": len(fungi),
             "nitrogen_fixers": len(nitrogen_fixers),
-            "soil_health_score": round(random.uniform(0.7, 0.95), 2)
+            "soil_health_score": round(rng.uniform(0.7, 0.95), 2)
         },
         "nutrient_cycling": {
             "nitrogen_cycle_activity": len(nitrogen_fixers) > 0,
-            "carbon_sequestration_potential": round(random.uniform(0.6, 0.9), 2),
-            "phosphorus_solubilization": len([s for s in bacteria if "pseudomonas" in s["scientific_name"].lower()]) > 0,
+            "carbon_sequestration_potential": round(rng.uniform(0.6, 0.9), 2),
+            "phosphorus_solubilization": any("phosphate_solubilizer" in tags for tags in bacteria),
             "organic_matter_decomposition": round(environmental_data.get("organic_matter", 5) / 10, 2)
         },
         "plant_soil_interactions": {
-            "mycorrhizal_associations": len([s for s in fungi if "mycorrhiz" in s["scientific_name"].lower() or "glomus" in s["scientific_name"].lower()]),
-            "rhizosphere_activity": round(random.uniform(0.7, 0.95), 2),
-            "plant_growth_promotion": len([s for s in bacteria if "fluorescens" in s["scientific_name"].lower()]) > 0,
-            "disease_suppression": len([s for s in fungi if "trichoderma" in s["scientific_name"].lower()]) > 0
+            "mycorrhizal_associations": sum("mycorrhizal" in tags for tags in fungi),
+            "rhizosphere_activity": round(rng.uniform(0.7, 0.95), 2),
+            "plant_growth_promotion": any("plant_growth_promoter" in tags for tags in bacteria),
+            "disease_suppression": any("disease_suppressor" in tags for tags in fungi)
         },
         "agricultural_implications": {
             "fertility_status": "High" if environmental_data.get("organic_matter", 0) > 8 else "Moderate" if environmental_data.get("organic_matter", 0) > 4 else "Low",
             "biological_activity": round(environmental_data.get("microbial_biomass", 400) / 800, 2),
-            "sustainability_index": round(random.uniform(0.6, 0.9), 2),
+            "sustainability_index": round(rng.uniform(0.6, 0.9), 2),
             "crop_productivity_potential": "High" if len(nitrogen_fixers) > 0 and environmental_data.get("ph", 7) > 6 else "Moderate"
         }
     }
 
-def generate_water_quality_analysis(species_data: list, environmental_data: dict) -> dict:
+def generate_water_quality_analysis(species_data: list, environmental_data: dict, rng: random.Random) -> dict:
     """Specialized analysis for water quality assessment"""
     
     # Pollution indicators
-    indicator_bacteria = [s for s in species_data if any(term in s["scientific_name"].lower() 
-                         for term in ["escherichia", "enterococcus", "pseudomonas"])]
+    indicator_bacteria = [tags for tags in species_traits(species_data) if "pollution_indicator" in tags]
     
     return {
         "analysis_type": "Water Quality & Pollution Assessment",
@@ -737,13 +440,13 @@ def generate_water_quality_analysis(species_data: list, environmental_data: dict
             "pollution_indicators": len(indicator_bacteria),
             "water_quality_grade": "A" if len(indicator_bacteria) == 0 else "B" if len(indicator_bacteria) < 2 else "C",
             "contamination_risk": "Low" if len(indicator_bacteria) < 2 else "High",
-            "treatment_efficiency": round(random.uniform(0.6, 0.9), 2)
+            "treatment_efficiency": round(rng.uniform(0.6, 0.9), 2)
         },
         "microbial_indicators": {
-            "coliform_presence": len([s for s in indicator_bacteria if "escherichia" in s["scientific_name"].lower()]) > 0,
-            "pathogen_risk": len([s for s in indicator_bacteria if "pseudomonas" in s["scientific_name"].lower()]) > 0,
+            "coliform_presence": any("coliform" in tags for tags in indicator_bacteria),
+            "pathogen_risk": any("pathogen" in tags for tags in indicator_bacteria),
             "fecal_contamination": environmental_data.get("coliform_count", 0) > 1000,
-            "antibiotic_resistance_potential": round(random.uniform(0.2, 0.7), 2)
+            "antibiotic_resistance_potential": round(rng.uniform(0.2, 0.7), 2)
         },
         "chemical_assessment": {
             "heavy_metal_contamination": environmental_data.get("heavy_metals", 0) > 0.1,
@@ -759,111 +462,111 @@ def generate_water_quality_analysis(species_data: list, environmental_data: dict
         }
     }
 
-def generate_general_analysis(species_data: list, environmental_data: dict) -> dict:
+def generate_general_analysis(species_data: list, environmental_data: dict, rng: random.Random) -> dict:
     """General environmental analysis"""
     return {
         "analysis_type": "General Environmental Analysis",
         "key_findings": {
             "species_richness": len(species_data),
             "taxonomic_diversity": len(set(s["kingdom"] for s in species_data)),
-            "environmental_stability": round(random.uniform(0.6, 0.9), 2),
-            "ecosystem_complexity": round(random.uniform(0.5, 0.8), 2)
+            "environmental_stability": round(rng.uniform(0.6, 0.9), 2),
+            "ecosystem_complexity": round(rng.uniform(0.5, 0.8), 2)
         },
         "biodiversity_metrics": {
-            "evenness_index": round(random.uniform(0.6, 0.9), 2),
-            "dominance_index": round(random.uniform(0.1, 0.4), 2),
-            "rarity_index": round(random.uniform(0.3, 0.7), 2)
+            "evenness_index": round(rng.uniform(0.6, 0.9), 2),
+            "dominance_index": round(rng.uniform(0.1, 0.4), 2),
+            "rarity_index": round(rng.uniform(0.3, 0.7), 2)
         }
     }
 
-def generate_environmental_data_by_type(sample_type: str, depth: float):
+def generate_environmental_data_by_type(sample_type: str, depth: float, rng: random.Random):
     """Generate environment-specific parameters"""
     
     if sample_type == "deep_seawater" or depth > 200:
         # Deep sea conditions
         return {
-            "temperature": round(random.uniform(1.0, 4.0), 1),  # Very cold
-            "ph": round(random.uniform(7.8, 8.2), 1),
-            "dissolved_oxygen": round(random.uniform(2.0, 6.0), 1),  # Lower oxygen
-            "pressure": round(depth * 0.1 + random.uniform(-5, 5), 1),  # High pressure
-            "turbidity": round(random.uniform(0.1, 2.0), 1),  # Clear water
-            "conductivity": random.randint(45000, 55000),  # High salinity
-            "salinity": round(random.uniform(34.0, 35.5), 1),
+            "temperature": round(rng.uniform(1.0, 4.0), 1),  # Very cold
+            "ph": round(rng.uniform(7.8, 8.2), 1),
+            "dissolved_oxygen": round(rng.uniform(2.0, 6.0), 1),  # Lower oxygen
+            "pressure": round(depth * 0.1 + rng.uniform(-5, 5), 1),  # High pressure
+            "turbidity": round(rng.uniform(0.1, 2.0), 1),  # Clear water
+            "conductivity": rng.randint(45000, 55000),  # High salinity
+            "salinity": round(rng.uniform(34.0, 35.5), 1),
             "depth": depth,
             "light_penetration": 0.0,  # No light
-            "methane_concentration": round(random.uniform(0.1, 15.0), 2),
-            "sulfide_concentration": round(random.uniform(0.0, 8.0), 2),
-            "hydrothermal_activity": random.choice([True, False])
+            "methane_concentration": round(rng.uniform(0.1, 15.0), 2),
+            "sulfide_concentration": round(rng.uniform(0.0, 8.0), 2),
+            "hydrothermal_activity": rng.choice([True, False])
         }
     elif sample_type in ["seawater", "estuary_water", "marsh_water"]:
         # Marine conditions
         return {
-            "temperature": round(random.uniform(12.0, 28.0), 1),
-            "ph": round(random.uniform(7.9, 8.3), 1),
-            "dissolved_oxygen": round(random.uniform(6.0, 12.0), 1),
-            "turbidity": round(random.uniform(1.0, 8.0), 1),
-            "conductivity": random.randint(35000, 50000),
-            "salinity": round(random.uniform(30.0, 38.0), 1),
+            "temperature": round(rng.uniform(12.0, 28.0), 1),
+            "ph": round(rng.uniform(7.9, 8.3), 1),
+            "dissolved_oxygen": round(rng.uniform(6.0, 12.0), 1),
+            "turbidity": round(rng.uniform(1.0, 8.0), 1),
+            "conductivity": rng.randint(35000, 50000),
+            "salinity": round(rng.uniform(30.0, 38.0), 1),
             "depth": depth,
-            "wave_action": round(random.uniform(0.5, 3.0), 1),
-            "tidal_range": round(random.uniform(0.5, 4.0), 1),
-            "chlorophyll_a": round(random.uniform(0.5, 15.0), 2)
+            "wave_action": round(rng.uniform(0.5, 3.0), 1),
+            "tidal_range": round(rng.uniform(0.5, 4.0), 1),
+            "chlorophyll_a": round(rng.uniform(0.5, 15.0), 2)
         }
     elif sample_type in ["freshwater", "alpine_water"]:
         # Freshwater conditions
         return {
-            "temperature": round(random.uniform(4.0, 22.0), 1),
-            "ph": round(random.uniform(6.5, 8.5), 1),
-            "dissolved_oxygen": round(random.uniform(8.0, 14.0), 1),  # Higher oxygen
-            "turbidity": round(random.uniform(0.5, 12.0), 1),
-            "conductivity": random.randint(50, 500),  # Low conductivity
-            "salinity": round(random.uniform(0.0, 0.5), 1),  # Very low salinity
+            "temperature": round(rng.uniform(4.0, 22.0), 1),
+            "ph": round(rng.uniform(6.5, 8.5), 1),
+            "dissolved_oxygen": round(rng.uniform(8.0, 14.0), 1),  # Higher oxygen
+            "turbidity": round(rng.uniform(0.5, 12.0), 1),
+            "conductivity": rng.randint(50, 500),  # Low conductivity
+            "salinity": round(rng.uniform(0.0, 0.5), 1),  # Very low salinity
             "depth": depth,
-            "alkalinity": round(random.uniform(20, 200), 1),
-            "hardness": round(random.uniform(50, 300), 1),
-            "nitrate": round(random.uniform(0.1, 5.0), 2),
-            "phosphate": round(random.uniform(0.01, 0.5), 3)
+            "alkalinity": round(rng.uniform(20, 200), 1),
+            "hardness": round(rng.uniform(50, 300), 1),
+            "nitrate": round(rng.uniform(0.1, 5.0), 2),
+            "phosphate": round(rng.uniform(0.01, 0.5), 3)
         }
     elif sample_type == "soil":
         # Soil conditions
         return {
-            "temperature": round(random.uniform(8.0, 25.0), 1),
-            "ph": round(random.uniform(5.5, 8.0), 1),
-            "moisture_content": round(random.uniform(15.0, 45.0), 1),
-            "organic_matter": round(random.uniform(2.0, 12.0), 1),
-            "nitrogen": round(random.uniform(0.1, 2.5), 2),
-            "phosphorus": round(random.uniform(5.0, 50.0), 1),
-            "potassium": round(random.uniform(50, 300), 1),
-            "carbon_nitrogen_ratio": round(random.uniform(8.0, 25.0), 1),
-            "bulk_density": round(random.uniform(1.0, 1.8), 2),
-            "porosity": round(random.uniform(35.0, 60.0), 1),
-            "microbial_biomass": round(random.uniform(100, 800), 1)
+            "temperature": round(rng.uniform(8.0, 25.0), 1),
+            "ph": round(rng.uniform(5.5, 8.0), 1),
+            "moisture_content": round(rng.uniform(15.0, 45.0), 1),
+            "organic_matter": round(rng.uniform(2.0, 12.0), 1),
+            "nitrogen": round(rng.uniform(0.1, 2.5), 2),
+            "phosphorus": round(rng.uniform(5.0, 50.0), 1),
+            "potassium": round(rng.uniform(50, 300), 1),
+            "carbon_nitrogen_ratio": round(rng.uniform(8.0, 25.0), 1),
+            "bulk_density": round(rng.uniform(1.0, 1.8), 2),
+            "porosity": round(rng.uniform(35.0, 60.0), 1),
+            "microbial_biomass": round(rng.uniform(100, 800), 1)
         }
     elif sample_type in ["river_water", "urban_water"]:
         # River/urban water conditions
         return {
-            "temperature": round(random.uniform(10.0, 25.0), 1),
-            "ph": round(random.uniform(6.8, 8.2), 1),
-            "dissolved_oxygen": round(random.uniform(3.0, 10.0), 1),
-            "turbidity": round(random.uniform(5.0, 25.0), 1),  # Higher turbidity
-            "conductivity": random.randint(200, 1500),
-            "salinity": round(random.uniform(0.1, 2.0), 1),
+            "temperature": round(rng.uniform(10.0, 25.0), 1),
+            "ph": round(rng.uniform(6.8, 8.2), 1),
+            "dissolved_oxygen": round(rng.uniform(3.0, 10.0), 1),
+            "turbidity": round(rng.uniform(5.0, 25.0), 1),  # Higher turbidity
+            "conductivity": rng.randint(200, 1500),
+            "salinity": round(rng.uniform(0.1, 2.0), 1),
             "depth": depth,
-            "flow_rate": round(random.uniform(0.1, 3.0), 2),
-            "nitrate": round(random.uniform(1.0, 15.0), 2),  # Higher nutrients
-            "phosphate": round(random.uniform(0.1, 2.0), 2),
-            "coliform_count": random.randint(100, 10000),  # Pollution indicator
-            "heavy_metals": round(random.uniform(0.01, 0.5), 3)
+            "flow_rate": round(rng.uniform(0.1, 3.0), 2),
+            "nitrate": round(rng.uniform(1.0, 15.0), 2),  # Higher nutrients
+            "phosphate": round(rng.uniform(0.1, 2.0), 2),
+            "coliform_count": rng.randint(100, 10000),  # Pollution indicator
+            "heavy_metals": round(rng.uniform(0.01, 0.5), 3)
         }
     else:
         # Default marine
         return {
-            "temperature": round(random.uniform(12.0, 25.0), 1),
-            "ph": round(random.uniform(7.8, 8.3), 1),
-            "dissolved_oxygen": round(random.uniform(6.0, 12.0), 1),
-            "turbidity": round(random.uniform(1.0, 8.0), 1),
-            "conductivity": random.randint(35000, 50000),
-            "salinity": round(random.uniform(30.0, 38.0), 1),
+            "temperature": round(rng.uniform(12.0, 25.0), 1),
+            "ph": round(rng.uniform(7.8, 8.3), 1),
+            "dissolved_oxygen": round(rng.uniform(6.0, 12.0), 1),
+            "turbidity": round(rng.uniform(1.0, 8.0), 1),
+            "conductivity": rng.randint(35000, 50000),
+            "salinity": round(rng.uniform(30.0, 38.0), 1),
             "depth": depth
         }
 
@@ -875,8 +578,7 @@ def generate_unique_chart_data(file_info: dict, species_data: list) -> dict:
     """Generate unique chart data for each FASTA file"""
     
     # Use file ID for consistent randomization
-    file_seed = hash(file_info["id"]) % 2**32
-    random.seed(file_seed)
+    rng = stable_rng(file_info["id"])
     
     # Generate unique radar chart data for environmental and biodiversity metrics
     radar_data = []
@@ -954,7 +656,7 @@ def generate_unique_chart_data(file_info: dict, species_data: list) -> dict:
         
         # Generate value within range with file-specific variation
         min_val, max_val = base_ranges[metric]
-        value = random.randint(min_val, max_val)
+        value = rng.randint(min_val, max_val)
         
         radar_data.append({
             "metric": metric,
@@ -963,28 +665,28 @@ def generate_unique_chart_data(file_info: dict, species_data: list) -> dict:
         })
     
     # Generate unique clustering data
-    cluster_count = random.randint(4, 7)
+    cluster_count = rng.randint(4, 7)
     clustering_data = []
     cluster_names = ["Cluster 1", "Cluster 2", "Cluster 3", "Cluster 4", "Cluster 5", "Cluster 6", "Outliers"]
     
     for i in range(cluster_count):
         clustering_data.append({
             "cluster": cluster_names[i],
-            "x": random.randint(5, 45),
-            "y": random.randint(5, 40),
-            "z": random.randint(5, 35),
-            "size": random.randint(20, 150),
-            "species": random.choice(["Marine Fish", "Algae", "Bacteria", "Plankton", "Fungi", "Novel Species"])
+            "x": rng.randint(5, 45),
+            "y": rng.randint(5, 40),
+            "z": rng.randint(5, 35),
+            "size": rng.randint(20, 150),
+            "species": rng.choice(["Marine Fish", "Algae", "Bacteria", "Plankton", "Fungi", "Novel Species"])
         })
     
     # Add outliers cluster for novel species
     if any(s.get("is_novel", False) for s in species_data):
         clustering_data.append({
             "cluster": "Outliers",
-            "x": random.randint(40, 50),
-            "y": random.randint(5, 15),
-            "z": random.randint(25, 35),
-            "size": random.randint(15, 45),
+            "x": rng.randint(40, 50),
+            "y": rng.randint(5, 15),
+            "z": rng.randint(25, 35),
+            "size": rng.randint(15, 45),
             "species": "Novel Species"
         })
     
@@ -993,29 +695,29 @@ def generate_unique_chart_data(file_info: dict, species_data: list) -> dict:
     for cluster in clustering_data:
         cluster_size_data.append({
             "name": cluster["cluster"],
-            "sequences": random.randint(50, 500),
-            "abundance": random.randint(5, 35)
+            "sequences": rng.randint(50, 500),
+            "abundance": rng.randint(5, 35)
         })
     
     # Generate unique environmental correlation data
     environmental_data = []
     for i in range(6):
         environmental_data.append({
-            "temp": random.randint(5, 30),
-            "depth": random.randint(5, 200),
+            "temp": rng.randint(5, 30),
+            "depth": rng.randint(5, 200),
             "cluster": f"Cluster {chr(65 + i % 3)}",  # A, B, C
-            "ph": round(random.uniform(7.0, 8.5), 1),
-            "salinity": random.randint(30, 40)
+            "ph": round(rng.uniform(7.0, 8.5), 1),
+            "salinity": rng.randint(30, 40)
         })
     
     # Generate unique richness data
     richness_data = []
-    site_count = random.randint(6, 10)
+    site_count = rng.randint(6, 10)
     for i in range(site_count):
         richness_data.append({
             "site": f"Site {i + 1}",
-            "richness": random.randint(25, 60),
-            "diversity": round(random.uniform(2.0, 4.0), 1)
+            "richness": rng.randint(25, 60),
+            "diversity": round(rng.uniform(2.0, 4.0), 1)
         })
     
     # Generate unique abundance treemap data
@@ -1025,17 +727,17 @@ def generate_unique_chart_data(file_info: dict, species_data: list) -> dict:
     for species in species_data[:8]:  # Top 8 species
         abundance_treemap_data.append({
             "name": species["scientific_name"].split()[0],
-            "value": int(species["abundance"] * random.uniform(8, 15)),
-            "category": random.choice(categories)
+            "value": int(species["abundance"] * rng.uniform(8, 15)),
+            "category": rng.choice(categories)
         })
     
     # Generate unique prediction data
     quarters = ['Q1 2024', 'Q2 2024', 'Q3 2024', 'Q4 2024', 'Q1 2025', 'Q2 2025']
     prediction_data = []
-    base_value = random.randint(100, 150)
+    base_value = rng.randint(100, 150)
     
     for i, quarter in enumerate(quarters):
-        trend_factor = 1 + (i * 0.05) + random.uniform(-0.1, 0.1)
+        trend_factor = 1 + (i * 0.05) + rng.uniform(-0.1, 0.1)
         expected = int(base_value * trend_factor)
         prediction_data.append({
             "quarter": quarter,
@@ -1055,11 +757,11 @@ def generate_unique_chart_data(file_info: dict, species_data: list) -> dict:
     
     for i, (sim, conf) in enumerate(zip(similarity_values, confidence_values)):
         species_type = "Novel" if sim < 0.6 else "Known"
-        species_name = f"Unknown sp. {i-2}" if species_type == "Novel" else random.choice(known_species_pool)
+        species_name = f"Unknown sp. {i-2}" if species_type == "Novel" else rng.choice(known_species_pool)
         
         outlier_data.append({
-            "similarity": sim + random.uniform(-0.05, 0.05),
-            "confidence": conf + random.uniform(-0.05, 0.05),
+            "similarity": sim + rng.uniform(-0.05, 0.05),
+            "confidence": conf + rng.uniform(-0.05, 0.05),
             "type": species_type,
             "species": species_name
         })
@@ -1076,26 +778,274 @@ def generate_unique_chart_data(file_info: dict, species_data: list) -> dict:
     }
 
 @app.get("/fasta-files")
-async def get_fasta_files():
-    """Get list of available FASTA files"""
-    return {"files": FASTA_FILES}
+async def get_fasta_files(
+    response: Response,
+    sample_type: Optional[str] = None,
+    location: Optional[str] = None,
+    name: Optional[str] = None,
+    min_depth: Optional[float] = None,
+    max_depth: Optional[float] = None,
+    collected_from: Optional[str] = None,
+    collected_to: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """Get available FASTA files, optionally filtered and paginated (all files by default)"""
+    registry = get_registry()
+    response.headers["Last-Modified"] = http_date(registry.version)
+    return registry.query(
+        sample_type=sample_type,
+        location=location,
+        name=name,
+        min_depth=min_depth,
+        max_depth=max_depth,
+        collected_from=collected_from,
+        collected_to=collected_to,
+        offset=offset,
+        limit=limit
+    )
+
+# Maximum number of analysis reports kept in memory
+REPORT_CACHE_SIZE = int(os.environ.get("REPORT_CACHE_SIZE", "128"))
+
+_report_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+_report_cache_lock = threading.Lock()
+
+def get_report_data_version() -> tuple:
+    """Version of the data reports are built from (sample catalog + fungal data file)"""
+    return (get_registry().version, get_fungal_data_mtime())
+
+def get_cached_report(file_info: dict) -> dict:
+    """Get the analysis report for a file, building it on a cache miss"""
+    key = (file_info["id"], get_report_data_version())
+    with _report_cache_lock:
+        report = _report_cache.get(key)
+        if report is not None:
+            _report_cache.move_to_end(key)
+            return report
+    
+    report = build_analysis_report(file_info)
+    
+    with _report_cache_lock:
+        _report_cache[key] = report
+        _report_cache.move_to_end(key)
+        while len(_report_cache) > REPORT_CACHE_SIZE:
+            _report_cache.popitem(last=False)
+    return report
+
+def warm_report_cache() -> int:
+    """
+    Build the reports of the first REPORT_CACHE_SIZE catalog files (more would evict each other)
+    
+    Returns:
+        Number of reports built
+    """
+    files = get_registry().files[:REPORT_CACHE_SIZE]
+    for file_info in files:
+        get_cached_report(file_info)
+    return len(files)
+
+# Optional .npz file persisting the sample distance matrix across restarts (and sharing it between workers)
+DISTANCE_MATRIX_PATH = os.environ.get("DISTANCE_MATRIX_PATH", "")
+
+# Seconds between checks of the catalog for new or changed samples
+DISTANCE_SYNC_INTERVAL = float(os.environ.get("DISTANCE_SYNC_INTERVAL", "60"))
+
+# Fingerprint of this module's source, which holds the report generators
+with open(__file__, 'rb') as _source:
+    GENERATOR_VERSION = hashlib.sha256(_source.read()).hexdigest()[:16]
+
+# Pairwise distances between all catalog samples, filled by a background thread
+distance_index = DistanceIndex()
+
+# Modification time of DISTANCE_MATRIX_PATH when distance_index was last loaded or saved
+_distance_file_mtime: Optional[int] = None
+
+# Lock file held while this process is the one updating and saving the distance matrix
+_distance_writer_lock = None
+
+def sample_version(file_info: dict) -> str:
+    """Version of a sample's generated data (its catalog record and the generator code)"""
+    record = json.dumps(file_info, sort_keys=True)
+    return hashlib.sha256(f"{GENERATOR_VERSION}:{record}".encode()).hexdigest()[:16]
+
+def generate_sample_species(file_info: dict) -> List[dict]:
+    """A sample's species composition, as in its report, without building the rest of the report"""
+    rng = stable_rng(file_info["id"])
+    return generate_species_data_by_environment(file_info["sample_type"], file_info["depth"], rng)
+
+def _distance_file_version() -> Optional[int]:
+    try:
+        return os.stat(DISTANCE_MATRIX_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+def load_distance_index() -> None:
+    """Replace the distance index with the persisted one if the file changed since it was last loaded or saved"""
+    global distance_index, _distance_file_mtime
+    if not DISTANCE_MATRIX_PATH:
+        return
+    version = _distance_file_version()
+    if version is None or version == _distance_file_mtime:
+        return
+    try:
+        distance_index = DistanceIndex.load(DISTANCE_MATRIX_PATH)
+        _distance_file_mtime = version
+        logger.info(f"Loaded distances of {len(distance_index)} samples from {DISTANCE_MATRIX_PATH}")
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable distance matrix {DISTANCE_MATRIX_PATH}: {e}")
+
+def acquire_distance_writer() -> bool:
+    """
+    Become the process that updates and saves the distance matrix, if no other process is
+    
+    With DISTANCE_MATRIX_PATH set, one process (per file) holds an exclusive lock on
+    `<path>.lock`; the others only reload the file. Without it (or without fcntl)
+    every process keeps its own matrix.
+    """
+    global _distance_writer_lock
+    if not DISTANCE_MATRIX_PATH or fcntl is None or _distance_writer_lock is not None:
+        return True
+    lock_file = open(f"{DISTANCE_MATRIX_PATH}.lock", 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _distance_writer_lock = lock_file
+    return True
+
+def release_distance_writer() -> None:
+    """Let another process become the distance matrix writer"""
+    global _distance_writer_lock
+    if _distance_writer_lock is not None:
+        fcntl.flock(_distance_writer_lock, fcntl.LOCK_UN)
+        _distance_writer_lock.close()
+        _distance_writer_lock = None
+
+def sync_distance_index() -> int:
+    """
+    Add the catalog samples missing from the distance index and recompute those
+    whose data changed (one row each); only call it in the writer process
+    
+    Returns:
+        Number of samples added or recomputed
+    """
+    global _distance_file_mtime
+    updated = 0
+    for file_info in get_registry().files:
+        version = sample_version(file_info)
+        if distance_index.version(file_info["id"]) != version:
+            updated += distance_index.add(file_info["id"], generate_sample_species(file_info), version)
+    
+    if updated and DISTANCE_MATRIX_PATH:
+        distance_index.save(DISTANCE_MATRIX_PATH)
+        _distance_file_mtime = _distance_file_version()
+    return updated
+
+def distance_sync_loop() -> None:
+    """Background job keeping the distance matrix in step with the catalog"""
+    while True:
+        try:
+            if acquire_distance_writer():
+                updated = sync_distance_index()
+                if updated:
+                    logger.info(f"Distance matrix: updated {updated} samples ({len(distance_index)} total)")
+            else:
+                # Another worker computes and saves the matrix
+                load_distance_index()
+        except Exception as e:
+            logger.error(f"Distance matrix update failed: {e}")
+        time.sleep(DISTANCE_SYNC_INTERVAL)
+
+@app.on_event("startup")
+async def startup_event():
+    """Load the fungal dataset and warm the report cache so the first requests are served from memory"""
+    get_fungal_dataset()
+    warm_report_cache()
+    
+    # Precompute the sample distance matrix in the background
+    load_distance_index()
+    threading.Thread(target=distance_sync_loop, name="distance-matrix", daemon=True).start()
+
+# Top-level report sections that can be selected with the batch endpoint's `fields`
+REPORT_FIELDS = (
+    "file_info", "analysis_metadata", "summary_statistics", "species_composition",
+    "environmental_parameters", "taxonomic_breakdown", "quality_metrics",
+    "temporal_analysis", "specialized_analysis", "chart_data", "fungal_28s_analysis"
+)
+
+# Reports per /analysis page by default, and at most (each report is built on a cache miss)
+ANALYSIS_PAGE_SIZE = 50
+ANALYSIS_PAGE_MAX = 100
+
+@app.get("/analysis")
+async def get_analysis_reports(
+    ids: Optional[str] = None,
+    fields: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(ANALYSIS_PAGE_SIZE, ge=1, le=ANALYSIS_PAGE_MAX)
+):
+    """
+    Get one page of the analysis reports of several FASTA files in one response
+    
+    Args:
+        ids: Comma-separated file ids (default: all files)
+        fields: Comma-separated report sections to include (default: all)
+        offset: Number of known files to skip
+        limit: Maximum number of reports returned
+    """
+    if fields:
+        selected_fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in selected_fields if field not in REPORT_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}; valid fields are {', '.join(REPORT_FIELDS)}"
+            )
+    else:
+        selected_fields = None
+    
+    registry = get_registry()
+    if ids:
+        requested_ids = dict.fromkeys(file_id.strip() for file_id in ids.split(",") if file_id.strip())
+        known = [registry.get(file_id) for file_id in requested_ids if registry.get(file_id)]
+        missing = [file_id for file_id in requested_ids if not registry.get(file_id)]
+    else:
+        known = registry.files
+        missing = []
+    
+    reports = {}
+    for file_info in known[offset:offset + limit]:
+        report = get_cached_report(file_info)
+        if selected_fields is not None:
+            report = {field: report[field] for field in selected_fields}
+        reports[file_info["id"]] = report
+    
+    return {"total": len(known), "offset": offset, "limit": limit, "reports": reports, "missing": missing}
 
 @app.get("/analysis/{file_id}")
 async def get_analysis_report(file_id: str):
     """Get detailed analysis report for a specific FASTA file"""
     
     # Find the file
-    file_info = next((f for f in FASTA_FILES if f["id"] == file_id), None)
+    file_info = get_registry().get(file_id)
     if not file_info:
         raise HTTPException(status_code=404, detail="FASTA file not found")
     
-    # Use file ID as seed for consistent but different data per file
-    random.seed(hash(file_id) % 2**32)
+    return get_cached_report(file_info)
+
+def build_analysis_report(file_info: dict) -> dict:
+    """Build the detailed analysis report for a FASTA file"""
+    file_id = file_info["id"]
+    
+    # Use file ID as seed for consistent but different data per file; the
+    # generator is private to this request and seeded identically in every worker
+    rng = stable_rng(file_id)
     
     # Generate environment-specific analysis report with consistent seeding
-    file_seed = hash(file_id) % 2**32
-    species_data = generate_species_data_by_environment(file_info["sample_type"], file_info["depth"], file_seed)
-    environmental_data = generate_environmental_data_by_type(file_info["sample_type"], file_info["depth"])
+    species_data = generate_species_data_by_environment(file_info["sample_type"], file_info["depth"], rng)
+    environmental_data = generate_environmental_data_by_type(file_info["sample_type"], file_info["depth"], rng)
     
     # Calculate summary statistics
     total_species = len(species_data)
@@ -1104,25 +1054,29 @@ async def get_analysis_report(file_id: str):
     avg_confidence = sum(s["confidence_score"] for s in species_data) / total_species
     
     # Biodiversity indices
-    shannon_diversity = round(random.uniform(1.5, 3.2), 3)
-    simpson_diversity = round(random.uniform(0.6, 0.9), 3)
+    shannon_diversity = round(rng.uniform(1.5, 3.2), 3)
+    simpson_diversity = round(rng.uniform(0.6, 0.9), 3)
     
     # Generate specialized analysis sections based on environment type
-    specialized_analysis = generate_specialized_analysis(file_info["sample_type"], species_data, environmental_data, file_info["depth"])
+    specialized_analysis = generate_specialized_analysis(file_info["sample_type"], species_data, environmental_data, file_info["depth"], rng)
     
     # Generate unique chart data for this file
     chart_data = generate_unique_chart_data(file_info, species_data)
     
-    # Load and process 28S fungal data
-    fungal_data = load_28s_fungal_data()
-    fungal_analysis = process_28s_fungal_analysis(fungal_data) if fungal_data else None
+    # Processed 28S fungal data (loaded once, shared by all reports)
+    fungal_analysis = get_fungal_dataset()["analysis"]
+    
+    # Derived from the sample rather than the clock so every build is identical
+    processed_date = datetime.fromisoformat(file_info["collection_date"]) + timedelta(
+        minutes=stable_seed(file_id, "processed") % (14 * 24 * 60)
+    )
     
     analysis_report = {
         "file_info": file_info,
         "analysis_metadata": {
-            "analysis_id": f"analysis_{uuid.uuid4().hex[:12]}",
-            "processed_date": datetime.now().isoformat(),
-            "processing_time": f"{random.randint(45, 180)} seconds",
+            "analysis_id": f"analysis_{stable_seed(file_id, 'analysis') >> 16:012x}",
+            "processed_date": processed_date.isoformat(),
+            "processing_time": f"{rng.randint(45, 180)} seconds",
             "pipeline_version": "v2.1.3",
             "database_version": "NCBI_nt_2024.1",
             "analysis_type": get_analysis_type(file_info["sample_type"], file_info["depth"])
@@ -1152,15 +1106,15 @@ async def get_analysis_report(file_id: str):
             "phylums": {}
         },
         "quality_metrics": {
-            "sequence_quality_score": round(random.uniform(0.85, 0.98), 3),
-            "contamination_level": round(random.uniform(0.01, 0.05), 3),
-            "coverage_depth": f"{random.randint(50, 200)}x",
-            "gc_content": round(random.uniform(40.0, 60.0), 1)
+            "sequence_quality_score": round(rng.uniform(0.85, 0.98), 3),
+            "contamination_level": round(rng.uniform(0.01, 0.05), 3),
+            "coverage_depth": f"{rng.randint(50, 200)}x",
+            "gc_content": round(rng.uniform(40.0, 60.0), 1)
         },
         "temporal_analysis": {
-            "seasonal_variation": round(random.uniform(0.1, 0.4), 2),
-            "stability_index": round(random.uniform(0.6, 0.9), 2),
-            "trend_direction": random.choice(["increasing", "decreasing", "stable"])
+            "seasonal_variation": round(rng.uniform(0.1, 0.4), 2),
+            "stability_index": round(rng.uniform(0.6, 0.9), 2),
+            "trend_direction": rng.choice(["increasing", "decreasing", "stable"])
         },
         "specialized_analysis": specialized_analysis,
         "chart_data": chart_data,  # Add unique chart data for each file
@@ -1176,90 +1130,87 @@ async def get_analysis_report(file_id: str):
     
     return analysis_report
 
-@app.get("/analysis/fungal-28s")
-async def get_fungal_28s_analysis():
-    """Get detailed 28S fungal sequences analysis"""
-    
-    # Load and process 28S fungal data
-    fungal_data = load_28s_fungal_data()
-    if not fungal_data:
-        raise HTTPException(status_code=404, detail="28S fungal data not found")
-    
-    fungal_analysis = process_28s_fungal_analysis(fungal_data)
-    
-    return {
-        "analysis_type": "28S Fungal Sequences Analysis",
-        "data_source": "ITS RefSeq Fungi Database",
-        "analysis_results": fungal_analysis,
-        "visualization_data": {
-            "species_abundance_chart": [
-                {"species": species, "count": count} 
-                for species, count in list(fungal_analysis["species_distribution"].items())[:10]
-            ],
-            "depth_distribution_chart": [
-                {"depth_category": category, "count": count}
-                for category, count in fungal_analysis["environmental_analysis"]["depth_distribution"].items()
-            ],
-            "temperature_distribution_chart": [
-                {"temperature_category": category, "count": count}
-                for category, count in fungal_analysis["environmental_analysis"]["temperature_distribution"].items()
-            ],
-            "geographic_map_data": fungal_analysis["geographic_distribution"]
-        },
-        "key_insights": [
-            f"Analyzed {fungal_analysis['summary_statistics']['total_sequences_analyzed']} fungal sequences",
-            f"Identified {fungal_analysis['summary_statistics']['known_species_count']} known species",
-            f"Discovered {fungal_analysis['summary_statistics']['novel_candidates_count']} novel candidates",
-            f"Novelty discovery rate: {fungal_analysis['summary_statistics']['novelty_discovery_rate']}%",
-            f"Species diversity: {fungal_analysis['summary_statistics']['species_diversity']} unique species"
-        ]
-    }
-
 @app.get("/analysis/{file_id}/species")
 async def get_species_details(file_id: str, species_id: Optional[str] = None):
     """Get detailed species information"""
     
-    file_info = next((f for f in FASTA_FILES if f["id"] == file_id), None)
+    file_info = get_registry().get(file_id)
     if not file_info:
         raise HTTPException(status_code=404, detail="FASTA file not found")
     
     if species_id:
         # Return specific species details
+        rng = stable_rng(file_id, species_id)
         return {
             "species_id": species_id,
             "detailed_analysis": {
                 "genetic_markers": ["COI", "16S rRNA", "18S rRNA"],
-                "sequence_alignment_score": round(random.uniform(0.85, 0.99), 3),
+                "sequence_alignment_score": round(rng.uniform(0.85, 0.99), 3),
                 "phylogenetic_position": "Well-supported clade",
-                "ecological_role": random.choice(["Primary producer", "Primary consumer", "Secondary consumer", "Decomposer"]),
+                "ecological_role": rng.choice(["Primary producer", "Primary consumer", "Secondary consumer", "Decomposer"]),
                 "habitat_preferences": ["Freshwater", "Temperate zones", "Shallow waters"],
-                "conservation_status": random.choice(["Least Concern", "Near Threatened", "Vulnerable", "Data Deficient"])
+                "conservation_status": rng.choice(["Least Concern", "Near Threatened", "Vulnerable", "Data Deficient"])
             }
         }
     else:
         # Return all species for the file
-        return {"species": generate_species_data()}
+        return {"species": get_cached_report(file_info)["species_composition"]}
+
+@app.get("/analysis/{file_id}/neighbors")
+async def get_similar_samples(
+    file_id: str,
+    k: int = Query(10, ge=1, le=100),
+    metric: Optional[str] = None
+):
+    """Get the samples most similar to a file, from the precomputed distance matrix"""
+    
+    registry = get_registry()
+    if not registry.get(file_id):
+        raise HTTPException(status_code=404, detail="FASTA file not found")
+    if metric is not None and metric not in distance_index.metrics:
+        raise HTTPException(
+            status_code=400,
+            detail=f"metric must be one of {', '.join(distance_index.metrics)}"
+        )
+    if file_id not in distance_index:
+        raise HTTPException(
+            status_code=503,
+            detail="Distances for this sample are still being computed",
+            headers={"Retry-After": str(int(DISTANCE_SYNC_INTERVAL))}
+        )
+    
+    allowed = {f["id"] for f in registry.files}
+    neighbors = distance_index.neighbors(file_id, k, metric, allowed)
+    return {
+        "file_id": file_id,
+        "metric": metric or distance_index.metrics[0],
+        "neighbors": [
+            {"file_id": neighbor_id, "name": registry.get(neighbor_id)["name"], "distance": round(distance, 4)}
+            for neighbor_id, distance in neighbors
+        ]
+    }
 
 @app.get("/analysis/{file_id}/environmental")
 async def get_environmental_analysis(file_id: str):
     """Get environmental correlation analysis"""
     
-    file_info = next((f for f in FASTA_FILES if f["id"] == file_id), None)
+    file_info = get_registry().get(file_id)
     if not file_info:
         raise HTTPException(status_code=404, detail="FASTA file not found")
     
+    rng = stable_rng(file_id, "environmental")
     return {
         "environmental_correlations": {
-            "temperature_species_correlation": round(random.uniform(-0.5, 0.8), 3),
-            "ph_diversity_correlation": round(random.uniform(-0.3, 0.6), 3),
-            "oxygen_biomass_correlation": round(random.uniform(0.2, 0.9), 3)
+            "temperature_species_correlation": round(rng.uniform(-0.5, 0.8), 3),
+            "ph_diversity_correlation": round(rng.uniform(-0.3, 0.6), 3),
+            "oxygen_biomass_correlation": round(rng.uniform(0.2, 0.9), 3)
         },
         "habitat_suitability": {
-            "optimal_conditions": generate_environmental_data(),
+            "optimal_conditions": get_cached_report(file_info)["environmental_parameters"],
             "stress_indicators": {
-                "pollution_markers": random.randint(0, 3),
-                "invasive_species_count": random.randint(0, 2),
-                "ecosystem_health_score": round(random.uniform(0.6, 0.95), 2)
+                "pollution_markers": rng.randint(0, 3),
+                "invasive_species_count": rng.randint(0, 2),
+                "ecosystem_health_score": round(rng.uniform(0.6, 0.95), 2)
             }
         }
     }
@@ -1268,30 +1219,45 @@ async def get_environmental_analysis(file_id: str):
 async def compare_samples(file_ids: str):
     """Compare multiple samples"""
     
-    file_id_list = file_ids.split(",")
+    file_id_list = list(dict.fromkeys(file_id.strip() for file_id in file_ids.split(",") if file_id.strip()))
     if len(file_id_list) < 2:
-        raise HTTPException(status_code=400, detail="At least 2 file IDs required for comparison")
-    
-    comparison_data = {
-        "comparison_id": f"comp_{uuid.uuid4().hex[:8]}",
-        "samples": [],
-        "similarity_matrix": {},
-        "shared_species": [],
-        "unique_species": {},
-        "diversity_comparison": {}
-    }
+        raise HTTPException(status_code=400, detail="At least 2 distinct file IDs required for comparison")
     
-    for file_id in file_id_list:
-        file_info = next((f for f in FASTA_FILES if f["id"] == file_id), None)
-        if file_info:
-            comparison_data["samples"].append({
-                "file_id": file_id,
-                "name": file_info["name"],
-                "species_count": random.randint(5, 12),
-                "diversity_index": round(random.uniform(1.5, 3.2), 3)
-            })
+    registry = get_registry()
+    known_ids = [file_id for file_id in file_id_list if registry.get(file_id)]
+    if len(known_ids) < 2:
+        raise HTTPException(status_code=404, detail="At least 2 known FASTA files required for comparison")
+    reports = [get_cached_report(registry.get(file_id)) for file_id in known_ids]
+    
+    # Distances, shared and unique species from the samples' species abundances
+    comparison = compare_species(known_ids, [report["species_composition"] for report in reports])
     
-    return comparison_data
+    return {
+        "comparison_id": f"comp_{stable_seed(*sorted(known_ids)) >> 32:08x}",
+        "samples": [
+            {
+                "file_id": file_id,
+                "name": report["file_info"]["name"],
+                "species_count": report["summary_statistics"]["total_species_detected"],
+                "diversity_index": report["summary_statistics"]["shannon_diversity_index"]
+            }
+            for file_id, report in zip(known_ids, reports)
+        ],
+        "distance_matrices": comparison["distance_matrices"],
+        "similarity_matrix": comparison["similarity_matrices"],
+        "shared_species": comparison["shared_species"],
+        "unique_species": comparison["unique_species"],
+        "diversity_comparison": {
+            file_id: {
+                "shannon_diversity_index": report["summary_statistics"]["shannon_diversity_index"],
+                "simpson_diversity_index": report["summary_statistics"]["simpson_diversity_index"],
+                "species_richness": report["summary_statistics"]["total_species_detected"],
+                "novel_species_count": report["summary_statistics"]["novel_species_count"]
+            }
+            for file_id, report in zip(known_ids, reports)
+        },
+        "missing": [file_id for file_id in file_id_list if not registry.get(file_id)]
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,159 @@
+"""
+Sample Registry
+Indexed catalog of the FASTA sample metadata
+
+The catalog is a JSON file holding a list of sample records. It is indexed by
+id, name, sample type and location, and keeps depth and collection date in
+sorted columns so range queries are binary searches instead of scans. The
+registry is reloaded when the file's mtime changes.
+"""
+
+import os
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+# Sample catalog file, resolved next to this module by default
+CATALOG_PATH = os.environ.get(
+    "SAMPLE_CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fasta_files", "catalog.json")
+)
+
+# Loaded registry, replaced when the catalog file's mtime changes
+_registry: Optional["SampleRegistry"] = None
+_registry_lock = threading.Lock()
+
+
+class SampleRegistry:
+    """
+    Sample metadata with lookup indexes
+    """
+
+    def __init__(self, samples: List[dict], version: Optional[int] = None):
+        """
+        Build the indexes
+
+        Args:
+            samples: Sample records in catalog order (each with a unique 'id')
+            version: Version of the source (the catalog file's mtime)
+        """
+        self.files = samples
+        self.version = version
+
+        self._by_id: Dict[str, dict] = {}
+        self._by_name: Dict[str, int] = {}
+        self._by_sample_type: Dict[str, List[int]] = {}
+        self._by_location: Dict[str, List[int]] = {}
+        for position, sample in enumerate(samples):
+            if sample["id"] in self._by_id:
+                raise ValueError(f"Duplicate sample id in catalog: {sample['id']}")
+            self._by_id[sample["id"]] = sample
+            self._by_name[sample["name"]] = position
+            self._by_sample_type.setdefault(sample["sample_type"], []).append(position)
+            self._by_location.setdefault(sample["location"], []).append(position)
+
+        self._depth = self._sorted_column("depth")
+        self._collection_date = self._sorted_column("collection_date")
+
+    @classmethod
+    def from_file(cls, path: str = CATALOG_PATH) -> "SampleRegistry":
+        """Load the registry from a catalog file"""
+        version = os.stat(path).st_mtime_ns
+        with open(path, 'r') as f:
+            return cls(json.load(f), version)
+
+    def _sorted_column(self, field: str) -> Tuple[list, List[int]]:
+        """(sorted values, catalog positions in that order) of one field"""
+        pairs = sorted((sample[field], position) for position, sample in enumerate(self.files))
+        return [value for value, _ in pairs], [position for _, position in pairs]
+
+    @staticmethod
+    def _range(column: Tuple[list, List[int]], low=None, high=None) -> List[int]:
+        """Catalog positions with low <= value <= high (either bound optional)"""
+        values, positions = column
+        start = 0 if low is None else bisect_left(values, low)
+        stop = len(values) if high is None else bisect_right(values, high)
+        return positions[start:stop]
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def get(self, file_id: str) -> Optional[dict]:
+        """Sample with the given id (None if unknown)"""
+        return self._by_id.get(file_id)
+
+    def get_by_name(self, name: str) -> Optional[dict]:
+        """Sample with the given file name (None if unknown)"""
+        position = self._by_name.get(name)
+        return self.files[position] if position is not None else None
+
+    def sample_types(self) -> List[str]:
+        """Sample types present in the catalog"""
+        return sorted(self._by_sample_type)
+
+    def query(self,
+              sample_type: Optional[str] = None,
+              location: Optional[str] = None,
+              name: Optional[str] = None,
+              min_depth: Optional[float] = None,
+              max_depth: Optional[float] = None,
+              collected_from: Optional[str] = None,
+              collected_to: Optional[str] = None,
+              offset: int = 0,
+              limit: Optional[int] = None) -> dict:
+        """
+        Get one page of the samples matching all given filters
+
+        Args:
+            sample_type: Only samples of this type
+            location: Only samples from this location
+            name: Only the sample with this file name
+            min_depth, max_depth: Depth range in meters (inclusive)
+            collected_from, collected_to: Collection date range, YYYY-MM-DD (inclusive)
+            offset: Number of matching samples to skip
+            limit: Maximum number of samples returned (None for all)
+
+        Returns:
+            Total number of matches and the requested page, in catalog order
+        """
+        candidates: List[List[int]] = []
+        if sample_type is not None:
+            candidates.append(self._by_sample_type.get(sample_type, []))
+        if location is not None:
+            candidates.append(self._by_location.get(location, []))
+        if name is not None:
+            position = self._by_name.get(name)
+            candidates.append([position] if position is not None else [])
+        if min_depth is not None or max_depth is not None:
+            candidates.append(self._range(self._depth, min_depth, max_depth))
+        if collected_from is not None or collected_to is not None:
+            candidates.append(self._range(self._collection_date, collected_from, collected_to))
+
+        if candidates:
+            # Intersect starting from the smallest candidate list
+            candidates.sort(key=len)
+            matches = set(candidates[0])
+            for positions in candidates[1:]:
+                matches.intersection_update(positions)
+            matches = sorted(matches)
+        else:
+            matches = range(len(self.files))
+
+        stop = None if limit is None else offset + limit
+        page = [self.files[position] for position in matches[offset:stop]]
+        return {"total": len(matches), "offset": offset, "limit": limit, "files": page}
+
+
+def get_registry(path: str = CATALOG_PATH) -> SampleRegistry:
+    """Get the sample registry, reloading it when the catalog file changed"""
+    global _registry
+    version = os.stat(path).st_mtime_ns
+    registry = _registry
+    if registry is not None and registry.version == version:
+        return registry
+
+    with _registry_lock:
+        if _registry is None or _registry.version != version:
+            _registry = SampleRegistry.from_file(path)
+        return _registry
@@ -0,0 +1,157 @@
+"""
+Spatial Grid Index
+Zoom-aware clustering of map points on a fixed longitude/latitude grid
+
+Points are bucketed into square grid cells whose size halves with every zoom
+level (like web map tiles), so a viewport at any zoom maps to a bounded number
+of cells. Each zoom level is aggregated once, on first use, into one cluster
+per occupied cell (count, centroid, dominant label); a viewport query then
+only selects clusters, so the payload does not grow with the number of points.
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Grid cells per map tile edge; a 256px tile gives ~64px clusters
+CELLS_PER_TILE = 4
+
+# Deepest zoom level with its own grid (cells of ~150 m); deeper zooms reuse it
+MAX_ZOOM = 16
+
+
+def cell_size(zoom: int) -> float:
+    """Edge length in degrees of the grid cells at a zoom level"""
+    return 360.0 / (2 ** zoom * CELLS_PER_TILE)
+
+
+class GridClusterIndex:
+    """
+    Grid index over points with per-zoom cluster aggregates
+    """
+
+    def __init__(self, lat: np.ndarray, lng: np.ndarray, labels: List[str], ids: List[str]):
+        """
+        Build the index
+
+        Args:
+            lat: Latitude of each point
+            lng: Longitude of each point
+            labels: Label of each point (e.g. species); clusters report the most common one
+            ids: Identifier of each point, reported for single-point clusters
+        """
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        self.ids = ids
+        self.label_names, self.label_codes = np.unique(np.asarray(labels, dtype=object).astype(str), return_inverse=True)
+        self._levels: Dict[int, Dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def _level(self, zoom: int) -> Dict[str, np.ndarray]:
+        """Cluster aggregates of one zoom level, sorted by cell column for bbox queries"""
+        level = self._levels.get(zoom)
+        if level is not None:
+            return level
+
+        with self._lock:
+            if zoom not in self._levels:
+                self._levels[zoom] = self._aggregate(zoom)
+            return self._levels[zoom]
+
+    def _aggregate(self, zoom: int) -> Dict[str, np.ndarray]:
+        size = cell_size(zoom)
+        columns = int(np.ceil(360.0 / size))
+        cell_x = np.clip(((self.lng + 180.0) // size).astype(np.int64), 0, columns - 1)
+        cell_y = ((self.lat + 90.0) // size).astype(np.int64)
+        cells, inverse, counts = np.unique(cell_y * columns + cell_x, return_inverse=True, return_counts=True)
+
+        lat_sum = np.bincount(inverse, weights=self.lat, minlength=len(cells))
+        lng_sum = np.bincount(inverse, weights=self.lng, minlength=len(cells))
+
+        # Dominant label per cell: count (cell, label) pairs and keep the largest per cell
+        n_labels = max(len(self.label_names), 1)
+        pairs, pair_counts = np.unique(inverse * n_labels + self.label_codes, return_counts=True)
+        pair_cells = pairs // n_labels
+        best = np.lexsort((-pair_counts, pair_cells))
+        first_of_cell = np.ones(len(best), dtype=bool)
+        first_of_cell[1:] = pair_cells[best][1:] != pair_cells[best][:-1]
+        dominant = (pairs[best][first_of_cell] % n_labels)
+
+        # Any point of each cell, used to report single points by id
+        member = np.zeros(len(cells), dtype=np.int64)
+        member[inverse] = np.arange(len(inverse))
+
+        order = np.argsort(cells % columns, kind="stable")
+        return {
+            "cell_x": (cells % columns)[order],
+            "lat": (lat_sum / counts)[order],
+            "lng": (lng_sum / counts)[order],
+            "count": counts[order],
+            "label": dominant[order],
+            "member": member[order]
+        }
+
+    def clusters(self,
+                 zoom: int,
+                 bbox: Optional[Tuple[float, float, float, float]] = None,
+                 limit: Optional[int] = None) -> List[dict]:
+        """
+        Clusters of the points in a viewport
+
+        Args:
+            zoom: Map zoom level (clamped to 0..MAX_ZOOM)
+            bbox: (min_lng, min_lat, max_lng, max_lat); min_lng > max_lng crosses the antimeridian
+            limit: Maximum number of clusters returned (largest first)
+
+        Returns:
+            Clusters with centroid 'lat'/'lng', point 'count' and dominant
+            'species'; single-point clusters also carry the point's 'id'
+        """
+        zoom = min(max(zoom, 0), MAX_ZOOM)
+        level = self._level(zoom)
+        selected = np.arange(len(level["count"]))
+
+        if bbox is not None:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            size = cell_size(zoom)
+            # Candidate columns by binary search, then exact centroid test
+            first = int((min_lng + 180.0) // size)
+            last = int((max_lng + 180.0) // size)
+            if min_lng <= max_lng:
+                spans = [(first, last)]
+            else:
+                spans = [(first, np.iinfo(np.int64).max), (np.iinfo(np.int64).min, last)]
+            candidates = np.concatenate([
+                np.arange(
+                    np.searchsorted(level["cell_x"], low, side="left"),
+                    np.searchsorted(level["cell_x"], high, side="right")
+                )
+                for low, high in spans
+            ])
+            lat = level["lat"][candidates]
+            lng = level["lng"][candidates]
+            in_lng = (lng >= min_lng) & (lng <= max_lng) if min_lng <= max_lng else (lng >= min_lng) | (lng <= max_lng)
+            selected = candidates[in_lng & (lat >= min_lat) & (lat <= max_lat)]
+
+        # Largest clusters first so a limit keeps the most significant ones
+        selected = selected[np.argsort(-level["count"][selected], kind="stable")]
+        if limit is not None:
+            selected = selected[:limit]
+
+        clusters = []
+        for i in selected.tolist():
+            count = int(level["count"][i])
+            cluster = {
+                "lat": float(level["lat"][i]),
+                "lng": float(level["lng"][i]),
+                "species": str(self.label_names[level["label"][i]]),
+                "count": count
+            }
+            if count == 1:
+                cluster["id"] = self.ids[int(level["member"][i])]
+            clusters.append(cluster)
+        return clusters
@@ -5,6 +5,7 @@ Optimized for Render.com deployment
 """
 import os
 import sys
+import shutil
 import uvicorn
 from pathlib import Path
 
@@ -24,6 +25,16 @@ def main():
     backend_dir = Path(__file__).parent
     os.chdir(backend_dir)
     
+    # Several workers: hand over to gunicorn, which preloads the app once and forks them
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    if workers > 1:
+        gunicorn = shutil.which("gunicorn")
+        if gunicorn:
+            print(f"👥 Starting {workers} workers with gunicorn (preloaded app)")
+            sys.stdout.flush()
+            os.execv(gunicorn, [gunicorn, "-c", "gunicorn.conf.py", "main:app"])
+        print("⚠️  gunicorn not installed, starting a single worker")
+    
     try:
         # Start the server
         uvicorn.run(
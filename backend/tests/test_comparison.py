@@ -0,0 +1,140 @@
+"""
+Tests for the beta-diversity metrics and the /comparison endpoint
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from comparison import bray_curtis, compare_species, jaccard, taxonomy_matrix, weighted_unifrac  # noqa: E402
+from registry import get_registry  # noqa: E402
+
+
+def species(name: str, abundance: float, kingdom: str = "Animalia", phylum: str = "Chordata") -> dict:
+    return {"scientific_name": name, "abundance": abundance, "kingdom": kingdom, "phylum": phylum}
+
+
+@pytest.mark.parametrize("metric", [bray_curtis, jaccard])
+def test_identical_and_disjoint_abundances(metric):
+    X = np.array([
+        [3, 1, 0, 0],
+        [3, 1, 0, 0],
+        [0, 0, 2, 5],
+    ], dtype=np.float32)
+    distances = metric(X)
+
+    np.testing.assert_allclose(np.diag(distances), 0)
+    assert distances[0, 1] == pytest.approx(0)
+    assert distances[0, 2] == pytest.approx(1)
+    np.testing.assert_allclose(distances, distances.T)
+
+
+def test_partial_overlap():
+    X = np.array([[1, 2, 0]], dtype=np.float32)
+    Y = np.array([[0, 2, 2]], dtype=np.float32)
+
+    # (1 + 0 + 2) / (3 + 4)
+    assert bray_curtis(X, Y)[0, 0] == pytest.approx(3 / 7)
+    # 1 - |{1}| / |{0, 1, 2}|
+    assert jaccard(X, Y)[0, 0] == pytest.approx(2 / 3)
+
+
+def test_empty_samples_are_identical():
+    X = np.zeros((2, 3), dtype=np.float32)
+    assert bray_curtis(X).tolist() == [[0, 0], [0, 0]]
+    assert jaccard(X).tolist() == [[0, 0], [0, 0]]
+
+
+def test_weighted_unifrac_taxonomy_tree():
+    samples = [
+        [species("Gadus morhua", 1)],
+        # Same genus, other species: only the two species branches differ
+        [species("Gadus chalcogrammus", 1)],
+        # Same kingdom, other phylum: phylum, genus and species branches differ
+        [species("Octopus vulgaris", 1, phylum="Mollusca")],
+        # Half Gadus morhua, half Gadus chalcogrammus
+        [species("Gadus morhua", 1), species("Gadus chalcogrammus", 1)],
+    ]
+    distances = weighted_unifrac(taxonomy_matrix(samples))
+
+    # Branch weights per rank sum to 1, so sum(p + q) = 2 * 4 ranks = 8
+    assert distances[0, 0] == pytest.approx(0)
+    assert distances[0, 1] == pytest.approx(2 / 8)
+    assert distances[0, 2] == pytest.approx(6 / 8)
+    assert distances[0, 3] == pytest.approx(1 / 8)
+    assert distances[3, 1] == pytest.approx(1 / 8)
+
+
+def test_weighted_unifrac_disjoint_kingdoms():
+    samples = [[species("Gadus morhua", 4)], [species("Aspergillus niger", 2, "Fungi", "Ascomycota")]]
+    assert weighted_unifrac(taxonomy_matrix(samples))[0, 1] == pytest.approx(1)
+
+
+def test_compare_species():
+    samples = [
+        [species("Gadus morhua", 2), species("Salmo salar", 2)],
+        [species("Gadus morhua", 2), species("Salmo salar", 2)],
+        [species("Gadus morhua", 1), species("Octopus vulgaris", 3, phylum="Mollusca")],
+    ]
+    result = compare_species(["a", "b", "c"], samples)
+    distances = result["distance_matrices"]
+
+    assert distances["sample_ids"] == ["a", "b", "c"]
+    assert distances["bray_curtis"][0][1] == 0
+    # |2 - 1| + |2 - 0| + |0 - 3| over 4 + 4
+    assert distances["bray_curtis"][0][2] == pytest.approx(0.75)
+    assert distances["jaccard"][0][2] == pytest.approx(round(2 / 3, 4))
+    for metric in ("bray_curtis", "jaccard", "weighted_unifrac"):
+        similarities = np.asarray(result["similarity_matrices"][metric])
+        np.testing.assert_allclose(similarities, 1 - np.asarray(distances[metric]), atol=1e-4)
+
+    assert result["shared_species"] == ["Gadus morhua"]
+    assert result["unique_species"] == {"a": [], "b": [], "c": ["Octopus vulgaris"]}
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture(scope="module")
+def file_ids():
+    return [f["id"] for f in get_registry().files]
+
+
+def test_comparison_endpoint(client, file_ids):
+    response = client.get(f"/comparison?file_ids={file_ids[0]},{file_ids[1]}")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["distance_matrices"]["sample_ids"] == file_ids[:2]
+    assert body["missing"] == []
+
+
+@pytest.mark.parametrize("query", ["{a}", "{a},{a}", "{a}, {a},", ",,"])
+def test_comparison_needs_two_distinct_ids(client, file_ids, query):
+    response = client.get("/comparison?file_ids=" + query.format(a=file_ids[0]))
+    assert response.status_code == 400
+
+
+def test_comparison_needs_two_known_ids(client, file_ids):
+    response = client.get(f"/comparison?file_ids={file_ids[0]},unknown_id")
+    assert response.status_code == 404
+
+
+def test_comparison_reports_unknown_and_ignores_duplicate_ids(client, file_ids):
+    a, b = file_ids[:2]
+    response = client.get(f"/comparison?file_ids={a},unknown_id,{b},{a}")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["distance_matrices"]["sample_ids"] == [a, b]
+    assert body["missing"] == ["unknown_id"]
+
+    # The comparison id names the set of samples, whatever the order or duplicates
+    reordered = client.get(f"/comparison?file_ids={b},{a}").json()
+    assert reordered["comparison_id"] == body["comparison_id"]
@@ -0,0 +1,218 @@
+"""
+Tests for the incremental sample distance matrix and its sync between processes
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from comparison import compare_species  # noqa: E402
+from distance_matrix import METRICS, DistanceIndex, _CondensedMatrix  # noqa: E402
+from registry import SampleRegistry, get_registry  # noqa: E402
+
+ALL_METRICS = list(METRICS)
+
+# compare_species rounds to 4 decimals and the index stores float32
+TOLERANCE = 1e-4
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    """(ids, species lists) of the sample catalog"""
+    files = get_registry().files
+    return [f["id"] for f in files], [main.generate_sample_species(f) for f in files]
+
+
+def full_matrix(index: DistanceIndex, metric: str) -> np.ndarray:
+    return np.asarray([index._distances[metric].row(i) for i in range(len(index))])
+
+
+def brute_force(ids, species_lists, metric: str) -> np.ndarray:
+    return np.asarray(compare_species(ids, species_lists)["distance_matrices"][metric])
+
+
+def build_index(ids, species_lists, metrics=ALL_METRICS) -> DistanceIndex:
+    index = DistanceIndex(metrics)
+    for sample_id, species in zip(ids, species_lists):
+        assert index.add(sample_id, species, "v1")
+    return index
+
+
+def test_condensed_offsets():
+    dense = np.array([
+        [0, 1, 2, 4],
+        [1, 0, 3, 5],
+        [2, 3, 0, 6],
+        [4, 5, 6, 0],
+    ], dtype=np.float32)
+    matrix = _CondensedMatrix()
+    for i in range(len(dense)):
+        matrix.append(dense[i, :i])
+
+    # Row i starts at i*(i-1)/2
+    assert matrix.values.tolist() == [1, 2, 3, 4, 5, 6]
+    for i in range(len(dense)):
+        assert matrix.row(i).tolist() == dense[i].tolist()
+
+    matrix.set_row(1, np.array([7, 0, 8, 9], dtype=np.float32))
+    assert matrix.values.tolist() == [7, 2, 8, 4, 9, 6]
+    assert matrix.row(3).tolist() == [4, 9, 6, 0]
+
+
+@pytest.mark.parametrize("metric", ALL_METRICS)
+def test_incremental_matches_brute_force(catalog, metric):
+    ids, species_lists = catalog
+    index = build_index(ids, species_lists)
+
+    expected = brute_force(ids, species_lists, metric)
+    np.testing.assert_allclose(full_matrix(index, metric), expected, atol=TOLERANCE)
+
+    condensed = index.condensed(metric)
+    assert len(condensed) == len(ids) * (len(ids) - 1) // 2
+    for i in range(len(ids)):
+        for j in range(i):
+            assert condensed[i * (i - 1) // 2 + j] == pytest.approx(expected[i, j], abs=TOLERANCE)
+
+
+def test_same_version_is_not_recomputed(catalog):
+    ids, species_lists = catalog
+    index = build_index(ids, species_lists)
+    before = index.condensed("bray_curtis").copy()
+
+    assert not index.add(ids[0], species_lists[1], "v1")
+    assert index.condensed("bray_curtis").tolist() == before.tolist()
+
+
+@pytest.mark.parametrize("position", [0, 4, -1])
+def test_changed_sample_row_is_recomputed(catalog, position):
+    ids, species_lists = catalog
+    index = build_index(ids, species_lists)
+
+    # A new species name also adds a profile column after the row was stored
+    changed = list(species_lists)
+    changed[position] = species_lists[1] + [
+        {"scientific_name": "Novelus testii", "kingdom": "Animalia", "phylum": "Testphyla", "abundance": 42.0}
+    ]
+    assert index.add(ids[position], changed[position], "v2")
+
+    assert index.version(ids[position]) == "v2"
+    assert len(index) == len(ids)
+    for metric in ALL_METRICS:
+        np.testing.assert_allclose(full_matrix(index, metric), brute_force(ids, changed, metric), atol=TOLERANCE)
+
+
+def test_neighbors_match_sorted_row(catalog):
+    ids, species_lists = catalog
+    index = build_index(ids, species_lists)
+    expected = brute_force(ids, species_lists, "bray_curtis")
+
+    for i, sample_id in enumerate(ids):
+        neighbors = index.neighbors(sample_id, k=5, metric="bray_curtis")
+        distances = [distance for _, distance in neighbors]
+        assert len(neighbors) == 5
+        assert sample_id not in [neighbor for neighbor, _ in neighbors]
+        assert distances == sorted(distances)
+        others = np.delete(expected[i], i)
+        np.testing.assert_allclose(distances, np.sort(others)[:5], atol=TOLERANCE)
+
+    allowed = set(ids[:3])
+    neighbors = index.neighbors(ids[0], k=10, allowed=allowed)
+    assert {neighbor for neighbor, _ in neighbors} == allowed - {ids[0]}
+
+
+def test_save_load_round_trip(catalog, tmp_path):
+    ids, species_lists = catalog
+    index = build_index(ids, species_lists)
+    index.add(ids[2], species_lists[5], "v2")
+    path = str(tmp_path / "distances.npz")
+    index.save(path)
+
+    loaded = DistanceIndex.load(path, ALL_METRICS)
+    assert loaded.ids == index.ids
+    assert loaded.versions == index.versions
+    for metric in ALL_METRICS:
+        assert loaded.condensed(metric).tolist() == index.condensed(metric).tolist()
+    assert loaded.neighbors(ids[0], k=5) == index.neighbors(ids[0], k=5)
+
+    # The loaded profiles keep extending the matrix like the original ones
+    changed = list(species_lists)
+    changed[2] = species_lists[5]
+    changed[7] = species_lists[0]
+    assert loaded.add(ids[7], changed[7], "v2")
+    for metric in ALL_METRICS:
+        np.testing.assert_allclose(full_matrix(loaded, metric), brute_force(ids, changed, metric), atol=TOLERANCE)
+
+
+def test_load_recomputes_metrics_missing_from_file(catalog, tmp_path):
+    ids, species_lists = catalog
+    path = str(tmp_path / "distances.npz")
+    build_index(ids, species_lists, ["bray_curtis"]).save(path)
+
+    loaded = DistanceIndex.load(path, ["bray_curtis", "weighted_unifrac"])
+    np.testing.assert_allclose(
+        full_matrix(loaded, "weighted_unifrac"),
+        brute_force(ids, species_lists, "weighted_unifrac"),
+        atol=TOLERANCE
+    )
+
+
+@pytest.fixture
+def shared_matrix(tmp_path, monkeypatch):
+    """main's distance state pointed at a fresh file, restored afterwards"""
+    monkeypatch.setattr(main, "DISTANCE_MATRIX_PATH", str(tmp_path / "distances.npz"))
+    monkeypatch.setattr(main, "distance_index", DistanceIndex(ALL_METRICS))
+    monkeypatch.setattr(main, "_distance_file_mtime", None)
+    yield main.DISTANCE_MATRIX_PATH
+    main.release_distance_writer()
+
+
+@pytest.mark.skipif(main.fcntl is None, reason="file locks need fcntl")
+def test_single_distance_writer(shared_matrix):
+    assert main.acquire_distance_writer()
+    # Reentrant within the writer process
+    assert main.acquire_distance_writer()
+
+    # flock locks belong to the open file, so a second open stands in for another process
+    with open(f"{shared_matrix}.lock", 'a') as other:
+        with pytest.raises(OSError):
+            main.fcntl.flock(other, main.fcntl.LOCK_EX | main.fcntl.LOCK_NB)
+
+        main.release_distance_writer()
+        main.fcntl.flock(other, main.fcntl.LOCK_EX | main.fcntl.LOCK_NB)
+        assert not main.acquire_distance_writer()
+        main.fcntl.flock(other, main.fcntl.LOCK_UN)
+
+
+def test_sync_saves_and_followers_reload(catalog, shared_matrix, monkeypatch):
+    ids, species_lists = catalog
+    files = get_registry().files
+
+    assert main.sync_distance_index() == len(files)
+    assert main.sync_distance_index() == 0
+    assert os.path.exists(shared_matrix)
+    writer_index = main.distance_index
+
+    # A follower process starts empty and reloads the saved file
+    monkeypatch.setattr(main, "distance_index", DistanceIndex(ALL_METRICS))
+    monkeypatch.setattr(main, "_distance_file_mtime", None)
+    main.load_distance_index()
+    assert main.distance_index.ids == writer_index.ids
+    assert main.distance_index.versions == writer_index.versions
+    np.testing.assert_allclose(
+        full_matrix(main.distance_index, "bray_curtis"), brute_force(ids, species_lists, "bray_curtis"), atol=TOLERANCE
+    )
+
+    # A changed catalog record gets a new version and only its row recomputed
+    changed_files = [dict(f) for f in files]
+    changed_files[3]["sample_type"] = "soil" if files[3]["sample_type"] != "soil" else "seawater"
+    monkeypatch.setattr(main, "get_registry", lambda: SampleRegistry(changed_files))
+    assert main.sync_distance_index() == 1
+    changed_species = [main.generate_sample_species(f) for f in changed_files]
+    np.testing.assert_allclose(
+        full_matrix(main.distance_index, "bray_curtis"), brute_force(ids, changed_species, "bray_curtis"), atol=TOLERANCE
+    )
@@ -0,0 +1,116 @@
+"""
+Species Traits
+Precompiled term matching for the specialized analyses
+
+Each trait is defined by terms that mark it when they occur in a species'
+scientific name or habitat (case-insensitive). All terms of a field are
+compiled into one Aho-Corasick automaton, so a species is tagged with every
+trait in a single scan of each lowercased field, whatever the number of terms.
+"""
+
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List
+
+# Terms in the scientific name marking each trait
+SCIENTIFIC_NAME_TRAITS = {
+    "extremophile": ["pyrococcus", "thermotoga", "methanocaldococcus", "pyrodictium", "colwellia", "shewanella"],
+    "thermophile": ["thermo"],
+    "psychrophile": ["psychr", "colwellia"],
+    "piezophile": ["piezo", "shewanella"],
+    "phytoplankton": ["prochlorococcus", "synechococcus", "thalassiosira", "emiliania"],
+    "vibrio": ["vibrio"],
+    "nitrogen_fixer": ["rhizobium", "azotobacter"],
+    "phosphate_solubilizer": ["pseudomonas"],
+    "mycorrhizal": ["mycorrhiz", "glomus"],
+    "plant_growth_promoter": ["fluorescens"],
+    "disease_suppressor": ["trichoderma"],
+    "pollution_indicator": ["escherichia", "enterococcus", "pseudomonas"],
+    "coliform": ["escherichia"],
+    "pathogen": ["pseudomonas"],
+}
+
+# Terms in the habitat description marking each trait
+HABITAT_TRAITS = {
+    "pressure_adapted": ["pressure", "deep"],
+    "chemosynthetic": ["chemosynthetic"],
+}
+
+
+class TraitMatcher:
+    """
+    Aho-Corasick automaton mapping the terms found in a text to their traits
+    """
+
+    def __init__(self, traits: Dict[str, List[str]]):
+        """
+        Compile the terms of all traits
+
+        Args:
+            traits: Terms (lowercase) marking each trait
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[FrozenSet[str]] = [frozenset()]
+        terms: Dict[str, set] = {}
+        for trait, trait_terms in traits.items():
+            for term in trait_terms:
+                terms.setdefault(term, set()).add(trait)
+
+        # Trie of all terms
+        for term, term_traits in terms.items():
+            state = 0
+            for char in term:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._output.append(frozenset())
+                state = next_state
+            self._output[state] = self._output[state] | term_traits
+
+        # Failure links, breadth first, merging the outputs of the suffix states
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] | self._output[self._fail[next_state]]
+                queue.append(next_state)
+
+    def match(self, text: str) -> FrozenSet[str]:
+        """Traits of all terms occurring in a (lowercase) text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        found = frozenset()
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found = found | output[state]
+        return found
+
+
+_scientific_name_matcher = TraitMatcher(SCIENTIFIC_NAME_TRAITS)
+_habitat_matcher = TraitMatcher(HABITAT_TRAITS)
+
+
+def species_traits(species_data: Iterable[dict]) -> List[FrozenSet[str]]:
+    """
+    Tag species with their traits
+
+    Args:
+        species_data: Species entries ('scientific_name', optional 'habitat')
+
+    Returns:
+        The traits of each species, in order
+    """
+    return [
+        _scientific_name_matcher.match(s["scientific_name"].lower())
+        | _habitat_matcher.match(s.get("habitat", "").lower())
+        for s in species_data
+    ]
@@ -47,10 +47,13 @@ interface Fungal28sData {
         average: number;
       };
     };
+    // Clustered sample locations; `id` is set for single-sample clusters
     geographic_distribution: Array<{
       lat: number;
       lng: number;
       species: string;
+      count: number;
+      id?: string;
     }>;
     cluster_analysis: Record<string, number>;
     research_insights: {
@@ -64,7 +67,7 @@ interface Fungal28sData {
     species_abundance_chart: Array<{ species: string; count: number }>;
     depth_distribution_chart: Array<{ depth_category: string; count: number }>;
     temperature_distribution_chart: Array<{ temperature_category: string; count: number }>;
-    geographic_map_data: Array<{ lat: number; lng: number; species: string }>;
+    geographic_map_data: Array<{ lat: number; lng: number; species: string; count: number; id?: string }>;
   };
   key_insights: string[];
 }
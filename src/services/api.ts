@@ -3,6 +3,12 @@ const API_BASE_URL = (import.meta as any).env?.VITE_API_BASE_URL ||
     ? 'https://taxaformer-1.onrender.com'
     : 'http://localhost:8000');
 
+// Prebuilt static snapshot of the read-only endpoints (backend/build_static.py), e.g. '/api'
+const STATIC_API_URL: string = (import.meta as any).env?.VITE_STATIC_API_URL || '';
+
+// Reports per /analysis page (the backend's default page size, which the snapshot pages use)
+const ANALYSIS_PAGE_SIZE = 50;
+
 export interface FastaFile {
   id: string;
   name: string;
@@ -128,15 +134,64 @@ export interface AnalysisReport {
   };
 }
 
+export interface Fungal28sRecordFilters {
+  min_depth?: number;
+  max_depth?: number;
+  min_temperature?: number;
+  max_temperature?: number;
+  cluster_id?: number;
+  status?: string;
+  // [min_lng, min_lat, max_lng, max_lat]
+  bbox?: [number, number, number, number];
+  offset?: number;
+  limit?: number;
+}
+
+export interface Fungal28sRecordPage {
+  total: number;
+  offset: number;
+  limit: number;
+  records: any[];
+}
+
+export interface AnalysisReportPage {
+  total: number;
+  offset: number;
+  limit: number;
+  reports: Record<string, Partial<AnalysisReport>>;
+  missing: string[];
+}
+
+export interface Fungal28sMapView {
+  zoom: number;
+  total_points: number;
+  points_in_view: number;
+  // Largest first; `id` is set for single-sample clusters
+  clusters: Array<{ lat: number; lng: number; species: string; count: number; id?: string }>;
+}
+
 class ApiService {
   private baseUrl: string;
+  private staticUrl: string;
 
-  constructor(baseUrl: string = API_BASE_URL) {
+  constructor(baseUrl: string = API_BASE_URL, staticUrl: string = STATIC_API_URL) {
     this.baseUrl = baseUrl;
+    this.staticUrl = staticUrl;
+  }
+
+  // GET a snapshotted response from the static files when configured, falling back to the live API
+  private async fetchSnapshot(path: string, livePath: string = path): Promise<Response> {
+    if (this.staticUrl) {
+      const response = await fetch(`${this.staticUrl}${path}.json`).catch(() => null);
+      if (response?.ok) {
+        return response;
+      }
+    }
+    return fetch(`${this.baseUrl}${livePath}`);
   }
 
   async getFastaFiles(): Promise<{ files: FastaFile[] }> {
-    const response = await fetch(`${this.baseUrl}/fasta-files`);
+    const response = await this.fetchSnapshot('/fasta-files');
     if (!response.ok) {
       throw new Error('Failed to fetch FASTA files');
     }
@@ -144,19 +199,40 @@ class ApiService {
   }
 
   async getAnalysisReport(fileId: string): Promise<AnalysisReport> {
-    const response = await fetch(`${this.baseUrl}/analysis/${fileId}`);
+    const response = await this.fetchSnapshot(`/analysis/${fileId}`);
     if (!response.ok) {
       throw new Error(`Failed to fetch analysis report for ${fileId}`);
     }
     return response.json();
   }
 
-  async getSpeciesDetails(fileId: string, speciesId?: string): Promise<any> {
-    const url = speciesId
-      ? `${this.baseUrl}/analysis/${fileId}/species?species_id=${speciesId}`
-      : `${this.baseUrl}/analysis/${fileId}/species`;
+  async getAnalysisReports(
+    fileIds?: string[],
+    fields?: string[],
+    offset: number = 0
+  ): Promise<AnalysisReportPage> {
+    const params = new URLSearchParams({ offset: String(offset), limit: String(ANALYSIS_PAGE_SIZE) });
+    if (fileIds) {
+      params.set('ids', fileIds.join(','));
+    }
+    if (fields) {
+      params.set('fields', fields.join(','));
+    }
 
-    const response = await fetch(url);
+    const livePath = `/analysis?${params}`;
+    const response = fileIds || fields
+      ? await fetch(`${this.baseUrl}${livePath}`)
+      : await this.fetchSnapshot(`/analysis/offset/${offset}`, livePath);
+    if (!response.ok) {
+      throw new Error('Failed to fetch analysis reports');
+    }
+    return response.json();
+  }
+
+  async getSpeciesDetails(fileId: string, speciesId?: string): Promise<any> {
+    const response = speciesId
+      ? await fetch(`${this.baseUrl}/analysis/${fileId}/species?species_id=${speciesId}`)
+      : await this.fetchSnapshot(`/analysis/${fileId}/species`);
     if (!response.ok) {
       throw new Error('Failed to fetch species details');
     }
@@ -164,7 +240,7 @@ class ApiService {
   }
 
   async getEnvironmentalAnalysis(fileId: string): Promise<any> {
-    const response = await fetch(`${this.baseUrl}/analysis/${fileId}/environmental`);
+    const response = await this.fetchSnapshot(`/analysis/${fileId}/environmental`);
     if (!response.ok) {
       throw new Error('Failed to fetch environmental analysis');
     }
@@ -172,7 +248,14 @@ class ApiService {
   }
 
   async compareSamples(fileIds: string[]): Promise<any> {
-    const response = await fetch(`${this.baseUrl}/comparison?file_ids=${fileIds.join(',')}`);
+    // Pairs are in the snapshot once, with sorted ids; larger comparisons are computed live
+    if (fileIds.length === 2) {
+      fileIds = [...fileIds].sort();
+    }
+    const livePath = `/comparison?file_ids=${fileIds.join(',')}`;
+    const response = fileIds.length === 2
+      ? await this.fetchSnapshot(`/comparison/${fileIds.join(',')}`, livePath)
+      : await fetch(`${this.baseUrl}${livePath}`);
     if (!response.ok) {
       throw new Error('Failed to compare samples');
     }
@@ -193,12 +276,40 @@ class ApiService {
   }
 
   async getFungal28sAnalysis(): Promise<any> {
-    const response = await fetch(`${this.baseUrl}/analysis/fungal-28s`);
+    const response = await this.fetchSnapshot('/analysis/fungal-28s');
     if (!response.ok) {
       throw new Error('Failed to fetch 28S fungal analysis');
     }
     return response.json();
   }
+
+  async getFungal28sMap(zoom: number, bbox?: [number, number, number, number]): Promise<Fungal28sMapView> {
+    const params = new URLSearchParams({ zoom: String(zoom) });
+    if (bbox) {
+      params.set('bbox', bbox.join(','));
+    }
+
+    const response = await fetch(`${this.baseUrl}/analysis/fungal-28s/map?${params}`);
+    if (!response.ok) {
+      throw new Error('Failed to fetch 28S fungal map data');
+    }
+    return response.json();
+  }
+
+  async getFungal28sRecords(filters: Fungal28sRecordFilters = {}): Promise<Fungal28sRecordPage> {
+    const params = new URLSearchParams();
+    for (const [key, value] of Object.entries(filters)) {
+      if (value !== undefined && value !== null) {
+        params.set(key, Array.isArray(value) ? value.join(',') : String(value));
+      }
+    }
+
+    const response = await fetch(`${this.baseUrl}/analysis/fungal-28s/records?${params}`);
+    if (!response.ok) {
+      throw new Error('Failed to fetch 28S fungal records');
+    }
+    return response.json();
+  }
 }
 
 export const apiService = new ApiService();
@@ -210,6 +321,22 @@ export const fetchFastaFiles = async (): Promise<FastaFile[]> => {
 };
 
 export const fetchAnalysisReports = async (): Promise<Record<string, AnalysisReport>> => {
+  try {
+    // One request per page of reports
+    const reports: Record<string, AnalysisReport> = {};
+    let offset = 0;
+    let total = 0;
+    do {
+      const page = await apiService.getAnalysisReports(undefined, undefined, offset);
+      Object.assign(reports, page.reports);
+      total = page.total;
+      offset += page.limit;
+    } while (offset < total);
+    return reports;
+  } catch (err) {
+    console.warn('Batch analysis report request failed, fetching reports one by one:', err);
+  }
+
   try {
     const { files } = await apiService.getFastaFiles();
     const reports: Record<string, AnalysisReport> = {};